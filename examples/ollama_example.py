@@ -11,6 +11,8 @@ Setup:
     3. Run this script: python ollama_example.py
 """
 
+from typing import Any, Dict, List, Optional
+
 import ollama
 
 # Qalb model on Ollama
@@ -19,6 +21,20 @@ MODEL_NAME = "enstazao/qalb:8b-instruct-fp16"
 # System prompt in Urdu
 SYSTEM_PROMPT = "آپ ایک مددگار اور بے ضرر مصنوعی ذہانت کے اسسٹنٹ ہیں۔ آپ اردو میں سوالات کے درست جوابات دیتے ہیں۔"
 
+GENERATION_OPTIONS = {
+    "temperature": 0.1,
+    "top_p": 0.9,
+    "repeat_penalty": 1.1,
+}
+
+# Llama-3 chat template (Qalb is Llama-3 based), split at the end of the
+# system prompt. Ollama adds <|begin_of_text|> itself when tokenizing.
+PREFIX_TEMPLATE = "<|start_header_id|>system<|end_header_id|>\n\n{system}<|eot_id|>"
+TURN_TEMPLATE = (
+    "<|start_header_id|>user<|end_header_id|>\n\n{message}<|eot_id|>"
+    "<|start_header_id|>assistant<|end_header_id|>\n\n"
+)
+
 
 def chat_with_qalb(user_message: str, system_prompt: str = SYSTEM_PROMPT) -> str:
     """
@@ -37,11 +53,7 @@ def chat_with_qalb(user_message: str, system_prompt: str = SYSTEM_PROMPT) -> str
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_message},
         ],
-        options={
-            "temperature": 0.1,
-            "top_p": 0.9,
-            "repeat_penalty": 1.1,
-        }
+        options=GENERATION_OPTIONS
     )
     return response["message"]["content"]
 
@@ -59,15 +71,98 @@ def simple_generate(prompt: str) -> str:
     response = ollama.generate(
         model=MODEL_NAME,
         prompt=prompt,
-        options={
-            "temperature": 0.1,
-            "top_p": 0.9,
-            "repeat_penalty": 1.1,
-        }
+        options=GENERATION_OPTIONS
     )
     return response["response"]
 
 
+class PrefixSession:
+    """
+    Chat session that keeps the shared system-prompt prefix warm on the server.
+    
+    Every request is a raw Llama-3 prompt that starts with the same
+    system-prompt prefix and is sent with the same options and keep_alive.
+    Ollama's prompt cache therefore still holds the prefix's KV entries from
+    the previous request, and only the new user turn is prefilled. The
+    ``context`` token array would do the same for templated prompts, but
+    Ollama ignores it for raw prompts and has deprecated it.
+    
+    Usage:
+        session = PrefixSession()
+        print(session.ask("پاکستان کا قومی کھیل کیا ہے؟"))
+        print(session.prefill_savings())
+    """
+    
+    def __init__(
+        self,
+        system_prompt: str = SYSTEM_PROMPT,
+        model: str = MODEL_NAME,
+        keep_alive: str = "30m",
+        options: Optional[Dict[str, Any]] = None
+    ):
+        self.model = model
+        self.prefix = PREFIX_TEMPLATE.format(system=system_prompt)
+        self.keep_alive = keep_alive
+        self.options = options or GENERATION_OPTIONS
+        self.prefix_tokens = 0
+        self.prefix_prefill_ms = 0.0
+        self.calls: List[Dict[str, float]] = []
+    
+    def _generate(self, prompt: str, **options):
+        return ollama.generate(
+            model=self.model,
+            prompt=prompt,
+            raw=True,
+            keep_alive=self.keep_alive,
+            options={**self.options, **options}
+        )
+    
+    def warm(self):
+        """Prefill the prefix once and record what it costs without the cache."""
+        response = self._generate(self.prefix, num_predict=1)
+        self.prefix_tokens = response.get("prompt_eval_count") or 0
+        self.prefix_prefill_ms = (response.get("prompt_eval_duration") or 0) / 1e6
+    
+    def ask(self, user_message: str) -> str:
+        """
+        Send one user message after the warm prefix.
+        
+        Args:
+            user_message: The user's question/message in Urdu
+            
+        Returns:
+            The model's response as a string
+        """
+        if not self.prefix_tokens:
+            self.warm()
+        response = self._generate(self.prefix + TURN_TEMPLATE.format(message=user_message))
+        self.calls.append({
+            "prompt_tokens": response.get("prompt_eval_count") or 0,
+            "prefill_ms": (response.get("prompt_eval_duration") or 0) / 1e6,
+        })
+        return response["response"]
+    
+    def prefill_savings(self) -> Dict[str, float]:
+        """
+        Prefill time saved so far, against re-encoding every prompt from scratch.
+        
+        The cold cost of a prompt is estimated from the prefill rate measured
+        in ``warm()``. The estimate is zero if the prefix was already cached
+        when the session warmed up.
+        """
+        cold_ms_per_token = self.prefix_prefill_ms / self.prefix_tokens if self.prefix_tokens else 0.0
+        prefill_ms = sum(c["prefill_ms"] for c in self.calls)
+        cold_prefill_ms = sum(c["prompt_tokens"] for c in self.calls) * cold_ms_per_token
+        return {
+            "calls": len(self.calls),
+            "prefix_tokens": self.prefix_tokens,
+            "prefix_prefill_ms": self.prefix_prefill_ms,
+            "prefill_ms": prefill_ms,
+            "cold_prefill_ms": cold_prefill_ms,
+            "saved_ms": max(0.0, cold_prefill_ms - prefill_ms),
+        }
+
+
 def main():
     """Run example queries with Qalb."""
     
@@ -97,13 +192,16 @@ def main():
         ("استدلال", "اگر علی کے پاس 5 سیب ہیں اور وہ 2 اپنے بھائی کو دے دیتا ہے، تو اس کے پاس کتنے سیب بچیں گے؟"),
     ]
     
+    # The questions share one system prompt, so it is prefilled only once
+    session = PrefixSession()
+    
     for category, question in test_questions:
         print(f"📂 Category: {category}")
         print(f"❓ Question: {question}")
         print("-" * 40)
         
         try:
-            response = chat_with_qalb(question)
+            response = session.ask(question)
             print(f"✅ Response:\n{response}")
         except Exception as e:
             print(f"❌ Error: {e}")
@@ -111,6 +209,14 @@ def main():
         print()
         print("=" * 60)
         print()
+    
+    savings = session.prefill_savings()
+    if savings["calls"]:
+        print(f"⚡ System prompt: {savings['prefix_tokens']} tokens, "
+              f"prefilled once in {savings['prefix_prefill_ms']:.0f}ms")
+        print(f"   Prefill over {savings['calls']} questions: {savings['prefill_ms']:.0f}ms "
+              f"(~{savings['cold_prefill_ms']:.0f}ms without the warm prefix, "
+              f"{savings['saved_ms']:.0f}ms saved)")
 
 
 if __name__ == "__main__":
@@ -11,8 +11,12 @@ Requirements:
 Note: Requires a CUDA-capable GPU with at least 8GB VRAM (with 4-bit quantization)
 """
 
+import copy
+import time
+from typing import Dict, List
+
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig, DynamicCache
 
 
 # Model configuration
@@ -57,6 +61,40 @@ def load_model(use_4bit: bool = True):
     return model, tokenizer
 
 
+def format_prefix(system_prompt: str = SYSTEM_PROMPT) -> str:
+    """
+    Format the system-prompt part of the Llama-3 chat template.
+    
+    Every prompt with the same system prompt starts with this text, so its
+    key/value cache can be computed once and shared (see PrefixCacheSession).
+    
+    Args:
+        system_prompt: System prompt for the assistant
+        
+    Returns:
+        Formatted prefix string
+    """
+    return f"""<|begin_of_text|><|start_header_id|>system<|end_header_id|>
+
+{system_prompt}<|eot_id|>"""
+
+
+def format_turn(user_message: str) -> str:
+    """
+    Format a user turn of the Llama-3 chat template, up to the assistant header.
+    
+    Args:
+        user_message: The user's question/message
+        
+    Returns:
+        Formatted turn string
+    """
+    return f"""<|start_header_id|>user<|end_header_id|>
+
+{user_message}<|eot_id|><|start_header_id|>assistant<|end_header_id|>
+"""
+
+
 def format_prompt(user_message: str, system_prompt: str = SYSTEM_PROMPT) -> str:
     """
     Format the prompt using Llama-3 chat template.
@@ -68,12 +106,15 @@ def format_prompt(user_message: str, system_prompt: str = SYSTEM_PROMPT) -> str:
     Returns:
         Formatted prompt string
     """
-    return f"""<|begin_of_text|><|start_header_id|>system<|end_header_id|>
+    return format_prefix(system_prompt) + format_turn(user_message)
 
-{system_prompt}<|eot_id|><|start_header_id|>user<|end_header_id|>
 
-{user_message}<|eot_id|><|start_header_id|>assistant<|end_header_id|>
-"""
+def terminator_ids(tokenizer) -> List[int]:
+    """Token ids that end an assistant turn."""
+    return [
+        tokenizer.eos_token_id,
+        tokenizer.convert_tokens_to_ids("<|eot_id|>")
+    ]
 
 
 def generate_response(
@@ -104,10 +145,7 @@ def generate_response(
     """
     prompt = format_prompt(user_message, system_prompt)
     
-    terminators = [
-        tokenizer.eos_token_id,
-        tokenizer.convert_tokens_to_ids("<|eot_id|>")
-    ]
+    terminators = terminator_ids(tokenizer)
     
     inputs = tokenizer([prompt], return_tensors="pt").to(model.device)
     
@@ -130,6 +168,98 @@ def generate_response(
     return response
 
 
+def synchronize():
+    """Wait for queued GPU work so wall-clock timings are accurate."""
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+class PrefixCacheSession:
+    """
+    Generation session that encodes the shared system-prompt prefix only once.
+    
+    The prefix's past_key_values are computed when the session is created.
+    Each request gets a copy of them (generate() extends the cache it is
+    given), so the model only prefills the new user turn.
+    
+    Usage:
+        session = PrefixCacheSession(model, tokenizer)
+        print(session.generate("پاکستان کا قومی پھول کیا ہے؟"))
+        print(session.prefill_savings())
+    """
+    
+    def __init__(self, model, tokenizer, system_prompt: str = SYSTEM_PROMPT):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix_ids = tokenizer(
+            format_prefix(system_prompt), return_tensors="pt"
+        )["input_ids"].to(model.device)
+        
+        self.prefix_cache = DynamicCache()
+        start = time.perf_counter()
+        with torch.no_grad():
+            model(input_ids=self.prefix_ids, past_key_values=self.prefix_cache, use_cache=True)
+        synchronize()
+        self.prefix_prefill_ms = (time.perf_counter() - start) * 1000
+        self.calls = 0
+    
+    def generate(
+        self,
+        user_message: str,
+        max_new_tokens: int = 256,
+        temperature: float = 0.1,
+        top_p: float = 0.9,
+        repetition_penalty: float = 1.1,
+    ) -> str:
+        """
+        Generate a response to one user message after the cached prefix.
+        
+        Args:
+            user_message: User's input message
+            max_new_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            top_p: Nucleus sampling parameter
+            repetition_penalty: Penalty for repetition
+            
+        Returns:
+            Generated response text
+        """
+        turn_ids = self.tokenizer(
+            format_turn(user_message), add_special_tokens=False, return_tensors="pt"
+        )["input_ids"].to(self.model.device)
+        input_ids = torch.cat([self.prefix_ids, turn_ids], dim=1)
+        
+        outputs = self.model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=copy.deepcopy(self.prefix_cache),
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            repetition_penalty=repetition_penalty,
+            do_sample=True,
+            eos_token_id=terminator_ids(self.tokenizer),
+            pad_token_id=self.tokenizer.eos_token_id,
+        )
+        self.calls += 1
+        
+        return self.tokenizer.decode(
+            outputs[0][input_ids.shape[1]:],
+            skip_special_tokens=True
+        )
+    
+    def prefill_savings(self) -> Dict[str, float]:
+        """Prefill work skipped so far: the prefix is encoded once instead of per call."""
+        reused = max(0, self.calls - 1)
+        return {
+            "calls": self.calls,
+            "prefix_tokens": self.prefix_ids.shape[1],
+            "prefix_prefill_ms": self.prefix_prefill_ms,
+            "tokens_saved": self.prefix_ids.shape[1] * reused,
+            "saved_ms": self.prefix_prefill_ms * reused,
+        }
+
+
 def main():
     """Run example queries with Qalb using Transformers."""
     
@@ -157,13 +287,16 @@ def main():
         ("ترجمہ", "اردو میں ترجمہ کریں: 'Education is the key to success.'"),
     ]
     
+    # The questions share one system prompt, so it is encoded only once
+    session = PrefixCacheSession(model, tokenizer)
+    
     for category, question in test_questions:
         print(f"📂 Category: {category}")
         print(f"❓ Question: {question}")
         print("-" * 40)
         
         try:
-            response = generate_response(model, tokenizer, question)
+            response = session.generate(question)
             print(f"✅ Response:\n{response}")
         except Exception as e:
             print(f"❌ Error: {e}")
@@ -171,6 +304,12 @@ def main():
         print()
         print("=" * 60)
         print()
+    
+    savings = session.prefill_savings()
+    print(f"⚡ System prompt: {savings['prefix_tokens']} tokens, encoded once in "
+          f"{savings['prefix_prefill_ms']:.0f}ms")
+    print(f"   {savings['tokens_saved']} prefix tokens not re-encoded over {savings['calls']} questions "
+          f"(~{savings['saved_ms']:.0f}ms of prefill saved)")
 
 
 if __name__ == "__main__":
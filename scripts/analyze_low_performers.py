@@ -1,52 +1,68 @@
 #!/usr/bin/env python3
 """Detailed translation and reasoning analysis for Round 4."""
 
-import json
-from pathlib import Path
+import argparse
+import sys
+
+from keyword_matcher import locate_keywords
+from qalb_analysis import load_round, successful, add_model_argument
+
+COLUMNS = ["test_id", "category", "script_type", "score", "passed_keywords", "failed_keywords",
+           "error", "prompt", "response"]
+
+
+def format_matches(result):
+    """Passed keywords with the response offset of their first match."""
+    first = {}
+    for match in locate_keywords(result.response, list(result.passed_keywords)):
+        first.setdefault(match.keyword, match.start)
+    return ", ".join(f"{kw}@{pos}" for kw, pos in first.items())
+
+
+def report_section(results, categories, threshold, show_text=False):
+    """Per-suite average and the tests below ``threshold`` for some categories."""
+    selected = successful(results)[lambda df: df['category'].isin(categories)]
+    for test_file in results['test_file'].unique():
+        print(f"\n{test_file}:")
+        tests = selected[selected['test_file'] == test_file]
+        if tests.empty:
+            continue
+        print(f"  Average: {tests['score'].mean():.1f}/100")
+        print(f"  Tests below {threshold}:")
+
+        for t in tests[tests['score'] < threshold].itertuples():
+            print(f"\n    {t.test_id}: {t.score:.0f}/100")
+            if show_text:
+                print(f"      Prompt: {t.prompt[:100]}...")
+            print(f"      Passed: {list(t.passed_keywords)}")
+            print(f"      Failed: {list(t.failed_keywords)}")
+            if len(t.passed_keywords):
+                print(f"      Matched at: {format_matches(t)}")
+            if show_text:
+                print(f"      Response: {t.response[:150]}...")
+
+
+def analyze_low_performers(model=None):
+    try:
+        results = load_round(4, COLUMNS, model=model)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if results.empty:
+        print("⚠️  No Round 4 results in the results store or data/baseline")
+        return
 
-def analyze_low_performers():
-    with open("data/baseline/combined_results.json", 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
     print("="*70)
     print("TRANSLATION TEST ANALYSIS (Round 4)")
     print("="*70)
-    
-    for suite in data['test_suites']:
-        print(f"\n{suite['test_file']}:")
-        trans_tests = [r for r in suite['results'] if r['category'] == 'translation']
-        
-        scores = [t['score'] for t in trans_tests]
-        print(f"  Average: {sum(scores)/len(scores):.1f}/100")
-        print(f"  Tests below 85:")
-        
-        for t in trans_tests:
-            if t['score'] < 85:
-                print(f"\n    {t['test_id']}: {t['score']:.0f}/100")
-                print(f"      Passed: {t['passed_keywords']}")
-                print(f"      Failed: {t['failed_keywords']}")
-    
+    report_section(results, ['translation'], 85)
+
     print("\n" + "="*70)
     print("REASONING/COMMONSENSE TEST ANALYSIS")
     print("="*70)
-    
-    for suite in data['test_suites']:
-        print(f"\n{suite['test_file']}:")
-        reason_tests = [r for r in suite['results'] 
-                       if r['category'] in ['reasoning', 'commonsense_reasoning']]
-        
-        if reason_tests:
-            scores = [t['score'] for t in reason_tests]
-            print(f"  Average: {sum(scores)/len(scores):.1f}/100")
-            print(f"  Tests below 70:")
-            
-            for t in reason_tests:
-                if t['score'] < 70:
-                    print(f"\n    {t['test_id']}: {t['score']:.0f}/100")
-                    print(f"      Prompt: {t['prompt'][:100]}...")
-                    print(f"      Passed: {t['passed_keywords']}")
-                    print(f"      Failed: {t['failed_keywords']}")
-                    print(f"      Response: {t['response'][:150]}...")
+    report_section(results, ['reasoning', 'commonsense_reasoning'], 70, show_text=True)
 
 if __name__ == "__main__":
-    analyze_low_performers()
+    parser = argparse.ArgumentParser(description="Translation and reasoning analysis for Round 4.")
+    add_model_argument(parser)
+    analyze_low_performers(parser.parse_args().model)
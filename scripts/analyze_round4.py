@@ -1,94 +1,94 @@
 #!/usr/bin/env python3
 """Analyze Round 4 test results by category."""
 
-import json
-from collections import defaultdict
-from pathlib import Path
-
-def analyze_results():
-    results_file = Path("data/baseline/combined_results.json")
-    
-    with open(results_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+import argparse
+import sys
+
+import pandas as pd
+
+from qalb_analysis import (
+    REPORT_COLUMNS, load_round, group_stats, compare_rounds, successful, print_table, add_model_argument,
+)
+from test_runner import MODEL_NAME
+
+# Result fields this analysis reads; response text is never loaded
+COLUMNS = REPORT_COLUMNS + ["prompt", "eval_count", "prefill_tokens_per_second", "ttft_ms"]
+
+# Published scores of the default model for rounds whose results are no longer on disk
+HISTORICAL_SCORES = {
+    1: {"urdu": 74.4, "roman": 74.5},
+    2: {"urdu": 78.3, "roman": 78.2},
+    3: {"urdu": 80.0, "roman": 78.4},
+}
+
+CATEGORY_COLUMNS = ["tests", "errors", "score_mean", "score_min", "score_max", "pass_rate", "p50_s", "p90_s"]
+
+
+def analyze_results(model=None):
+    try:
+        results = load_round(4, COLUMNS, model=model)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if results.empty:
+        print("⚠️  No Round 4 results in the results store or data/baseline")
+        return
+
     print("\n" + "="*70)
     print("ROUND 4 DETAILED ANALYSIS")
     print("="*70)
-    
-    all_categories = defaultdict(list)
-    
+
     # Analyze by category for each test suite
-    for suite in data['test_suites']:
+    for test_file, suite in results.groupby("test_file", sort=False):
+        ok = successful(suite)
         print(f"\n{'='*70}")
-        print(f"Test Suite: {suite['test_file']}")
-        print(f"Average Score: {suite['metrics']['average_score']:.1f}/100")
-        print(f"Avg Response Time: {suite['metrics']['average_response_time_ms']:.0f}ms")
-        print(f"{'='*70}")
-        
-        categories = defaultdict(list)
-        for result in suite['results']:
-            categories[result['category']].append({
-                'score': result['score'],
-                'test_id': result['test_id'],
-                'passed': result['passed_keywords'],
-                'failed': result['failed_keywords'],
-                'prompt': result['prompt'],
-                'response': result['response'][:200] if len(result['response']) > 200 else result['response']
-            })
-            all_categories[result['category']].append(result['score'])
-        
-        print(f"\n{'Category':<30} {'Tests':<8} {'Avg':<10} {'Min':<8} {'Max':<8}")
-        print("-"*70)
-        for cat, results in sorted(categories.items()):
-            scores = [r['score'] for r in results]
-            avg = sum(scores)/len(scores)
-            print(f"{cat:<30} {len(scores):<8} {avg:<10.1f} {min(scores):<8.1f} {max(scores):<8.1f}")
-        
+        print(f"Test Suite: {test_file}")
+        print(f"Average Score: {ok['score'].mean():.1f}/100")
+        print(f"Avg Response Time: {ok['response_time_ms'].mean():.0f}ms")
+        timed = ok[ok['eval_count'].fillna(0) > 0] if 'eval_count' in ok else ok.iloc[0:0]
+        if not timed.empty:
+            # Server-reported timings (runs recorded after token metadata was added)
+            # A full prompt cache hit reports no prefill, hence no TTFT
+            prefilled = timed[timed['ttft_ms'] > 0]
+            print(f"Decode: {timed['tokens_per_second'].mean():.1f} tok/s  "
+                  f"Prefill: {prefilled['prefill_tokens_per_second'].mean():.1f} tok/s  "
+                  f"TTFT: {prefilled['ttft_ms'].mean():.0f}ms")
+
+        print_table(f"{test_file} - BY CATEGORY", group_stats(suite, ["category"])[CATEGORY_COLUMNS])
+
         # Show examples of lowest scoring tests
         print(f"\n--- Lowest Scoring Tests (< 60) ---")
-        low_scores = []
-        for cat, results in categories.items():
-            for r in results:
-                if r['score'] < 60:
-                    low_scores.append((cat, r))
-        
-        low_scores.sort(key=lambda x: x[1]['score'])
-        for cat, r in low_scores[:5]:
-            print(f"\n  {r['test_id']} ({cat}): {r['score']:.0f}/100")
-            print(f"    Prompt: {r['prompt'][:80]}...")
-            print(f"    Failed keywords: {r['failed']}")
-    
+        for r in ok[ok['score'] < 60].nsmallest(5, 'score').itertuples():
+            print(f"\n  {r.test_id} ({r.category}): {r.score:.0f}/100")
+            print(f"    Prompt: {r.prompt[:80]}...")
+            print(f"    Failed keywords: {list(r.failed_keywords)}")
+
     # Overall category comparison
+    print_table("COMBINED CATEGORY ANALYSIS (Both Urdu + Roman)", group_stats(results, ["category"])[CATEGORY_COLUMNS])
+
+    ok = successful(results)
     print(f"\n{'='*70}")
-    print("COMBINED CATEGORY ANALYSIS (Both Urdu + Roman)")
-    print(f"{'='*70}")
-    print(f"\n{'Category':<30} {'Tests':<8} {'Avg':<10} {'Min':<8} {'Max':<8}")
-    print("-"*70)
-    for cat, scores in sorted(all_categories.items()):
-        avg = sum(scores)/len(scores)
-        print(f"{cat:<30} {len(scores):<8} {avg:<10.1f} {min(scores):<8.1f} {max(scores):<8.1f}")
-    
-    print(f"\n{'='*70}")
-    print(f"OVERALL SCORE: {data['overall_metrics']['average_score']:.1f}/100")
-    print(f"Total Tests: {data['overall_metrics']['total_tests']}")
-    print(f"Successful: {data['overall_metrics']['successful_tests']}")
+    print(f"OVERALL SCORE: {ok.groupby('test_file')['score'].mean().mean():.1f}/100")
+    print(f"Total Tests: {len(results)}")
+    print(f"Successful: {len(ok)}")
     print(f"{'='*70}")
-    
-    # Compare with previous rounds
-    print("\n" + "="*70)
-    print("ROUND COMPARISON")
-    print("="*70)
-    print(f"\n{'Round':<12} {'Urdu':<12} {'Roman':<12} {'Combined':<12} {'Change':<12}")
-    print("-"*60)
-    print(f"{'Round 1':<12} {'74.4':<12} {'74.5':<12} {'74.4':<12} {'-':<12}")
-    print(f"{'Round 2':<12} {'78.3':<12} {'78.2':<12} {'78.3':<12} {'+3.9':<12}")
-    print(f"{'Round 3':<12} {'80.0':<12} {'78.4':<12} {'79.2':<12} {'+0.9':<12}")
-    
-    urdu_score = data['test_suites'][0]['metrics']['average_score']
-    roman_score = data['test_suites'][1]['metrics']['average_score']
-    combined = data['overall_metrics']['average_score']
-    change = combined - 79.2
-    print(f"{'Round 4':<12} {urdu_score:<12.1f} {roman_score:<12.1f} {combined:<12.1f} {change:+.1f}")
+
+    # Compare with previous rounds of the same model; earlier rounds are read
+    # from their results when available (scores only), otherwise the published
+    # figures are used for the default model
+    model = results["model"].iloc[0]
+    earlier = [load_round(r, ["test_id", "category", "script_type", "score", "error"], model=model)
+               for r in HISTORICAL_SCORES]
+    rounds = compare_rounds(pd.concat([f for f in earlier if not f.empty] + [results], ignore_index=True))
+    for round_num, scores in HISTORICAL_SCORES.items():
+        if round_num not in rounds.index and model == MODEL_NAME:
+            rounds.loc[round_num, list(scores)] = list(scores.values())
+    rounds = rounds.sort_index()
+    rounds["combined"] = rounds[["urdu", "roman"]].mean(axis=1)
+    rounds["change"] = rounds["combined"].diff()
+    print_table("ROUND COMPARISON", rounds[["urdu", "roman", "combined", "change"]])
 
 if __name__ == "__main__":
-    analyze_results()
+    parser = argparse.ArgumentParser(description="Analyze Round 4 test results by category.")
+    add_model_argument(parser)
+    analyze_results(parser.parse_args().model)
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Qalb Inference Backends
+=======================
+One interface for every serving stack the test runner can evaluate.
+
+A backend turns a test prompt into an Ollama-style generate response. The
+response holds the text plus prompt_eval_count and eval_count, and the load,
+prompt-eval, eval and total durations in nanoseconds. With ``stream=True``
+it yields Ollama-style chunks (``{"response": ..., "done": False}``); the
+last chunk is ``done`` and carries the same counts. The runner therefore
+scores and times every backend with the same code, and latency and
+throughput from different stacks are directly comparable. When a server
+reports no timings of its own, they are measured on the client: streaming
+gives the prefill/decode split from the first token's arrival, otherwise
+only the total is known and counts as decode time.
+
+Backends:
+- ``OllamaBackend``: an Ollama server (the runner's default)
+- ``OpenAICompatibleBackend``: any ``/v1/chat/completions`` server, e.g.
+  llama.cpp server or vLLM
+- ``TransformersBackend`` (transformers_backend.py): the model in-process,
+  with batched generation
+- ``MockBackend`` (mock_backend.py): a simulated server for benchmarking
+  the runner without a model
+
+Usage:
+    python scripts/test_runner.py --backend ollama
+    python scripts/test_runner.py --backend openai --base-url http://localhost:8080/v1 --stream
+    python scripts/test_runner.py --backend transformers --batch-size 32
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import json
+import time
+from typing import Optional, List, Dict, Any, Iterator, Tuple, Sequence, Protocol
+
+try:
+    import ollama
+    OLLAMA_AVAILABLE = True
+except ImportError:
+    OLLAMA_AVAILABLE = False
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+
+BACKENDS = ("ollama", "openai", "transformers", "mock")
+DEFAULT_OPENAI_BASE_URL = "http://localhost:8080/v1"
+# In-process transformers backend (transformers_backend.py)
+HF_MODEL_NAME = "enstazao/Qalb-1.0-8B-Instruct"
+DEFAULT_BATCH_SIZE = 16
+DTYPES = ("bfloat16", "float16", "float32", "int8", "int4")
+HTTP_TIMEOUT_SECONDS = 300
+
+# Ollama option -> OpenAI-compatible request field
+OPENAI_OPTIONS = {
+    "num_predict": "max_tokens",
+    "temperature": "temperature",
+    "top_p": "top_p",
+    "top_k": "top_k",
+    "seed": "seed",
+    "stop": "stop",
+}
+
+
+class InferenceBackend(Protocol):
+    """What QalbTestRunner needs from a serving stack."""
+
+    name: str
+    # True when iter_batches generates prompts together rather than one by one
+    supports_batch: bool
+
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        **kwargs
+    ) -> Any:
+        """An Ollama-style response, or with ``stream`` an iterator of Ollama-style chunks."""
+        ...
+
+    def iter_batches(
+        self,
+        prompts: Sequence[str],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Tuple[List[int], List[Dict[str, Any]]]]:
+        """Generate several prompts; yields (input indices, responses) as batches finish."""
+        ...
+
+    def health(self) -> bool:
+        """Whether the backend can serve requests right now."""
+        ...
+
+    def metadata(self) -> Dict[str, Any]:
+        """Backend, model and quantisation details recorded with each suite run.
+
+        ``digest`` identifies the exact model build for response-cache keys.
+        """
+        ...
+
+    def describe(self) -> str:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+
+class SequentialBatches:
+    """Batch API for backends without batching: one generate call per prompt.
+
+    Servers that batch concurrent requests themselves (Ollama with
+    OLLAMA_NUM_PARALLEL, llama.cpp, vLLM) are driven with --workers instead.
+    """
+
+    supports_batch = False
+
+    def iter_batches(
+        self,
+        prompts: Sequence[str],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Tuple[List[int], List[Dict[str, Any]]]]:
+        for i, prompt in enumerate(prompts):
+            yield [i], [self.generate(self.model, prompt, options)]
+
+    def generate_batch(
+        self,
+        prompts: Sequence[str],
+        options: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        return [responses[0] for _, responses in self.iter_batches(prompts, options)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+# ============================================================
+# Ollama
+# ============================================================
+
+class OllamaBackend(SequentialBatches):
+    """An Ollama server; responses pass through unchanged."""
+
+    name = "ollama"
+
+    def __init__(self, model: str, host: Optional[str] = None):
+        if not OLLAMA_AVAILABLE:
+            raise RuntimeError("Ollama backend needs: pip install ollama")
+        self.model = model
+        self.host = host
+        # The module-level client follows OLLAMA_HOST like the ollama CLI
+        self.client = ollama.Client(host=host) if host else ollama
+
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        **kwargs
+    ) -> Any:
+        return self.client.generate(model=model, prompt=prompt, options=options, stream=stream, **kwargs)
+
+    def health(self) -> bool:
+        try:
+            self.client.list()
+            return True
+        except Exception:
+            return False
+
+    def metadata(self) -> Dict[str, Any]:
+        info = {"backend": self.name, "host": self.host or "default", "model": self.model}
+        try:
+            details = self.client.show(self.model).get("details") or {}
+            details = details if isinstance(details, dict) else details.model_dump()
+            info.update({
+                "family": details.get("family"),
+                "parameter_size": details.get("parameter_size"),
+                "quantization": details.get("quantization_level"),
+            })
+        except Exception:
+            pass
+        return info
+
+    def describe(self) -> str:
+        return f"Ollama {self.model} at {self.host or 'the default host'}"
+
+
+# ============================================================
+# OpenAI-compatible HTTP servers (llama.cpp server, vLLM, ...)
+# ============================================================
+
+def openai_request(
+    model: str,
+    prompt: str,
+    options: Optional[Dict[str, Any]],
+    stream: bool
+) -> Dict[str, Any]:
+    """A /v1/chat/completions request body for a test prompt and Ollama-style options."""
+    body = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "stream": stream,
+    }
+    body.update((OPENAI_OPTIONS[k], v) for k, v in (options or {}).items() if k in OPENAI_OPTIONS)
+    if stream:
+        # Token usage arrives in a final chunk
+        body["stream_options"] = {"include_usage": True}
+    return body
+
+
+def openai_response(
+    model: str,
+    data: Dict[str, Any],
+    text: str,
+    finish_reason: Optional[str],
+    start: float,
+    end: float,
+    first_token: Optional[float] = None,
+    chunks: int = 0
+) -> Dict[str, Any]:
+    """An Ollama-style response from a chat completion and client-side timestamps.
+
+    Server timings are used when present (llama.cpp's ``timings``). Otherwise
+    prefill runs until the first streamed token. Without streaming only the
+    total time is known, and it all counts as decode time.
+    """
+    usage = data.get("usage") or {}
+    timings = data.get("timings") or {}
+    total_ns = int((end - start) * 1e9)
+    if timings.get("predicted_ms") is not None:
+        prompt_ns = int(timings.get("prompt_ms", 0) * 1e6)
+        eval_ns = int(timings["predicted_ms"] * 1e6)
+    elif first_token is not None:
+        prompt_ns = int((first_token - start) * 1e9)
+        eval_ns = int((end - first_token) * 1e9)
+    else:
+        prompt_ns, eval_ns = 0, total_ns
+
+    return {
+        "model": model,
+        "response": text,
+        "done": True,
+        "done_reason": finish_reason or "stop",
+        "prompt_eval_count": usage.get("prompt_tokens") or timings.get("prompt_n") or 0,
+        # Servers that omit usage stream about one token per chunk
+        "eval_count": usage.get("completion_tokens") or timings.get("predicted_n") or chunks,
+        "load_duration": 0,
+        "prompt_eval_duration": prompt_ns,
+        "eval_duration": eval_ns,
+        "total_duration": total_ns,
+    }
+
+
+class OpenAICompatibleBackend(SequentialBatches):
+    """A server with the OpenAI chat completions API, such as llama.cpp server or vLLM."""
+
+    name = "openai"
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_OPENAI_BASE_URL,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: float = HTTP_TIMEOUT_SECONDS
+    ):
+        if not HTTPX_AVAILABLE:
+            raise RuntimeError("OpenAI-compatible backend needs: pip install httpx")
+        self.base_url = base_url.rstrip("/")
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.http = httpx.Client(base_url=self.base_url, headers=headers, timeout=timeout)
+        # The served model name; defaults to the first one the server lists
+        self._model = model
+
+    @property
+    def model(self) -> str:
+        if self._model is None:
+            models = self.models()
+            if not models:
+                raise RuntimeError(f"{self.base_url} serves no models")
+            self._model = models[0]
+        return self._model
+
+    def models(self) -> List[str]:
+        response = self.http.get("/models")
+        response.raise_for_status()
+        return [m["id"] for m in response.json().get("data", [])]
+
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        **kwargs
+    ) -> Any:
+        """Chat completion for a prompt; ``model`` is ignored in favour of the served model."""
+        body = openai_request(self.model, prompt, options, stream)
+        if stream:
+            return self._stream(body)
+
+        start = time.perf_counter()
+        response = self.http.post("/chat/completions", json=body)
+        response.raise_for_status()
+        end = time.perf_counter()
+        data = response.json()
+        choice = data["choices"][0]
+        return openai_response(
+            self.model, data, choice["message"].get("content") or "", choice.get("finish_reason"), start, end
+        )
+
+    def _stream(self, body: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Server-sent events as Ollama-style chunks.
+
+        Closing the generator closes the HTTP response, which makes the server
+        stop generating.
+        """
+        start = time.perf_counter()
+        first_token = None
+        chunks = 0
+        finish_reason = None
+        final: Dict[str, Any] = {}
+        with self.http.stream("POST", "/chat/completions", json=body) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                data = json.loads(payload)
+                if data.get("usage") or data.get("timings"):
+                    final = data
+                for choice in data.get("choices") or []:
+                    finish_reason = choice.get("finish_reason") or finish_reason
+                    text = (choice.get("delta") or {}).get("content")
+                    if text:
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                        chunks += 1
+                        yield {"model": self.model, "response": text, "done": False}
+        end = time.perf_counter()
+        yield openai_response(self.model, final, "", finish_reason, start, end, first_token, chunks)
+
+    def health(self) -> bool:
+        try:
+            self.models()
+            return True
+        except Exception:
+            return False
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "base_url": self.base_url,
+            "model": self.model,
+            "digest": f"{self.name}:{self.base_url}:{self.model}",
+        }
+
+    def describe(self) -> str:
+        return f"OpenAI-compatible server {self.base_url} ({self.model})"
+
+
+def create_backend(kind: str, model: str, **settings) -> InferenceBackend:
+    """Build the backend named ``kind`` from CLI-style settings.
+
+    Settings that belong to other backends are ignored: ``host`` (ollama),
+    ``base_url``/``api_key`` (openai), ``device``/``dtype``/``batch_size``
+    (transformers), ``seed``/``mock_profile``/``responses`` (mock).
+    """
+    if kind == "ollama":
+        return OllamaBackend(model, host=settings.get("host"))
+    if kind == "openai":
+        return OpenAICompatibleBackend(
+            settings.get("base_url") or DEFAULT_OPENAI_BASE_URL,
+            model=settings.get("served_model"),
+            api_key=settings.get("api_key"),
+        )
+    if kind == "transformers":
+        # Imported here so the other backends don't pay for torch
+        from transformers_backend import TransformersBackend
+        return TransformersBackend(
+            model,
+            device=settings.get("device"),
+            dtype=settings.get("dtype") or "bfloat16",
+            batch_size=settings.get("batch_size") or DEFAULT_BATCH_SIZE,
+        )
+    if kind == "mock":
+        from mock_backend import MockBackend
+        return MockBackend(
+            model,
+            profile=settings.get("mock_profile"),
+            responses=settings.get("responses"),
+            seed=settings.get("seed") or 0,
+        )
+    raise ValueError(f"Unknown backend '{kind}', expected one of {', '.join(BACKENDS)}")
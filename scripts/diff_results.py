@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Qalb Results Diff
+=================
+Compares two sets of test results test by test.
+
+Each side is either a round number (loaded like qalb_analysis does, from
+the results store or that round's JSON files) or a ``*_results.json`` /
+``combined_results.json`` file. The two sides are hash-joined on
+``test_id`` and every test present in both gets:
+
+- its score delta and whether it flipped between pass and fail
+- keyword flips: keywords passed on one side and failed on the other
+- its latency change, flagged as a regression when the head side is both
+  LATENCY_REGRESSION_RATIO times and LATENCY_REGRESSION_MIN_MS slower
+- its Urdu character ratio shift, flagged beyond URDU_SHIFT_THRESHOLD
+
+Both sides must hold results of the same model: round sides are read
+for ``--model`` (see qalb_analysis.load_round), and a diff between
+different models, e.g. a quantisation against fp16, is refused unless
+``--allow-model-mismatch`` is given.
+
+Tests that errored on either side are counted (new / fixed errors) but
+left out of the deltas. Mean score, pass-rate and latency changes, overall
+and per category, come with paired bootstrap confidence intervals; all
+resamples are drawn and averaged as NumPy arrays, so a 10,000-test diff
+takes a fraction of a second.
+
+Usage:
+    python scripts/diff_results.py 3 4
+    python scripts/diff_results.py old/combined_results.json data/baseline/combined_results.json
+    python scripts/diff_results.py 2 4 --by category script_type --top 20 --output diff.csv
+    python scripts/diff_results.py 4 4 --model enstazao/qalb:8b-instruct-fp16 \
+        --head-model enstazao/qalb:8b-instruct-q4_K_M --allow-model-mismatch
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import Optional, List, Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from qalb_analysis import load_file, load_round, print_table
+from results_store import STORE_DIR
+
+
+# Result fields a diff reads; prompt/response text is never loaded
+DIFF_COLUMNS = [
+    "test_id", "category", "script_type", "score", "response_time_ms", "urdu_char_ratio",
+    "passed_keywords", "failed_keywords", "error",
+]
+
+LATENCY_REGRESSION_RATIO = 1.25
+LATENCY_REGRESSION_MIN_MS = 1000
+URDU_SHIFT_THRESHOLD = 0.10
+
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE = 0.95
+# Upper bound on resampled values held in memory at once
+BOOTSTRAP_CHUNK_ELEMENTS = 2_000_000
+
+# Paired per-test changes that get bootstrap intervals
+CI_COLUMNS = ["score_delta", "pass_delta", "time_delta_s"]
+
+
+# ============================================================
+# Join
+# ============================================================
+
+def load_side(spec: str, store_dir: Path = STORE_DIR, model: Optional[str] = None) -> Tuple[str, pd.DataFrame]:
+    """Label and results for a round number (read for ``model``) or a results file path."""
+    if spec.isdigit():
+        return f"round {spec}", load_round(int(spec), DIFF_COLUMNS, model=model, store_dir=store_dir)
+    return Path(spec).name, load_file(Path(spec), DIFF_COLUMNS)
+
+
+def side_models(frame: pd.DataFrame) -> List[str]:
+    """Models a side's results were recorded for."""
+    return sorted(frame["model"].dropna().unique()) if "model" in frame else []
+
+
+def keyword_states(frame: pd.DataFrame) -> pd.DataFrame:
+    """One row per (test_id, keyword) with whether the keyword was matched."""
+    passed = frame[["test_id", "passed_keywords"]].explode("passed_keywords")
+    failed = frame[["test_id", "failed_keywords"]].explode("failed_keywords")
+    states = pd.concat([
+        passed.rename(columns={"passed_keywords": "keyword"}).assign(hit=True),
+        failed.rename(columns={"failed_keywords": "keyword"}).assign(hit=False),
+    ], ignore_index=True)
+    return states.dropna(subset=["keyword"]).drop_duplicates(["test_id", "keyword"])
+
+
+def keyword_flips(base: pd.DataFrame, head: pd.DataFrame) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """Keywords each test lost (passed → failed) and gained (failed → passed).
+
+    Keywords present on only one side (added to or removed from a test's
+    list between rounds) are not flips.
+    """
+    states = keyword_states(base).merge(
+        keyword_states(head), on=["test_id", "keyword"], suffixes=("_base", "_head")
+    )
+    flips = states[states["hit_base"] != states["hit_head"]]
+    lost: Dict[str, List[str]] = {}
+    gained: Dict[str, List[str]] = {}
+    for test_id, keyword, hit_base in zip(
+        flips["test_id"].tolist(), flips["keyword"].tolist(), flips["hit_base"].tolist()
+    ):
+        (lost if hit_base else gained).setdefault(test_id, []).append(keyword)
+    return lost, gained
+
+
+def join_results(base: pd.DataFrame, head: pd.DataFrame) -> pd.DataFrame:
+    """Per-test diff of two result frames, hash-joined on ``test_id``.
+
+    ``status`` is ``compared`` for tests that completed on both sides, and
+    otherwise ``added``, ``removed``, ``new_error``, ``fixed_error`` or
+    ``error``; delta columns are only filled for compared tests.
+    """
+    fields = ["test_id", "category", "script_type", "difficulty", "score", "passed", "failed",
+              "response_time_ms", "urdu_char_ratio"]
+    base = base.drop_duplicates("test_id", keep="last")
+    head = head.drop_duplicates("test_id", keep="last")
+    diff = base.reindex(columns=fields).merge(
+        head.reindex(columns=fields), on="test_id", how="outer", suffixes=("_base", "_head"), indicator=True
+    )
+
+    for name in ("category", "script_type", "difficulty"):
+        diff[name] = diff[f"{name}_head"].fillna(diff[f"{name}_base"])
+    failed_base = diff["failed_base"].fillna(False).astype(bool)
+    failed_head = diff["failed_head"].fillna(False).astype(bool)
+    both = diff["_merge"] == "both"
+    diff["status"] = np.select(
+        [diff["_merge"] == "right_only", diff["_merge"] == "left_only",
+         both & failed_base & failed_head, both & failed_head, both & failed_base],
+        ["added", "removed", "error", "new_error", "fixed_error"],
+        default="compared",
+    )
+
+    compared = diff["status"] == "compared"
+    diff["score_delta"] = (diff["score_head"] - diff["score_base"]).where(compared)
+    diff["pass_delta"] = (
+        diff["passed_head"].astype(float) - diff["passed_base"].astype(float)
+    ).where(compared) * 100
+    diff["time_delta_s"] = ((diff["response_time_ms_head"] - diff["response_time_ms_base"]) / 1000).where(compared)
+    diff["time_ratio"] = (diff["response_time_ms_head"] / diff["response_time_ms_base"]).where(compared)
+    diff["urdu_shift"] = (diff["urdu_char_ratio_head"] - diff["urdu_char_ratio_base"]).where(compared)
+    diff["latency_regression"] = compared & (diff["time_ratio"] >= LATENCY_REGRESSION_RATIO) & (
+        diff["time_delta_s"] * 1000 >= LATENCY_REGRESSION_MIN_MS
+    )
+    diff["urdu_shifted"] = compared & (diff["urdu_shift"].abs() >= URDU_SHIFT_THRESHOLD)
+
+    lost, gained = keyword_flips(base, head)
+    test_ids = diff["test_id"].tolist()
+    diff["keywords_lost"] = [lost.get(test_id, []) for test_id in test_ids]
+    diff["keywords_gained"] = [gained.get(test_id, []) for test_id in test_ids]
+    drop = ["_merge", "failed_base", "failed_head"] + [
+        f"{name}_{side}" for name in ("category", "script_type", "difficulty") for side in ("base", "head")
+    ]
+    return diff.drop(columns=drop)
+
+
+# ============================================================
+# Statistics
+# ============================================================
+
+def bootstrap_means(
+    values: np.ndarray,
+    membership: Optional[np.ndarray] = None,
+    resamples: int = BOOTSTRAP_RESAMPLES,
+    seed: Optional[int] = 0
+) -> np.ndarray:
+    """Means of each column of ``values`` per group over bootstrap resamples.
+
+    ``membership`` is an ``(n, g)`` 0/1 matrix of the groups each row
+    belongs to (default: one group of every row); groups may overlap, so
+    an overall group and its subgroups come from the same resamples. Rows
+    are resampled together, so paired columns keep their pairing. Each
+    block of resamples becomes per-row draw counts with one ``bincount``
+    and is reduced with one matrix product, with no per-group or
+    per-resample Python loop. Returns shape ``(resamples, g, k)``; a group
+    with no rows drawn in a resample has a NaN mean there.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    n, k = values.shape
+    if membership is None:
+        membership = np.ones((n, 1))
+    groups = membership.shape[1]
+    # Columns: group sizes, then each value column's per-group sums
+    design = np.hstack([membership] + [membership * values[:, [j]] for j in range(k)])
+
+    rng = np.random.default_rng(seed)
+    means = np.full((resamples, groups, k), np.nan)
+    if n == 0:
+        return means
+    block = max(1, BOOTSTRAP_CHUNK_ELEMENTS // n)
+    for start in range(0, resamples, block):
+        count = min(block, resamples - start)
+        draws = rng.integers(0, n, size=(count, n)) + (np.arange(count) * n)[:, None]
+        weights = np.bincount(draws.ravel(), minlength=count * n).reshape(count, n).astype(float)
+        totals = weights @ design
+        sizes = totals[:, :groups]
+        sums = totals[:, groups:].reshape(count, k, groups)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[start:start + count] = (sums / sizes[:, None, :]).transpose(0, 2, 1)
+    return means
+
+
+def bootstrap_ci(
+    values: np.ndarray,
+    membership: Optional[np.ndarray] = None,
+    resamples: int = BOOTSTRAP_RESAMPLES,
+    confidence: float = CONFIDENCE,
+    seed: Optional[int] = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Percentile bootstrap interval ``(low, high)`` for each group and column mean, shape ``(g, k)``."""
+    means = bootstrap_means(values, membership, resamples, seed)
+    tail = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        # Groups never drawn in any resample have an all-NaN slice
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanquantile(means, [tail, 1 - tail], axis=0)
+    return low, high
+
+
+def summarize(diff: pd.DataFrame, by: Sequence[str] = (), resamples: int = BOOTSTRAP_RESAMPLES,
+              confidence: float = CONFIDENCE, seed: Optional[int] = 0) -> Tuple[pd.Series, pd.DataFrame]:
+    """Mean changes with bootstrap intervals over all compared tests and per group.
+
+    Returns ``(overall, groups)``; ``groups`` is empty when ``by`` is.
+    """
+    compared = diff[diff["status"] == "compared"]
+    keys = list(by) or ["group"]
+    grouped = compared.assign(group="all").groupby(keys, sort=True, dropna=False)
+    codes = grouped.ngroup().to_numpy()
+    membership = np.zeros((len(compared), grouped.ngroups + 1))
+    membership[:, 0] = 1.0
+    membership[np.arange(len(compared)), codes + 1] = 1.0
+    low, high = bootstrap_ci(compared[CI_COLUMNS].to_numpy(), membership, resamples, confidence, seed)
+
+    def table(frame: pd.core.groupby.DataFrameGroupBy) -> pd.DataFrame:
+        return frame.agg(
+            tests=("score_delta", "size"),
+            score_base=("score_base", "mean"),
+            score_head=("score_head", "mean"),
+            **{column: (column, "mean") for column in CI_COLUMNS},
+            regressed=("score_delta", lambda d: int((d < 0).sum())),
+            improved=("score_delta", lambda d: int((d > 0).sum())),
+        )
+
+    overall = table(compared.assign(group="all").groupby("group"))
+    groups = table(grouped) if by else overall.iloc[0:0]
+    for index, column in enumerate(CI_COLUMNS):
+        for frame, rows in ((overall, slice(0, 1)), (groups, slice(1, None))):
+            if len(frame):
+                frame.insert(frame.columns.get_loc(column) + 1, f"{column}_low", low[rows, index])
+                frame.insert(frame.columns.get_loc(column) + 2, f"{column}_high", high[rows, index])
+    return overall.iloc[0], groups
+
+
+def significant(low: float, high: float) -> str:
+    """Marker for an interval that excludes zero."""
+    return " *" if low > 0 or high < 0 else ""
+
+
+# ============================================================
+# Report
+# ============================================================
+
+def format_ci(row: pd.Series, column: str, unit: str = "") -> str:
+    return (f"{row[column]:+.2f}{unit} [{row[f'{column}_low']:+.2f}, {row[f'{column}_high']:+.2f}]"
+            f"{significant(row[f'{column}_low'], row[f'{column}_high'])}")
+
+
+def print_report(diff: pd.DataFrame, base_label: str, head_label: str, by: Sequence[str],
+                 top: int, resamples: int, confidence: float, seed: Optional[int]):
+    """Print the summary, grouped intervals and ranked per-test changes."""
+    counts = diff["status"].value_counts()
+    compared = diff[diff["status"] == "compared"]
+    overall, groups = summarize(diff, by, resamples, confidence, seed) if len(compared) else (None, None)
+
+    print(f"\n{'='*70}")
+    print(f"RESULTS DIFF: {base_label} → {head_label}")
+    print(f"{'='*70}")
+    print(f"Compared: {counts.get('compared', 0)} | Added: {counts.get('added', 0)} | "
+          f"Removed: {counts.get('removed', 0)} | New errors: {counts.get('new_error', 0)} | "
+          f"Fixed errors: {counts.get('fixed_error', 0)}")
+    if overall is None:
+        print("⚠️  No tests completed on both sides")
+        return
+
+    print(f"\nAverage score: {overall['score_base']:.1f} → {overall['score_head']:.1f}  "
+          f"Δ {format_ci(overall, 'score_delta')}")
+    print(f"Pass rate Δ:   {format_ci(overall, 'pass_delta', ' pts')}")
+    print(f"Latency Δ:     {format_ci(overall, 'time_delta_s', 's')}")
+    print(f"({confidence:.0%} paired bootstrap intervals, {resamples} resamples; * excludes zero)")
+    print(f"\nImproved: {int(overall['improved'])} | Regressed: {int(overall['regressed'])} | "
+          f"Pass → fail: {int((compared['pass_delta'] < 0).sum())} | "
+          f"Fail → pass: {int((compared['pass_delta'] > 0).sum())}")
+    print(f"Keyword flips: {sum(map(len, compared['keywords_lost']))} lost, "
+          f"{sum(map(len, compared['keywords_gained']))} gained")
+    print(f"Latency regressions (≥{LATENCY_REGRESSION_RATIO}x and ≥{LATENCY_REGRESSION_MIN_MS}ms slower): "
+          f"{int(compared['latency_regression'].sum())}")
+    print(f"Urdu ratio shifts (≥{URDU_SHIFT_THRESHOLD:.0%}): "
+          f"{int((compared['urdu_shifted'] & (compared['urdu_shift'] < 0)).sum())} down, "
+          f"{int((compared['urdu_shifted'] & (compared['urdu_shift'] > 0)).sum())} up")
+
+    if by:
+        table = pd.DataFrame({
+            "tests": groups["tests"],
+            "base": groups["score_base"],
+            "head": groups["score_head"],
+            "delta": groups["score_delta"],
+            "low": groups["score_delta_low"],
+            "high": groups["score_delta_high"],
+            "pass_delta": groups["pass_delta"],
+            "time_delta_s": groups["time_delta_s"],
+            "regressed": groups["regressed"],
+        }).sort_values("delta")
+        print_table(f"SCORE CHANGE BY {' / '.join(k.upper() for k in by)}", table)
+
+    columns = ["category", "score_base", "score_head", "score_delta", "keywords_lost"]
+    regressors = compared[compared["score_delta"] < 0].nsmallest(top, "score_delta")
+    print_table(f"TOP {top} REGRESSIONS", regressors.set_index("test_id")[columns])
+    improvers = compared[compared["score_delta"] > 0].nlargest(top, "score_delta")
+    print_table(f"TOP {top} IMPROVEMENTS", improvers.set_index("test_id")[columns[:-1] + ["keywords_gained"]])
+
+    slower = compared[compared["latency_regression"]].nlargest(top, "time_delta_s")
+    print_table(f"LATENCY REGRESSIONS (top {top})", slower.set_index("test_id")[
+        ["category", "response_time_ms_base", "response_time_ms_head", "time_ratio"]
+    ], "{:.2f}")
+    shifted = compared[compared["urdu_shifted"]]
+    shifted = shifted.loc[shifted["urdu_shift"].abs().sort_values(ascending=False).index[:top]]
+    print_table(f"URDU RATIO SHIFTS (top {top})", shifted.set_index("test_id")[
+        ["category", "urdu_char_ratio_base", "urdu_char_ratio_head", "urdu_shift"]
+    ], "{:.2f}")
+
+
+def write_diff(diff: pd.DataFrame, path: Path):
+    """Save the per-test diff as CSV, keyword lists joined with ``|``."""
+    output = diff.copy()
+    for name in ("keywords_lost", "keywords_gained"):
+        output[name] = output[name].map("|".join)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    output.to_csv(path, index=False, encoding="utf-8")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Per-test diff of two Qalb result sets.")
+    parser.add_argument("base", help="Baseline side: a round number or a results JSON file")
+    parser.add_argument("head", help="Side compared against the baseline: a round number or a results JSON file")
+    parser.add_argument("--by", nargs="*", default=["category"], help="Group-by columns for the interval table (default: category)")
+    parser.add_argument("--top", type=int, default=10, help="Tests listed per ranking (default: 10)")
+    parser.add_argument("--resamples", type=int, default=BOOTSTRAP_RESAMPLES,
+                        help=f"Bootstrap resamples (default: {BOOTSTRAP_RESAMPLES})")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE, help=f"Interval confidence (default: {CONFIDENCE})")
+    parser.add_argument("--seed", type=int, default=0, help="Bootstrap random seed (default: 0)")
+    parser.add_argument("--model", help="Model to read round sides for (default: the only model with results, "
+                                        "else the runner's default model)")
+    parser.add_argument("--head-model", help="Model to read a round head side for (default: --model)")
+    parser.add_argument("--allow-model-mismatch", action="store_true",
+                        help="Diff sides recorded for different models")
+    parser.add_argument("--store", type=Path, default=STORE_DIR, help=f"Results store directory (default: {STORE_DIR})")
+    parser.add_argument("--output", type=Path, help="Write the per-test diff to this CSV file")
+    return parser.parse_args(argv)
+
+
+def main():
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = parse_args()
+    start = time.perf_counter()
+
+    try:
+        base_label, base = load_side(args.base, args.store, args.model)
+        head_label, head = load_side(args.head, args.store, args.head_model or args.model)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    for label, frame in ((base_label, base), (head_label, head)):
+        if frame.empty:
+            print(f"⚠️  No results for {label}")
+            sys.exit(1)
+
+    base_models, head_models = side_models(base), side_models(head)
+    if base_models != head_models:
+        if not args.allow_model_mismatch:
+            print(f"❌ {base_label} is {', '.join(base_models) or 'an unknown model'} but {head_label} is "
+                  f"{', '.join(head_models) or 'an unknown model'}; pass --allow-model-mismatch to diff them")
+            sys.exit(1)
+        print(f"⚠️  Diffing different models: {', '.join(base_models)} → {', '.join(head_models)}")
+    base_label = f"{base_label} ({', '.join(base_models)})" if base_models else base_label
+    head_label = f"{head_label} ({', '.join(head_models)})" if head_models else head_label
+
+    diff = join_results(base, head)
+    print_report(diff, base_label, head_label, args.by, args.top, args.resamples, args.confidence, args.seed)
+    if args.output:
+        write_diff(diff, args.output)
+        print(f"\n💾 Per-test diff saved: {args.output}")
+    print(f"\n✅ Diffed {len(diff)} tests in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
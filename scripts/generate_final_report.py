@@ -11,6 +11,8 @@ from datetime import datetime
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from results_store import load_combined
+
 # Load environment variables
 load_dotenv()
 
@@ -23,6 +25,9 @@ DOCS_DIR = PROJECT_ROOT / "docs"
 DATA_DIR = PROJECT_ROOT / "data" / "baseline"
 REPORTS_DIR = PROJECT_ROOT / "reports"
 
+# Result fields the report uses; response text is never loaded
+RESULT_COLUMNS = ["test_id", "category", "score"]
+
 def read_markdown_files():
     """Read all analysis markdown files."""
     md_files = {}
@@ -46,14 +51,13 @@ def read_markdown_files():
     return md_files
 
 def read_test_results():
-    """Read combined test results JSON."""
+    """Read combined test results (results store, else combined_results.json)."""
     results_file = DATA_DIR / "combined_results.json"
+    data = load_combined(results_file, RESULT_COLUMNS, round_num=4)
     
-    if results_file.exists():
-        with open(results_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            print(f"✅ Loaded test results: {data['overall_metrics']['total_tests']} tests")
-            return data
+    if data['test_suites']:
+        print(f"✅ Loaded test results: {data['overall_metrics']['total_tests']} tests ({data['model']})")
+        return data
     else:
         print("⚠️ combined_results.json not found")
         return None
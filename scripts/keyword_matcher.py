@@ -0,0 +1,136 @@
+"""
+Qalb Keyword Matcher
+====================
+Multi-pattern keyword matching for test grading.
+
+A test passes a keyword when the normalised keyword occurs anywhere in the
+normalised response. Normalisation (urdu_normalization) lowercases, removes
+Latin and Arabic commas so "1,000" matches "1000", and folds Urdu spelling
+variants: Arabic yeh/kaf/heh, diacritics, Urdu digits, zero-width
+non-joiners and spacing. ``KeywordMatcher`` normalises a test's
+keywords once and compiles them into an Aho–Corasick automaton, so every
+keyword is found in a single pass over the response however many synonyms a
+test lists. Matchers are cached per keyword list.
+
+The automaton comes from pyahocorasick (the ``matching`` extra) and is
+only built for lists of at least AUTOMATON_MIN_KEYWORDS distinct keywords,
+such as the longest synonym lists of the round 4 Roman Urdu suite. Shorter
+lists, which is most of them (about 7 keywords on average), and installs
+without pyahocorasick use one substring scan per pre-normalised keyword
+instead. Both give identical results; the scans are faster for a handful of
+keywords.
+
+``KeywordMatcher.locate`` also reports where each keyword matched, in
+positions of the original response, so analyses can highlight them.
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+from functools import lru_cache
+from typing import List, Tuple, NamedTuple, Sequence
+
+from urdu_normalization import normalize_text, normalize_with_offsets
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+# Below this many keywords, per-keyword substring scans beat the automaton;
+# at about 12 the two break even on typical response lengths
+AUTOMATON_MIN_KEYWORDS = 12
+
+
+class KeywordMatch(NamedTuple):
+    """One keyword occurrence; ``start:end`` slices the original response."""
+    keyword: str
+    start: int
+    end: int
+
+
+def normalize_for_matching(text: str) -> str:
+    """Normalise text for keyword comparison (see urdu_normalization)."""
+    return normalize_text(text)
+
+
+class KeywordMatcher:
+    """All of a test's keywords, normalised and compiled once."""
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(keywords)
+        self.patterns = [normalize_for_matching(kw) for kw in self.keywords]
+        # Keywords that normalise to "" match every response, as a substring test would
+        self._always = {i for i, pattern in enumerate(self.patterns) if not pattern}
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and len(self.patterns) - len(self._always) >= AUTOMATON_MIN_KEYWORDS:
+            self._automaton = ahocorasick.Automaton()
+            by_pattern = {}
+            for index, pattern in enumerate(self.patterns):
+                if pattern:
+                    by_pattern.setdefault(pattern, []).append(index)
+            for pattern, indices in by_pattern.items():
+                self._automaton.add_word(pattern, (len(pattern), tuple(indices)))
+            self._automaton.make_automaton()
+
+    def match(self, response: str) -> Tuple[List[str], List[str]]:
+        """Split keywords into (passed, failed), both in keyword-list order."""
+        normalized = normalize_for_matching(response)
+        passed = []
+        failed = []
+        if self._automaton is None:
+            for keyword, pattern in zip(self.keywords, self.patterns):
+                (passed if pattern in normalized else failed).append(keyword)
+            return passed, failed
+
+        found = set(self._always)
+        for _, (_, indices) in self._automaton.iter(normalized):
+            found.update(indices)
+            if len(found) == len(self.keywords):
+                break
+        for index, keyword in enumerate(self.keywords):
+            (passed if index in found else failed).append(keyword)
+        return passed, failed
+
+    def _spans(self, normalized: str):
+        """``(keyword index, start, end)`` for every occurrence in normalised text."""
+        if self._automaton is not None:
+            for last, (length, indices) in self._automaton.iter(normalized):
+                for index in indices:
+                    yield index, last + 1 - length, last + 1
+            return
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            start = normalized.find(pattern)
+            while start != -1:
+                yield index, start, start + len(pattern)
+                start = normalized.find(pattern, start + 1)
+
+    def locate(self, response: str) -> List[KeywordMatch]:
+        """Every keyword occurrence, with positions in the original response."""
+        normalized, starts, ends = normalize_with_offsets(response)
+        matches = [
+            KeywordMatch(self.keywords[index], starts[start], ends[end - 1])
+            for index, start, end in self._spans(normalized)
+        ]
+        matches.sort(key=lambda m: (m.start, m.end))
+        return matches
+
+
+@lru_cache(maxsize=4096)
+def get_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """Compiled matcher for a keyword list, built once and reused."""
+    return KeywordMatcher(keywords)
+
+
+def match_keywords(response: str, keywords: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """Split keywords into (passed, failed) for a response."""
+    return get_matcher(tuple(keywords)).match(response)
+
+
+def locate_keywords(response: str, keywords: Sequence[str]) -> List[KeywordMatch]:
+    """Positions of every keyword occurrence in a response."""
+    return get_matcher(tuple(keywords)).locate(response)
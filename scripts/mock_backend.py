@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Qalb Mock Backend
+=================
+A deterministic stand-in for a served model, for benchmarking the runner.
+
+``MockBackend`` implements the backend interface in backends.py without a
+model. Each test prompt gets either a canned response (replayed from earlier
+``*_results.json`` files) or a synthesised Urdu one. The request is then
+timed like a real server would time it:
+
+- a per-request overhead drawn from a latency distribution
+  (constant, uniform, normal or lognormal)
+- prefill at ``prefill_tokens_per_second``, then decode at
+  ``decode_tokens_per_second`` with per-token jitter
+- a model load on the first request when ``load_ms`` is set
+- at most ``parallel`` requests served at once; the rest queue, like
+  OLLAMA_NUM_PARALLEL
+
+Failures are injected at configurable rates: connection refused (the runner
+retries these), read timeouts and server errors (it does not). Every draw
+comes from a random generator seeded by the backend seed, the prompt, the
+request's own seed and how many times that request has been sent. A run is
+therefore reproducible at any worker count, and a retried request can
+succeed where its first attempt failed.
+
+``time_scale`` scales every sleep: 0 answers instantly while still
+reporting the simulated durations, which isolates the runner's own
+overhead.
+
+A mock run is recorded as ``qalb-mock`` and written to
+data/backends/mock/qalb-mock/, never over the real model's data/baseline
+results; ``--no-store`` also keeps it out of the results store.
+
+Usage:
+    python scripts/test_runner.py --backend mock --no-store
+    python scripts/runner_benchmark.py --workers 1 4 8
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import contextlib
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, Sequence
+
+from backends import SequentialBatches
+from script_analysis import urdu_char_ratio
+
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal")
+FAILURE_KINDS = ("connection", "timeout", "server_error")
+
+# Vocabulary for synthesised answers, mixed with Urdu words from the prompt
+URDU_WORDS = (
+    "پاکستان", "اسلام", "آباد", "لاہور", "کراچی", "شہر", "ملک", "زبان", "اردو",
+    "تعلیم", "صحت", "پانی", "سورج", "چاند", "دن", "رات", "وقت", "سال", "لوگ",
+    "کتاب", "علم", "دنیا", "تاریخ", "ثقافت", "خوبصورت", "اہم", "بڑا", "نیا",
+    "یہ", "وہ", "ہے", "ہیں", "تھا", "کا", "کی", "کے", "میں", "سے", "اور", "بھی",
+)
+SENTENCE_WORDS = 12
+
+
+@dataclass
+class MockProfile:
+    """How the simulated server behaves. Times are in milliseconds."""
+    latency_ms: float = 40.0                # per-request overhead (median)
+    latency_distribution: str = "lognormal"
+    latency_spread: float = 0.25            # lognormal sigma; normal/uniform: fraction of latency_ms
+    prefill_tokens_per_second: float = 800.0
+    decode_tokens_per_second: float = 40.0
+    decode_jitter: float = 0.1              # ± fraction of each token's decode time
+    response_tokens: int = 60               # mean synthesised length (capped by num_predict)
+    load_ms: float = 0.0                    # model load paid by the first request
+    parallel: int = 0                       # requests served at once (0 = unlimited)
+    connection_error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    server_error_rate: float = 0.0
+    timeout_seconds: float = 30.0           # how long a timed-out request hangs first
+    time_scale: float = 1.0                 # sleep multiplier; 0 = report timings without sleeping
+
+    def __post_init__(self):
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution '{self.latency_distribution}', "
+                f"expected one of {', '.join(LATENCY_DISTRIBUTIONS)}"
+            )
+
+
+def sample_latency(rng: random.Random, profile: MockProfile) -> float:
+    """One request overhead in milliseconds from the profile's distribution."""
+    median, spread = profile.latency_ms, profile.latency_spread
+    if profile.latency_distribution == "constant":
+        return median
+    if profile.latency_distribution == "uniform":
+        return max(0.0, rng.uniform(median * (1 - spread), median * (1 + spread)))
+    if profile.latency_distribution == "normal":
+        return max(0.0, rng.gauss(median, median * spread))
+    # lognormal: the median is exp(mu); spread is sigma
+    return rng.lognormvariate(math.log(max(median, 1e-3)), spread)
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count: one per whitespace-separated word."""
+    return max(1, len(text.split()))
+
+
+def synthesise_response(rng: random.Random, prompt: str, tokens: int) -> str:
+    """Urdu text of ``tokens`` words, drawn from the vocabulary and the prompt's own Urdu words."""
+    prompt_words = [w for w in prompt.split() if urdu_char_ratio(w) > 0.5]
+    vocabulary = list(URDU_WORDS) + prompt_words * 2
+    words = [rng.choice(vocabulary) for _ in range(tokens)]
+    sentences = [" ".join(words[i:i + SENTENCE_WORDS]) + "۔" for i in range(0, len(words), SENTENCE_WORDS)]
+    return " ".join(sentences)
+
+
+def load_canned_responses(paths: Sequence[Path]) -> Dict[str, str]:
+    """Prompt -> response from ``*_results.json`` or ``combined_results.json`` files."""
+    from results_store import load_suites
+
+    responses = {}
+    for suite in load_suites(paths, columns=["prompt", "response", "error"]):
+        for result in suite.get("results", []):
+            if result.get("prompt") and result.get("response") and not result.get("error"):
+                responses[result["prompt"]] = result["response"]
+    return responses
+
+
+class MockBackend(SequentialBatches):
+    """Simulated model server with reproducible latency, token rates and failures."""
+
+    name = "mock"
+
+    def __init__(
+        self,
+        model: str = "qalb-mock",
+        profile: Optional[MockProfile] = None,
+        responses: Optional[Dict[str, str]] = None,
+        seed: int = 0
+    ):
+        self.model = model
+        self.profile = profile or MockProfile()
+        # Canned responses by prompt; other prompts get synthesised answers
+        self.responses = responses or {}
+        self.seed = seed
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.attempts: Dict[str, int] = {}
+        self.slots = threading.BoundedSemaphore(self.profile.parallel) if self.profile.parallel > 0 else None
+        self.totals = {"requests": 0, "generated_tokens": 0, "simulated_seconds": 0.0,
+                       **{kind: 0 for kind in FAILURE_KINDS}}
+
+    def sleep(self, ms: float):
+        if ms > 0 and self.profile.time_scale > 0:
+            time.sleep(ms / 1000 * self.profile.time_scale)
+
+    def plan(self, prompt: str, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Decide a request's outcome, text and timings up front, reproducibly."""
+        options = options or {}
+        key = f"{prompt}\x00{options.get('seed')}"
+        with self.lock:
+            attempt = self.attempts.get(key, 0)
+            self.attempts[key] = attempt + 1
+            load_ms = 0.0 if self.loaded else self.profile.load_ms
+            self.loaded = True
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+        profile = self.profile
+
+        roll = rng.random()
+        failure = None
+        for kind, rate in zip(FAILURE_KINDS, (profile.connection_error_rate, profile.timeout_rate,
+                                              profile.server_error_rate)):
+            if roll < rate:
+                failure = kind
+                break
+            roll -= rate
+
+        budget = options.get("num_predict") or 0
+        if prompt in self.responses:
+            words = self.responses[prompt].split()
+        else:
+            length = max(1, round(rng.gauss(profile.response_tokens, profile.response_tokens * 0.3)))
+            words = synthesise_response(rng, prompt, length).split()
+        truncated = budget > 0 and len(words) > budget
+        words = words[:budget] if truncated else words
+
+        prompt_tokens = count_tokens(prompt)
+        token_ms = 1000 / profile.decode_tokens_per_second
+        jitter = profile.decode_jitter
+        return {
+            "failure": failure,
+            "words": words,
+            "done_reason": "length" if truncated else "stop",
+            "prompt_tokens": prompt_tokens,
+            "load_ms": load_ms,
+            "overhead_ms": sample_latency(rng, profile),
+            "prefill_ms": prompt_tokens / profile.prefill_tokens_per_second * 1000,
+            "token_ms": [token_ms * rng.uniform(1 - jitter, 1 + jitter) for _ in words],
+        }
+
+    def fail(self, plan: Dict[str, Any]):
+        """Raise the planned failure the way the ollama/httpx clients report it."""
+        hang_ms = self.profile.timeout_seconds * 1000 if plan["failure"] == "timeout" else 0.0
+        with self.lock:
+            self.totals[plan["failure"]] += 1
+            self.totals["simulated_seconds"] += hang_ms / 1000
+        if plan["failure"] == "connection":
+            raise ConnectionRefusedError(111, "Connection refused")
+        if plan["failure"] == "timeout":
+            self.sleep(hang_ms)
+            raise TimeoutError("timed out")
+        raise RuntimeError("mock server error (status code: 500)")
+
+    def response(self, plan: Dict[str, Any], text: str) -> Dict[str, Any]:
+        """Ollama-style final response for a planned request."""
+        prefill_ms = plan["overhead_ms"] + plan["prefill_ms"]
+        eval_ms = sum(plan["token_ms"])
+        total_ms = plan["load_ms"] + prefill_ms + eval_ms
+        with self.lock:
+            self.totals["requests"] += 1
+            self.totals["generated_tokens"] += len(plan["words"])
+            self.totals["simulated_seconds"] += total_ms / 1000
+        return {
+            "model": self.model,
+            "response": text,
+            "done": True,
+            "done_reason": plan["done_reason"],
+            "prompt_eval_count": plan["prompt_tokens"],
+            "eval_count": len(plan["words"]),
+            "load_duration": int(plan["load_ms"] * 1e6),
+            "prompt_eval_duration": int(prefill_ms * 1e6),
+            "eval_duration": int(eval_ms * 1e6),
+            "total_duration": int(total_ms * 1e6),
+        }
+
+    def generate(
+        self,
+        model: Optional[str] = None,
+        prompt: str = "",
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        **kwargs
+    ) -> Any:
+        plan = self.plan(prompt, options)
+        if stream:
+            return self.stream(plan)
+        with self.slot():
+            if plan["failure"]:
+                self.fail(plan)
+            self.sleep(plan["load_ms"] + plan["overhead_ms"] + plan["prefill_ms"] + sum(plan["token_ms"]))
+        return self.response(plan, " ".join(plan["words"]))
+
+    def stream(self, plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Ollama-style chunks, one per word; closing the iterator frees the slot."""
+        with self.slot():
+            if plan["failure"]:
+                self.fail(plan)
+            self.sleep(plan["load_ms"] + plan["overhead_ms"] + plan["prefill_ms"])
+            last = len(plan["words"]) - 1
+            for i, (word, ms) in enumerate(zip(plan["words"], plan["token_ms"])):
+                self.sleep(ms)
+                yield {"model": self.model, "response": word + (" " if i < last else ""), "done": False}
+        yield {**self.response(plan, ""), "response": ""}
+
+    def slot(self):
+        """Context manager holding one of the ``parallel`` serving slots (a no-op when unlimited)."""
+        return self.slots if self.slots else contextlib.nullcontext()
+
+    def health(self) -> bool:
+        return True
+
+    def metadata(self) -> Dict[str, Any]:
+        profile = asdict(self.profile)
+        fingerprint = json.dumps({"profile": profile, "seed": self.seed, "canned": len(self.responses)},
+                                 sort_keys=True)
+        return {
+            "backend": self.name,
+            "model": self.model,
+            "seed": self.seed,
+            "canned_responses": len(self.responses),
+            "profile": profile,
+            "digest": f"{self.name}:{hashlib.sha256(fingerprint.encode()).hexdigest()[:12]}",
+        }
+
+    def describe(self) -> str:
+        p = self.profile
+        source = f"{len(self.responses)} canned responses" if self.responses else "synthesised responses"
+        return (f"Mock {self.model} ({source}, {p.latency_distribution} {p.latency_ms:g}ms overhead, "
+                f"{p.decode_tokens_per_second:g} tok/s, time scale {p.time_scale:g})")
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.totals)
+
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Qalb Results Analysis
+=====================
+Vectorised statistics over test results, shared by the analyze_* scripts.
+
+A round's results are loaded once (from the columnar results store, or
+the ``*_results.json`` files when the store has none) into a pandas
+DataFrame with one row per test. Each row is joined on ``test_id`` to its
+test definition's ``difficulty``. All statistics are then group-bys over
+that frame:
+
+- ``group_stats``: tests, errors, score mean/median/std/min/max, pass
+  rate, latency percentiles, decode speed and Urdu ratio per group
+- ``score_distribution``: test counts per score band
+- ``latency_percentiles``: response time percentiles per group
+- ``output_mix``: pure Urdu / mixed / mostly English output counts
+- ``keyword_stats``: keyword pass rate, perfect and zero-match tests
+- ``compare_rounds``: average score per round and script
+
+Like ``calculate_suite_metrics``, score and latency statistics only cover
+tests that completed without an error.
+
+Usage:
+    python scripts/qalb_analysis.py --round 4
+    python scripts/qalb_analysis.py --round 2 4 --by category difficulty
+    python scripts/qalb_analysis.py --round 1 2 3 4 --compare-only
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import argparse
+import json
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, List, Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from results_store import STORE_DIR, load_suites, round_from_test_file
+from test_runner import DATA_DIR, TESTS_DIR
+
+
+# Score a test needs to count as passed
+PASS_SCORE = 70
+
+# Score bands, lowest first; each band is [edge, next edge)
+SCORE_EDGES = [-np.inf, 60, 70, 75, 80, 85, 90, 95, np.inf]
+SCORE_BANDS = [
+    "<60 (Critical)", "60-69 (Poor)", "70-74 (Below Avg)", "75-79 (Average)",
+    "80-84 (Above Avg)", "85-89 (Good)", "90-94 (Very Good)", "95-100 (Excellent)",
+]
+
+# Urdu character ratio bands for the script of the model's output
+OUTPUT_EDGES = [-np.inf, 0.3, 0.95, np.inf]
+OUTPUT_BANDS = ["Mostly English (<30%)", "Mixed (30-95%)", "Pure Urdu (>95%)"]
+
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+# Result fields the standard report reads; prompt/response text is never loaded
+REPORT_COLUMNS = [
+    "test_id", "category", "script_type", "score", "response_time_ms", "tokens_per_second",
+    "urdu_char_ratio", "passed_keywords", "failed_keywords", "error",
+]
+
+# Test file per script for each round's JSON results (round 1 files are unnumbered)
+SUITE_DIRS = {"urdu": "urdu_script", "roman": "roman_urdu"}
+SUITE_PREFIXES = {"urdu": "urdu_script_tests", "roman": "roman_urdu_tests"}
+
+
+# ============================================================
+# Loading
+# ============================================================
+
+def round_test_file(script_type: str, round_num: int) -> str:
+    """Test definition file name for a script and round."""
+    suffix = "" if round_num == 1 else f"_round{round_num}"
+    return f"{SUITE_PREFIXES[script_type]}{suffix}.json"
+
+
+def round_json_paths(round_num: int, data_dir: Path = DATA_DIR) -> List[Path]:
+    """JSON results files that may hold a round: per-suite files, then the combined file."""
+    baseline = data_dir / "baseline"
+    paths = [
+        baseline / SUITE_DIRS[script] / round_test_file(script, round_num).replace(".json", "_results.json")
+        for script in SUITE_DIRS
+    ]
+    paths.append(baseline / "combined_results.json")
+    return paths
+
+
+@lru_cache(maxsize=None)
+def test_definitions(test_file: str) -> pd.DataFrame:
+    """``test_id`` and ``difficulty`` of a baseline test file (empty if it is missing)."""
+    path = TESTS_DIR / "baseline" / test_file
+    if not test_file or not path.is_file():
+        return pd.DataFrame(columns=["test_id", "difficulty"])
+    with open(path, 'r', encoding='utf-8') as f:
+        cases = json.load(f).get("test_cases", [])
+    return pd.DataFrame(
+        [(tc["id"], tc.get("difficulty")) for tc in cases], columns=["test_id", "difficulty"]
+    ).drop_duplicates("test_id")
+
+
+def script_from_test_file(test_file: str) -> str:
+    """Script type of a suite from its test file name."""
+    return "roman" if test_file.startswith("roman") else "urdu"
+
+
+def suite_frame(suite: Dict, round_num: int) -> pd.DataFrame:
+    """One row per result of a suite summary, with suite and definition fields added."""
+    frame = pd.DataFrame(suite.get("results", []))
+    test_file = suite.get("test_file") or ""
+    frame["round"] = round_num
+    frame["test_file"] = test_file
+    frame["model"] = suite.get("model")
+    if "script_type" not in frame or frame["script_type"].isna().all():
+        frame["script_type"] = suite.get("script_type") or script_from_test_file(test_file)
+    if "test_id" in frame and "difficulty" not in frame:
+        frame = frame.merge(test_definitions(test_file), on="test_id", how="left")
+    return frame
+
+
+def add_derived(frame: pd.DataFrame) -> pd.DataFrame:
+    """Columns computed from the stored fields: failed/passed flags, keyword counts."""
+    frame["failed"] = frame["error"].notna() & (frame["error"] != "") if "error" in frame else False
+    if "score" in frame:
+        frame["passed"] = frame["score"] >= PASS_SCORE
+    if "passed_keywords" in frame and "failed_keywords" in frame:
+        frame["keywords_passed"] = frame["passed_keywords"].str.len().fillna(0).astype(int)
+        frame["keywords_total"] = frame["keywords_passed"] + frame["failed_keywords"].str.len().fillna(0).astype(int)
+    return frame
+
+
+def load_round(
+    round_num: int,
+    columns: Optional[Sequence[str]] = REPORT_COLUMNS,
+    model: Optional[str] = None,
+    store_dir: Path = STORE_DIR,
+    data_dir: Path = DATA_DIR
+) -> pd.DataFrame:
+    """All results of a round as one DataFrame, read in a single load.
+
+    ``columns`` are the result fields to read (None for all of them);
+    ``round``, ``test_file``, ``model``, ``script_type`` and ``difficulty``
+    are always added. The round is read for one model: ``model``, else the
+    only model with results, else the runner's default; several models and
+    none of them the default raise ValueError. Only suites whose test file
+    belongs to the round are kept, the newest run per test file.
+    """
+    suites = load_suites(round_json_paths(round_num, data_dir), columns,
+                         round_num=round_num, model=model, store_dir=store_dir)
+    frames = [suite_frame(suite, round_num) for suite in suites]
+    if not frames:
+        return pd.DataFrame(columns=list(columns or []) + ["round", "test_file", "model", "script_type"])
+    print(f"📊 Round {round_num}: {suites[0].get('model') or 'unknown model'}")
+    return add_derived(pd.concat(frames, ignore_index=True))
+
+
+def add_model_argument(parser: argparse.ArgumentParser):
+    """The ``--model`` option of the analysis scripts."""
+    parser.add_argument("--model", help="Model to analyse (default: the only model with results, "
+                                        "else the runner's default model)")
+
+
+def load_file(path: Path, columns: Optional[Sequence[str]] = REPORT_COLUMNS) -> pd.DataFrame:
+    """All results of one JSON results file (per-suite or combined) as a DataFrame."""
+    if not Path(path).is_file():
+        raise FileNotFoundError(f"Results file not found: {path}")
+    suites = load_suites([path], columns)
+    frames = [suite_frame(s, s.get("round") or round_from_test_file(s.get("test_file") or "")) for s in suites]
+    if not frames:
+        return pd.DataFrame(columns=list(columns or []) + ["round", "test_file", "model", "script_type"])
+    return add_derived(pd.concat(frames, ignore_index=True))
+
+
+def load_rounds(rounds: Sequence[int], columns: Optional[Sequence[str]] = REPORT_COLUMNS, **kwargs) -> pd.DataFrame:
+    """Results of several rounds in one frame, one load per round."""
+    frames = [load_round(r, columns, **kwargs) for r in rounds]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=list(columns or []) + ["round", "test_file", "model", "script_type"])
+    return pd.concat(frames, ignore_index=True)
+
+
+# ============================================================
+# Statistics
+# ============================================================
+
+def _grouped(frame: pd.DataFrame, by: Sequence[str]):
+    """Group by ``by``, or treat the whole frame as one group when it is empty."""
+    if not by:
+        return frame.assign(group="all").groupby("group", sort=False), ["group"]
+    return frame.groupby(list(by), sort=True, dropna=False), list(by)
+
+
+def successful(frame: pd.DataFrame) -> pd.DataFrame:
+    """Rows of tests that completed without an error."""
+    return frame[~frame["failed"]] if "failed" in frame else frame
+
+
+def group_stats(frame: pd.DataFrame, by: Sequence[str] = ("category",),
+                percentiles: Sequence[int] = (50, 90)) -> pd.DataFrame:
+    """Score, pass rate, latency, speed and Urdu ratio statistics per group."""
+    errors = _grouped(frame, by)[0].size() - _grouped(successful(frame), by)[0].size()
+    grouped, keys = _grouped(successful(frame), by)
+    stats = grouped.agg(
+        tests=("score", "size"),
+        score_mean=("score", "mean"),
+        score_median=("score", "median"),
+        score_std=("score", "std"),
+        score_min=("score", "min"),
+        score_max=("score", "max"),
+        pass_rate=("passed", "mean"),
+        time_mean_s=("response_time_ms", "mean"),
+        tokens_per_second=("tokens_per_second", "mean"),
+        urdu_ratio=("urdu_char_ratio", "mean"),
+    )
+    stats.insert(1, "errors", errors.reindex(stats.index).fillna(0).astype(int))
+    stats["pass_rate"] *= 100
+    stats["time_mean_s"] /= 1000
+    stats["urdu_ratio"] *= 100
+    if percentiles:
+        latency = latency_percentiles(frame, by, percentiles) / 1000
+        latency.columns = [c.replace("_ms", "_s") for c in latency.columns]
+        stats = stats.join(latency)
+    stats["score_std"] = stats["score_std"].fillna(0.0)
+    return stats
+
+
+def latency_percentiles(frame: pd.DataFrame, by: Sequence[str] = ("category",),
+                        percentiles: Sequence[int] = LATENCY_PERCENTILES) -> pd.DataFrame:
+    """Response time percentiles (ms, linear interpolation) per group."""
+    grouped, keys = _grouped(successful(frame), by)
+    table = grouped["response_time_ms"].quantile([p / 100 for p in percentiles]).unstack()
+    table.columns = [f"p{p}_ms" for p in percentiles]
+    return table
+
+
+def score_distribution(frame: pd.DataFrame, by: Sequence[str] = ("script_type",)) -> pd.DataFrame:
+    """Number of tests per score band (columns, best band first) per group."""
+    ok = successful(frame)
+    bands = pd.cut(ok["score"], SCORE_EDGES, right=False, labels=SCORE_BANDS)
+    grouped, keys = _grouped(ok.assign(band=bands), by)
+    table = grouped["band"].value_counts().unstack(fill_value=0)
+    return table.reindex(columns=SCORE_BANDS[::-1], fill_value=0)
+
+
+def output_mix(frame: pd.DataFrame, by: Sequence[str] = ("script_type",)) -> pd.DataFrame:
+    """Number of tests answered in pure Urdu, mixed script or mostly English per group."""
+    ok = successful(frame)
+    bands = pd.cut(ok["urdu_char_ratio"], OUTPUT_EDGES, right=False, labels=OUTPUT_BANDS)
+    grouped, keys = _grouped(ok.assign(band=bands), by)
+    table = grouped["band"].value_counts().unstack(fill_value=0)
+    return table.reindex(columns=OUTPUT_BANDS[::-1], fill_value=0)
+
+
+def keyword_stats(frame: pd.DataFrame, by: Sequence[str] = ("script_type",)) -> pd.DataFrame:
+    """Keyword pass rate and perfect / zero-match test counts per group."""
+    ok = successful(frame)
+    grouped, keys = _grouped(ok.assign(
+        perfect=ok["keywords_passed"] == ok["keywords_total"],
+        zero_match=ok["keywords_passed"] == 0,
+    ), by)
+    stats = grouped.agg(
+        tests=("test_id", "size"),
+        keywords_passed=("keywords_passed", "sum"),
+        keywords_total=("keywords_total", "sum"),
+        perfect=("perfect", "sum"),
+        zero_match=("zero_match", "sum"),
+    )
+    stats["keyword_pass_rate"] = stats["keywords_passed"] / stats["keywords_total"].where(stats["keywords_total"] > 0) * 100
+    return stats
+
+
+def compare_rounds(frame: pd.DataFrame) -> pd.DataFrame:
+    """Average score per round (rows) and script (columns), with the combined change.
+
+    ``combined`` averages the per-script averages, as combined_results.json
+    does.
+    """
+    table = successful(frame).pivot_table(index="round", columns="script_type", values="score", aggfunc="mean")
+    table["combined"] = table.mean(axis=1)
+    table["change"] = table["combined"].diff()
+    return table
+
+
+# ============================================================
+# Report
+# ============================================================
+
+def print_table(title: str, table: pd.DataFrame, float_format: str = "{:.1f}"):
+    """Print a statistics table under a section header."""
+    print(f"\n{'='*70}")
+    print(title)
+    print(f"{'='*70}")
+    if table.empty:
+        print("  (no results)")
+        return
+    print(table.to_string(float_format=float_format.format))
+
+
+def report_round(frame: pd.DataFrame, round_num: int, by: Sequence[Sequence[str]]):
+    """Print the standard statistics for one round's results."""
+    title = f"ROUND {round_num}"
+    print_table(f"{title} - OVERVIEW BY SCRIPT", group_stats(frame, ["script_type"], LATENCY_PERCENTILES))
+    for keys in by:
+        print_table(f"{title} - BY {' / '.join(k.upper() for k in keys)}", group_stats(frame, keys))
+    print_table(f"{title} - SCORE DISTRIBUTION", score_distribution(frame), "{:.0f}")
+    print_table(f"{title} - OUTPUT SCRIPT", output_mix(frame), "{:.0f}")
+    print_table(f"{title} - KEYWORD MATCHING", keyword_stats(frame))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Statistics over Qalb test results for one or more rounds.")
+    parser.add_argument("--round", type=int, nargs="+", dest="rounds", default=[4], help="Rounds to analyse (default: 4)")
+    parser.add_argument("--by", nargs="+", default=["category"],
+                        help="Group-by columns; join columns with + for nested groups, e.g. category+script_type "
+                             "(default: category)")
+    add_model_argument(parser)
+    parser.add_argument("--store", type=Path, default=STORE_DIR, help=f"Results store directory (default: {STORE_DIR})")
+    parser.add_argument("--compare-only", action="store_true", help="Only print the round comparison")
+    return parser.parse_args(argv)
+
+
+def main():
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = parse_args()
+    by = [spec.split("+") for spec in args.by]
+
+    try:
+        frame = load_rounds(args.rounds, model=args.model, store_dir=args.store)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if frame.empty:
+        print(f"⚠️  No results for round(s) {', '.join(map(str, args.rounds))}")
+        sys.exit(1)
+
+    if not args.compare_only:
+        for round_num, round_frame in frame.groupby("round", sort=True):
+            report_round(round_frame, round_num, by)
+    if frame["round"].nunique() > 1 or args.compare_only:
+        print_table("ROUND COMPARISON (average score)", compare_rounds(frame))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Qalb Quantisation Sweep
+=======================
+Runs the same baseline across several model tags (e.g. fp16, q8_0 and
+q4_K_M builds of Qalb) and compares what each costs against what it scores.
+
+For every tag the sweep:
+
+1. unloads the model, so the warm-up measures a cold load
+2. runs the baseline suites through QalbTestRunner (results and checkpoints
+   work as in a normal run, one directory per tag)
+3. records quality (average score), decode tokens/s, TTFT, model load time,
+   the model's memory as Ollama reports it (``ollama ps``), and the peak
+   RSS of the local Ollama processes, sampled while the tag runs
+4. unloads the model again, so the next tag is measured on its own
+
+The variants are compared in a Pareto table. A variant is on the frontier
+when no other variant is at least as good on every measure and better on
+one: higher score and decode speed; lower TTFT, memory and load time. The
+cheapest variant (least memory, then fastest load) whose score holds
+``--min-score`` is recommended.
+
+Runs are written to a results store inside the sweep directory, never to
+data/results_store: a sampled suite is not a baseline run, and the round's
+loaders must not pick it up. Read it with ``--store <sweep>/results_store``.
+
+Peak RSS is only sampled when Ollama runs on this machine (OLLAMA_HOST
+unset or local) and psutil is installed. Re-running with the same
+``--output-dir`` resumes unfinished tags from their checkpoints.
+
+Usage:
+    python scripts/quant_sweep.py
+    python scripts/quant_sweep.py --quants fp16 q8_0 q4_K_M --min-score 75 --sample 40
+    python scripts/quant_sweep.py --models qalb-fp16 qalb-q4 --pull --stream
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Sequence, Tuple
+from urllib.parse import urlparse
+
+from test_runner import (
+    QalbTestRunner, OLLAMA_AVAILABLE, PSUTIL_AVAILABLE, DATA_DIR, DEFAULT_WORKERS,
+    baseline_test_files, calculate_overall_metrics, describe_error
+)
+from results_store import ResultsStore, PYARROW_AVAILABLE
+
+if OLLAMA_AVAILABLE:
+    import ollama
+
+if PSUTIL_AVAILABLE:
+    import psutil
+
+
+# Qalb tags are <base>-<quantisation>
+BASE_TAG = "enstazao/qalb:8b-instruct"
+DEFAULT_QUANTS = ["fp16", "q8_0", "q4_K_M"]
+DEFAULT_MIN_SCORE = 70.0
+SWEEP_DIR = DATA_DIR / "sweeps"
+RSS_SAMPLE_SECONDS = 0.5
+LOCAL_HOSTS = ("", "localhost", "127.0.0.1", "0.0.0.0", "::1")
+
+# (column, direction) pairs compared on the Pareto frontier
+OBJECTIVES = (
+    ("average_score", "max"),
+    ("decode_tokens_per_second", "max"),
+    ("ttft_ms", "min"),
+    ("memory_mb", "min"),
+    ("load_ms", "min"),
+)
+
+
+# ============================================================
+# Measurements
+# ============================================================
+
+def ollama_is_local() -> bool:
+    """Whether the Ollama server (OLLAMA_HOST) runs on this machine."""
+    host = os.environ.get("OLLAMA_HOST", "")
+    return (urlparse(host if "://" in host else f"http://{host}").hostname or "") in LOCAL_HOSTS
+
+
+def ollama_processes() -> List["psutil.Process"]:
+    """The Ollama server and its model runner processes."""
+    processes = []
+    for proc in psutil.process_iter(["name", "cmdline"]):
+        try:
+            name = (proc.info["name"] or "").lower()
+            command = " ".join(proc.info["cmdline"] or []).lower()
+            if "ollama" in name or "ollama" in command.split(" ", 1)[0]:
+                processes.append(proc)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return processes
+
+
+class RssSampler:
+    """Samples the combined RSS of the Ollama processes on a background thread."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak_bytes = 0
+        self.enabled = PSUTIL_AVAILABLE and ollama_is_local()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self):
+        total = 0
+        for proc in ollama_processes():
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        self.peak_bytes = max(self.peak_bytes, total)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self) -> "RssSampler":
+        if self.enabled:
+            self.sample()
+            self._thread = threading.Thread(target=self._run, name="qalb-rss", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self.sample()
+
+    @property
+    def peak_mb(self) -> Optional[float]:
+        return self.peak_bytes / 2**20 if self.enabled and self.peak_bytes else None
+
+
+def field_of(item: Any, name: str, default: Any = None) -> Any:
+    """Read a field from an ollama response, whether a dict or a response object."""
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def installed_models() -> List[str]:
+    return [field_of(m, "model") or field_of(m, "name") or "" for m in field_of(ollama.list(), "models", [])]
+
+
+def is_installed(tag: str, installed: Sequence[str]) -> bool:
+    return tag in installed or f"{tag}:latest" in installed
+
+
+def resident_memory(tag: str) -> Tuple[Optional[float], Optional[float]]:
+    """(total, VRAM) MiB that Ollama reports for a loaded model, or Nones."""
+    try:
+        for m in field_of(ollama.ps(), "models", []) or []:
+            if (field_of(m, "model") or field_of(m, "name")) in (tag, f"{tag}:latest"):
+                return (field_of(m, "size", 0) or 0) / 2**20, (field_of(m, "size_vram", 0) or 0) / 2**20
+    except Exception:
+        pass
+    return None, None
+
+
+def unload(tag: str):
+    """Ask Ollama to evict a model now (keep_alive 0)."""
+    try:
+        ollama.generate(model=tag, prompt="", keep_alive=0)
+    except Exception:
+        pass
+
+
+def sample_test_file(source: Path, count: Optional[int], destination: Path) -> Path:
+    """``source`` cut down to ``count`` evenly spaced tests (the file itself when count is None)."""
+    if not count:
+        return source
+    with open(source, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    tests = data.get("test_cases", [])
+    step = max(1, len(tests) // count)
+    data["test_cases"] = tests[::step][:count]
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    with open(destination, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return destination
+
+
+def tag_slug(tag: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", tag)
+
+
+# ============================================================
+# Sweep
+# ============================================================
+
+def run_variant(
+    tag: str,
+    test_files: Sequence[Path],
+    output_dir: Path,
+    workers: int,
+    stream: bool,
+    results_store: Optional[ResultsStore]
+) -> Dict[str, Any]:
+    """Run the baseline on one tag and return its sweep row."""
+    print(f"\n{'='*60}")
+    print(f"VARIANT: {tag}")
+    print(f"{'='*60}")
+    variant_dir = output_dir / tag_slug(tag)
+    runner = QalbTestRunner(model_name=tag, workers=workers, stream=stream, results_store=results_store,
+                            output_dir=variant_dir, checkpoint_dir=variant_dir / "checkpoints")
+    unload(tag)
+    start = time.time()
+    with RssSampler() as rss:
+        if not runner.initialize():
+            return {"model": tag, "error": "Prerequisites check failed"}
+        memory_mb, vram_mb = resident_memory(tag)
+        summaries = [runner.run_test_suite(f, variant_dir / f.stem) for f in test_files]
+    unload(tag)
+
+    overall = calculate_overall_metrics(summaries)
+    loads = [s["load_duration_ms"] for s in runner.warm_up_stats]
+    return {
+        "model": tag,
+        "quantization": runner.backend_info.get("quantization"),
+        "average_score": overall["average_score"],
+        "decode_tokens_per_second": overall["average_tokens_per_second"],
+        # 0 means no test measured TTFT; None keeps it out of the comparison
+        "ttft_ms": overall["average_ttft_ms"] or None,
+        "load_ms": max(loads) if loads else None,
+        "peak_rss_mb": rss.peak_mb,
+        "model_memory_mb": memory_mb,
+        "vram_mb": vram_mb,
+        # Memory compared on the frontier: measured RSS, else Ollama's own figure
+        "memory_mb": rss.peak_mb or memory_mb,
+        "total_tests": overall["total_tests"],
+        "failed_tests": overall["failed_tests"],
+        "wall_time_s": time.time() - start,
+        "results_dir": str(variant_dir),
+    }
+
+
+def dominates(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    """Whether ``a`` is at least as good as ``b`` on every measure both have, and better on one."""
+    better = False
+    for key, direction in OBJECTIVES:
+        if a.get(key) is None or b.get(key) is None:
+            continue
+        x, y = (a[key], b[key]) if direction == "max" else (-a[key], -b[key])
+        if x < y:
+            return False
+        better = better or x > y
+    return better
+
+
+def mark_pareto(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Set ``pareto`` on every completed row: True unless another row dominates it."""
+    completed = [r for r in rows if not r.get("error")]
+    for row in completed:
+        row["pareto"] = not any(dominates(other, row) for other in completed if other is not row)
+    return rows
+
+
+def recommend(rows: List[Dict[str, Any]], min_score: float) -> Optional[Dict[str, Any]]:
+    """Cheapest completed variant scoring at least ``min_score``: least memory, then fastest load."""
+    holding = [r for r in rows if not r.get("error") and r["average_score"] >= min_score]
+    if not holding:
+        return None
+    return min(holding, key=lambda r: (
+        r["memory_mb"] if r["memory_mb"] is not None else float("inf"),
+        r["load_ms"] if r["load_ms"] is not None else float("inf"),
+        -r["decode_tokens_per_second"],
+    ))
+
+
+def format_value(value: Optional[float], fmt: str) -> str:
+    return "n/a" if value is None else format(value, fmt)
+
+
+def pareto_table(rows: List[Dict[str, Any]], min_score: float) -> str:
+    """The sweep as a markdown table, frontier variants marked ★."""
+    lines = [
+        "| Model | Quant | Score | Decode tok/s | TTFT ms | Peak RSS MB | Model MB | Load s | Pareto |",
+        "|-------|-------|------:|-------------:|--------:|------------:|---------:|-------:|:------:|",
+    ]
+    for r in rows:
+        if r.get("error"):
+            lines.append(f"| {r['model']} | – | {r['error']} | | | | | | |")
+            continue
+        holds = "" if r["average_score"] >= min_score else " ⚠️"
+        load_s = r["load_ms"] / 1000 if r["load_ms"] is not None else None
+        lines.append(
+            f"| {r['model']} | {r.get('quantization') or '–'} | {r['average_score']:.1f}{holds} | "
+            f"{r['decode_tokens_per_second']:.1f} | {format_value(r['ttft_ms'], '.0f')} | "
+            f"{format_value(r['peak_rss_mb'], '.0f')} | {format_value(r['model_memory_mb'], '.0f')} | "
+            f"{format_value(load_s, '.1f')} | {'★' if r.get('pareto') else ''} |"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare quantised model variants on the baseline.")
+    parser.add_argument("--models", nargs="+", metavar="TAG", help="Ollama tags to sweep (overrides --quants)")
+    parser.add_argument("--base", default=BASE_TAG, help=f"Tag prefix for --quants (default: {BASE_TAG})")
+    parser.add_argument("--quants", nargs="+", default=DEFAULT_QUANTS,
+                        help=f"Quantisations to sweep as <base>-<quant> (default: {' '.join(DEFAULT_QUANTS)})")
+    parser.add_argument("--round", type=int, default=4, dest="round_num", help="Baseline round (1-4)")
+    parser.add_argument("--sample", type=int, default=None, metavar="N",
+                        help="Run N evenly spaced tests per suite instead of all of them")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE,
+                        help=f"Score a variant must hold to be recommended (default: {DEFAULT_MIN_SCORE:g})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent requests")
+    parser.add_argument("--stream", action="store_true", help="Measure TTFT on the client by streaming")
+    parser.add_argument("--pull", action="store_true", help="Pull tags that aren't installed")
+    parser.add_argument("--no-store", action="store_true",
+                        help="Don't write runs to the sweep's results store (<output-dir>/results_store)")
+    parser.add_argument("--output-dir", type=Path, default=None,
+                        help="Sweep directory; reuse one to resume (default: data/sweeps/<timestamp>)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if not OLLAMA_AVAILABLE:
+        print("❌ Ollama Python package not installed. Run: pip install ollama")
+        sys.exit(1)
+
+    tags = args.models or [f"{args.base}-{q}" for q in args.quants]
+    output_dir = args.output_dir or SWEEP_DIR / datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # The sweep's own store, so partial suites never land in the baseline partitions
+    results_store = ResultsStore(output_dir / "results_store") if PYARROW_AVAILABLE and not args.no_store else None
+
+    print("\n" + "="*60)
+    print("QALB QUANTISATION SWEEP")
+    print("fawadhs.dev")
+    print("="*60)
+    print(f"   Variants: {', '.join(tags)}")
+    if not (PSUTIL_AVAILABLE and ollama_is_local()):
+        print("   ℹ️  Peak RSS needs psutil and a local Ollama; using Ollama's reported model size")
+
+    test_files = [
+        sample_test_file(f, args.sample, output_dir / "tests" / f.name)
+        for f in baseline_test_files(args.round_num) if f.exists()
+    ]
+    if not test_files:
+        print(f"❌ No baseline test files for round {args.round_num}")
+        sys.exit(1)
+
+    try:
+        installed = installed_models()
+    except Exception as e:
+        print(f"❌ Could not reach Ollama: {describe_error(e)}")
+        sys.exit(1)
+
+    rows = []
+    for tag in tags:
+        if not is_installed(tag, installed):
+            if not args.pull:
+                print(f"\n⚠️  {tag} is not installed (run: ollama pull {tag}, or pass --pull); skipping")
+                rows.append({"model": tag, "error": "not installed"})
+                continue
+            print(f"\n⏳ Pulling {tag}...")
+            try:
+                ollama.pull(tag)
+            except Exception as e:
+                print(f"   ❌ Pull failed: {describe_error(e)}")
+                rows.append({"model": tag, "error": "pull failed"})
+                continue
+        try:
+            rows.append(run_variant(tag, test_files, output_dir, args.workers, args.stream, results_store))
+        except KeyboardInterrupt:
+            print(f"\n⚠️  Sweep interrupted during {tag}. Re-run with --output-dir {output_dir} to resume.")
+            return
+
+    mark_pareto(rows)
+    best = recommend(rows, args.min_score)
+    table = pareto_table(rows, args.min_score)
+
+    sweep = {
+        "timestamp": datetime.now().isoformat(),
+        "round": args.round_num,
+        "sample": args.sample,
+        "min_score": args.min_score,
+        "variants": rows,
+        "recommended": best["model"] if best else None,
+    }
+    with open(output_dir / "sweep.json", 'w', encoding='utf-8') as f:
+        json.dump(sweep, f, ensure_ascii=False, indent=2)
+    with open(output_dir / "sweep.md", 'w', encoding='utf-8') as f:
+        f.write(f"# Quantisation Sweep (round {args.round_num})\n\n{table}\n")
+
+    print(f"\n{'='*60}")
+    print("SWEEP COMPLETE")
+    print(f"{'='*60}\n")
+    print(table)
+    print("\n★ Pareto frontier: no other variant is as good on every measure and better on one")
+    if best:
+        print(f"\n✅ Cheapest variant holding {args.min_score:g}: {best['model']} "
+              f"(score {best['average_score']:.1f}, {format_value(best['memory_mb'], '.0f')} MB)")
+    else:
+        print(f"\n⚠️  No variant holds a score of {args.min_score:g}")
+    print(f"Results: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,8 @@ SUCCESS_COLOR = colors.HexColor("#10B981")  # Green 500
 WARNING_COLOR = colors.HexColor("#F59E0B")  # Amber 500
 ERROR_COLOR = colors.HexColor("#EF4444")  # Red 500
 
+METRIC_CARDS_PER_ROW = 4
+
 
 # ============================================================
 # CUSTOM PAGE TEMPLATE WITH BRANDING
@@ -412,12 +414,8 @@ class QalbReportGenerator:
         
         elements.append(Paragraph("Key Metrics", self.styles['SectionHeader']))
         
-        metrics = results.get('metrics', {
-            'overall_score': '90.34',
-            'tests_passed': '127/140',
-            'urdu_purity': '95.31%',
-            'avg_response_time': '45s',
-        })
+        # Cards given by the caller, else measured from the runner's results
+        metrics = results.get('metrics') or measured_metrics(results)
         
         # Create metric cards
         metric_cards = []
@@ -428,9 +426,10 @@ class QalbReportGenerator:
             ]
             metric_cards.append(Table(card_content, colWidths=[40*mm]))
         
-        # Arrange in a row
-        if metric_cards:
-            metrics_row = Table([metric_cards], colWidths=[42*mm] * len(metric_cards))
+        # Arrange in rows of four
+        for i in range(0, len(metric_cards), METRIC_CARDS_PER_ROW):
+            row = metric_cards[i:i + METRIC_CARDS_PER_ROW]
+            metrics_row = Table([row], colWidths=[42*mm] * len(row))
             metrics_row.setStyle(TableStyle([
                 ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
                 ('VALIGN', (0, 0), (-1, -1), 'TOP'),
@@ -605,6 +604,38 @@ class QalbReportGenerator:
 # CONVENIENCE FUNCTIONS
 # ============================================================
 
+def measured_metrics(results: Dict[str, Any]) -> Dict[str, str]:
+    """Key metric cards from a runner results file (one suite or combined).
+    
+    Averages are weighted by each suite's successful tests. TTFT and decode
+    speed only appear when the server reported them.
+    """
+    suites = results.get('test_suites') or ([results] if 'results' in results else [])
+    measured = [s for s in suites if s.get('successful_tests')]
+    if not measured:
+        return {}
+    successful = sum(s['successful_tests'] for s in measured)
+    
+    def weighted(key: str, suites: List[Dict[str, Any]] = measured) -> float:
+        total = sum(s['successful_tests'] for s in suites)
+        return sum(s['metrics'].get(key, 0) * s['successful_tests'] for s in suites) / total
+    
+    score = results.get('overall_metrics', {}).get('average_score', weighted('average_score'))
+    metrics = {
+        'overall_score': f"{score:.2f}",
+        'tests_passed': f"{successful}/{sum(s.get('total_tests', 0) for s in suites)}",
+        'urdu_purity': f"{weighted('average_urdu_ratio'):.2%}",
+        'avg_response_time': f"{weighted('average_response_time_ms') / 1000:.1f}s",
+    }
+    timed = [s for s in measured if s['metrics'].get('average_ttft_ms', 0) > 0]
+    if timed:
+        metrics['avg_ttft'] = f"{weighted('average_ttft_ms', timed):.0f}ms"
+    decoded = [s for s in measured if s['metrics'].get('average_tokens_per_second', 0) > 0]
+    if decoded:
+        metrics['decode_speed'] = f"{weighted('average_tokens_per_second', decoded):.1f} tok/s"
+    return metrics
+
+
 def generate_sample_report(output_path: str = "reports") -> str:
     """Generate a sample report with mock data."""
     
@@ -686,10 +717,18 @@ def generate_sample_report(output_path: str = "reports") -> str:
 
 
 def generate_report_from_json(json_path: str, output_path: str = "reports") -> str:
-    """Generate report from JSON results file."""
+    """Generate report from JSON results file.
+    
+    Test runner output (a ``*_results.json`` or ``combined_results.json``)
+    gets its key metrics measured from the results.
+    """
     with open(json_path, 'r', encoding='utf-8') as f:
         results = json.load(f)
     
+    if 'test_suites' in results or 'results' in results:
+        results = {**results, 'metrics': measured_metrics(results)}
+        results.setdefault('model_name', results.get('model'))
+    
     generator = QalbReportGenerator(output_path)
     return generator.generate_report(results)
 
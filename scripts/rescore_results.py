@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Qalb Offline Re-scoring
+=======================
+Re-scores stored test results against the current test definitions without
+calling the model.
+
+Each results file (``*_results.json`` or ``combined_results.json``) is
+joined to its test definitions by test id, then ``passed_keywords``,
+``urdu_char_ratio`` and ``score`` are recomputed with the same rules as
+QalbTestRunner. Large inputs are scored in parallel across CPU cores. New
+summaries are written next to the inputs as ``*_rescored.json``.
+
+Results are scored in the mode their run recorded under ``scoring`` (e.g.
+the time bonus on TTFT for ``--score-ttft`` runs). Repeat-sampled results
+keep their stored score: only one typical response of the repeats is kept,
+so their mean can't be recomputed. Their ids are listed under
+``skipped_repeat_ids``.
+
+Usage:
+    python scripts/rescore_results.py
+    python scripts/rescore_results.py data/baseline/combined_results.json
+    python scripts/rescore_results.py round3_results.json --tests tests/baseline/urdu_script_tests_round4.json
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+from test_runner import (
+    DATA_DIR,
+    TESTS_DIR,
+    QalbTestRunner,
+    TestCase,
+    TestResult,
+    calculate_suite_metrics,
+    calculate_overall_metrics,
+)
+from script_analysis import urdu_char_ratios
+
+
+# Below this many results, process start-up costs more than scoring itself
+PARALLEL_MIN_RESULTS = 2000
+CHUNK_SIZE = 2000
+
+RESULT_FIELDS = {f.name for f in fields(TestResult)}
+
+_runners: Dict[bool, QalbTestRunner] = {}
+
+
+def scoring_runner(score_on_ttft: bool = False) -> QalbTestRunner:
+    """A runner that scores the way a run with this scoring mode did."""
+    if score_on_ttft not in _runners:
+        _runners[score_on_ttft] = QalbTestRunner(score_on_ttft=score_on_ttft)
+    return _runners[score_on_ttft]
+
+
+def rescore_result(
+    runner: QalbTestRunner,
+    result: Dict[str, Any],
+    test_case: TestCase,
+    urdu_ratio: Optional[float] = None
+) -> TestResult:
+    """Recompute keyword matches, Urdu ratio and score for one stored result.
+
+    ``urdu_ratio`` may be passed in when it was computed in a batch.
+    """
+    rescored = TestResult(**{k: v for k, v in result.items() if k in RESULT_FIELDS})
+    if rescored.error:
+        # Failed generations stay failed; there is no response to score
+        return rescored
+
+    if urdu_ratio is None:
+        urdu_ratio = runner.calculate_urdu_ratio(rescored.response)
+    rescored.urdu_char_ratio = urdu_ratio
+    rescored.passed_keywords, rescored.failed_keywords = runner.check_keywords(
+        rescored.response, test_case.expected_keywords
+    )
+    rescored.score = runner.calculate_score(rescored, test_case)
+    return rescored
+
+
+def rescore_batch(runner: QalbTestRunner, pairs: List[Tuple[Dict[str, Any], TestCase]]) -> List[TestResult]:
+    """Score (result, test case) pairs, computing Urdu ratios for the whole batch at once."""
+    ratios = urdu_char_ratios(result.get("response", "") for result, _ in pairs)
+    return [
+        rescore_result(runner, result, tc, ratio)
+        for (result, tc), ratio in zip(pairs, ratios)
+    ]
+
+
+def _rescore_chunk(job: Tuple[bool, List[Tuple[Dict[str, Any], TestCase]]]) -> List[TestResult]:
+    """Worker entry point: score a chunk of (result, test case) pairs in the given mode."""
+    score_on_ttft, chunk = job
+    return rescore_batch(scoring_runner(score_on_ttft), chunk)
+
+
+class Rescorer:
+    """Joins stored results to test definitions and re-scores them."""
+
+    def __init__(self, test_files: Optional[List[Path]] = None, workers: Optional[int] = None):
+        self.runner = scoring_runner()
+        self.workers = workers or os.cpu_count() or 1
+        self._definitions: Dict[str, Dict[str, TestCase]] = {}
+        # Explicit definition files override the test_file recorded in each summary
+        self.override: Optional[Dict[str, TestCase]] = None
+        if test_files:
+            self.override = {}
+            for path in test_files:
+                self.override.update(self._load_definitions(path))
+
+    def _load_definitions(self, path: Path) -> Dict[str, TestCase]:
+        key = str(path)
+        if key not in self._definitions:
+            self._definitions[key] = {tc.id: tc for tc in self.runner.load_test_cases(path)}
+        return self._definitions[key]
+
+    def definitions_for(self, suite: Dict[str, Any]) -> Dict[str, TestCase]:
+        """Test definitions to join a suite summary against."""
+        if self.override is not None:
+            return self.override
+        test_file = TESTS_DIR / "baseline" / suite.get("test_file", "")
+        if not test_file.is_file():
+            raise FileNotFoundError(
+                f"Test definitions not found for {suite.get('test_file')!r}; pass --tests"
+            )
+        return self._load_definitions(test_file)
+
+    def rescore_pairs(
+        self,
+        pairs: List[Tuple[Dict[str, Any], TestCase]],
+        score_on_ttft: bool = False
+    ) -> List[TestResult]:
+        """Score (result, test case) pairs, in parallel when the batch is large."""
+        if self.workers == 1 or len(pairs) < PARALLEL_MIN_RESULTS:
+            return rescore_batch(scoring_runner(score_on_ttft), pairs)
+
+        jobs = [(score_on_ttft, pairs[i:i + CHUNK_SIZE]) for i in range(0, len(pairs), CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return [r for chunk in executor.map(_rescore_chunk, jobs) for r in chunk]
+
+    def rescore_suite(self, suite: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of a suite summary with results and metrics recomputed."""
+        definitions = self.definitions_for(suite)
+        stored = suite.get("results", [])
+
+        # Runs from before the mode was recorded were scored on response time
+        scoring = suite.get("scoring") or {}
+
+        pairs = []
+        unmatched = []
+        skipped = []
+        for result in stored:
+            tc = definitions.get(result.get("test_id"))
+            if tc is None:
+                unmatched.append(result["test_id"])
+            elif result.get("repeats", 1) > 1:
+                # The score is a mean over repeats whose responses weren't kept
+                skipped.append(result["test_id"])
+            else:
+                pairs.append((result, tc))
+
+        rescored = {
+            r.test_id: r
+            for r in self.rescore_pairs(pairs, scoring.get("score_on_ttft", False))
+        }
+        results = [
+            rescored.get(r["test_id"]) or TestResult(**{k: v for k, v in r.items() if k in RESULT_FIELDS})
+            for r in stored
+        ]
+
+        updated = dict(suite)
+        updated["metrics"] = {**suite.get("metrics", {}), **calculate_suite_metrics(results)}
+        updated["results"] = [asdict(r) for r in results]
+        updated["rescored_at"] = datetime.now().isoformat()
+        updated["unmatched_test_ids"] = unmatched
+        updated["skipped_repeat_ids"] = skipped
+        return updated
+
+    def rescore_file(self, path: Path) -> Tuple[Dict[str, Any], List[Tuple[str, float, float, int, int, int]]]:
+        """Re-score one results file; returns the new document and per-suite stats."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        suites = data["test_suites"] if "test_suites" in data else [data]
+        stats = []
+        new_suites = []
+        for suite in suites:
+            new_suite = self.rescore_suite(suite)
+            changed = sum(
+                1 for old, new in zip(suite.get("results", []), new_suite["results"])
+                if abs(old.get("score", 0) - new["score"]) > 1e-9
+            )
+            stats.append((
+                suite.get("test_file", path.name),
+                suite.get("metrics", {}).get("average_score", 0),
+                new_suite["metrics"]["average_score"],
+                changed,
+                len(new_suite["unmatched_test_ids"]),
+                len(new_suite["skipped_repeat_ids"])
+            ))
+            new_suites.append(new_suite)
+
+        if "test_suites" in data:
+            document = dict(data)
+            document["test_suites"] = new_suites
+            document["overall_metrics"] = {
+                **data.get("overall_metrics", {}),
+                **calculate_overall_metrics(new_suites)
+            }
+            document["rescored_at"] = datetime.now().isoformat()
+        else:
+            document = new_suites[0]
+        return document, stats
+
+
+def default_inputs() -> List[Path]:
+    """Per-suite results files under data/baseline."""
+    return sorted((DATA_DIR / "baseline").glob("*/*_results.json"))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-score stored Qalb test results offline.")
+    parser.add_argument("results", nargs="*", type=Path, help="Results files (default: data/baseline/*/*_results.json)")
+    parser.add_argument("--tests", nargs="+", type=Path, help="Test definition files to join against")
+    parser.add_argument("--output-dir", type=Path, help="Write rescored files here instead of next to inputs")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for large inputs (default: CPU count)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    inputs = args.results or default_inputs()
+    if not inputs:
+        print("⚠️  No results files found. Run the test runner first or pass files explicitly.")
+        sys.exit(1)
+
+    rescorer = Rescorer(test_files=args.tests, workers=args.workers)
+    start = time.perf_counter()
+    total = 0
+    skipped_total = 0
+
+    print(f"\n{'File':<45} {'Old':>7} {'New':>7} {'Changed':>8} {'Unmatched':>10} {'Repeats':>8}")
+    print("-" * 89)
+    for path in inputs:
+        document, stats = rescorer.rescore_file(path)
+        output_dir = args.output_dir or path.parent
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_file = output_dir / f"{path.stem}_rescored.json"
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+
+        for name, old, new, changed, unmatched, skipped in stats:
+            print(f"{name:<45} {old:>7.1f} {new:>7.1f} {changed:>8} {unmatched:>10} {skipped:>8}")
+            skipped_total += skipped
+        total += sum(len(s["results"]) for s in document.get("test_suites", [document]))
+
+    print("-" * 89)
+    if skipped_total:
+        print(f"⚠️  Kept the stored score of {skipped_total} repeat-sampled results (Repeats column)")
+    print(f"✅ Re-scored {total} results in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
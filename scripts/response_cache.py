@@ -0,0 +1,192 @@
+"""
+Qalb Response Cache
+===================
+Persistent cache of model responses for the test runner.
+
+Entries are keyed on the model digest, the prompt and the generation
+options, so a response is reused only when the model would be asked exactly
+the same thing. Stored in SQLite (WAL mode) and evicted least-recently-used
+once the cache grows past its size limit.
+
+Typical use is re-scoring: when only keywords or scoring rules change
+between rounds, the runner's --rescore-only mode replays cached responses
+through check_keywords/calculate_score without touching the model.
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+
+
+DEFAULT_MAX_SIZE_MB = 512
+
+# Response fields worth keeping; the token "context" array is dropped
+RESPONSE_FIELDS = (
+    "model",
+    "created_at",
+    "response",
+    "done",
+    "done_reason",
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+    "batch_size",      # prompts generated together (batching backends only)
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    model_digest TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    options TEXT NOT NULL,
+    response TEXT NOT NULL,
+    response_time_ms REAL NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+CREATE TABLE IF NOT EXISTS models (
+    name TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+def cache_key(model_digest: str, prompt: str, options: Dict[str, Any]) -> str:
+    """Stable cache key for one generation request."""
+    payload = json.dumps([model_digest, prompt, options], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def response_to_dict(response: Any) -> Dict[str, Any]:
+    """Convert an ollama generate response (dict or response object) to a plain dict."""
+    return {name: response.get(name) for name in RESPONSE_FIELDS if response.get(name) is not None}
+
+
+class ResponseCache:
+    """SQLite-backed response cache with size-based LRU eviction.
+
+    Safe to share between the runner's worker threads.
+    """
+
+    def __init__(self, path: Path, max_size_mb: float = DEFAULT_MAX_SIZE_MB):
+        self.path = Path(path)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._size_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM responses"
+        ).fetchone()[0]
+        if self._size_bytes > self.max_size_bytes:
+            # The size limit may have been lowered since the cache was filled
+            self._evict()
+            self._conn.commit()
+
+    def remember_model(self, name: str, digest: str):
+        """Record the digest last seen for a model tag."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO models (name, digest, updated) VALUES (?, ?, ?)",
+                (name, digest, time.time())
+            )
+            self._conn.commit()
+
+    def model_digest(self, name: str) -> Optional[str]:
+        """Digest last recorded for a model tag, for use when the model can't be queried."""
+        with self._lock:
+            row = self._conn.execute("SELECT digest FROM models WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def get(
+        self,
+        model_digest: str,
+        prompt: str,
+        options: Dict[str, Any]
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return ``(response, response_time_ms)`` for a cached request, or None."""
+        key = cache_key(model_digest, prompt, options)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, response_time_ms FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def put(
+        self,
+        model: str,
+        model_digest: str,
+        prompt: str,
+        options: Dict[str, Any],
+        response: Any,
+        response_time_ms: float
+    ):
+        """Store a response, evicting least recently used entries if over the size limit."""
+        key = cache_key(model_digest, prompt, options)
+        payload = json.dumps(response_to_dict(response), ensure_ascii=False)
+        options_json = json.dumps(options, ensure_ascii=False, sort_keys=True)
+        size = len(payload.encode("utf-8")) + len(prompt.encode("utf-8")) + len(options_json)
+        now = time.time()
+
+        with self._lock:
+            old = self._conn.execute("SELECT size_bytes FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, model_digest, prompt, options, response, response_time_ms, "
+                "size_bytes, created, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, model_digest, prompt, options_json, payload, response_time_ms, size, now, now)
+            )
+            self._size_bytes += size - (old[0] if old else 0)
+            if self._size_bytes > self.max_size_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is back under its limit."""
+        rows = self._conn.execute(
+            "SELECT key, size_bytes FROM responses ORDER BY last_access"
+        )
+        evict = []
+        for key, size in rows:
+            if self._size_bytes <= self.max_size_bytes:
+                break
+            evict.append((key,))
+            self._size_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and size, for logging."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "size_mb": round(self._size_bytes / (1024 * 1024), 2),
+            "max_size_mb": round(self.max_size_bytes / (1024 * 1024), 2),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
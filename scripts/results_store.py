@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Qalb Results Store
+==================
+Columnar (Parquet) store for test run results.
+
+Every suite run is written to three Parquet datasets under
+``data/results_store``, each partitioned by model, round and script type
+(hive layout, e.g. ``model=.../round=4/script_type=urdu``):
+
+- ``runs``:    one row per suite run (test file, timestamp, suite metrics)
+- ``results``: one row per test, every TestResult field except the text
+- ``text``:    prompt and response text, joined to ``results`` on
+               (run_id, position)
+
+Keeping prompt/response text in its own dataset means score, latency and
+keyword aggregations never read it. ``load_suites`` reads only the columns
+an analysis asks for and rebuilds suite summaries shaped like the
+``*_results.json`` files, falling back to those JSON files when pyarrow is
+not installed, the store has no matching run, or a JSON file holds a newer
+run (e.g. one made with ``--no-store``). A round is always read for one
+model: analyses never average several models' runs together.
+
+Usage:
+    python scripts/results_store.py import data/baseline/combined_results.json
+    python scripts/results_store.py runs
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+STORE_DIR = Path(__file__).parent.parent / "data" / "results_store"
+
+TEXT_COLUMNS = ("prompt", "response")
+# Columns every run/result row carries in addition to the result fields
+RUN_KEY = "run_id"
+POSITION = "position"
+
+if PYARROW_AVAILABLE:
+    PARTITION_SCHEMA = pa.schema([
+        ("model", pa.string()),
+        ("round", pa.int32()),
+        ("script_type", pa.string()),
+    ])
+    # Types for known TestResult fields; fields added later are inferred
+    RESULT_TYPES = {
+        "test_id": pa.string(),
+        "category": pa.string(),
+        "response_time_ms": pa.float64(),
+        "tokens_per_second": pa.float64(),
+        "urdu_char_ratio": pa.float64(),
+        "passed_keywords": pa.list_(pa.string()),
+        "failed_keywords": pa.list_(pa.string()),
+        "score": pa.float64(),
+        "timestamp": pa.string(),
+        "error": pa.string(),
+        "retry_count": pa.int64(),
+        "endpoint": pa.string(),
+        "cached": pa.bool_(),
+        "eval_count": pa.int64(),
+        "prompt_eval_count": pa.int64(),
+        "streamed": pa.bool_(),
+        "repeat_scores": pa.list_(pa.float64()),
+    }
+    RUN_TYPES = {
+        "test_file": pa.string(),
+        "test_file_version": pa.string(),
+        "timestamp": pa.string(),
+        "total_tests": pa.int64(),
+        "successful_tests": pa.int64(),
+        "failed_tests": pa.int64(),
+    }
+
+
+def round_from_test_file(test_file: str) -> int:
+    """Round number encoded in a test file name (``*_round4.json``; unnumbered is round 1)."""
+    match = re.search(r"_round(\d+)", test_file)
+    return int(match.group(1)) if match else 1
+
+
+def run_id_for(suite: Dict[str, Any]) -> str:
+    """Stable id for a suite run, so re-importing the same file overwrites it."""
+    key = f"{suite.get('model')}|{suite.get('test_file')}|{suite.get('timestamp')}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _table(rows: List[Dict[str, Any]], types: Dict[str, Any]) -> "pa.Table":
+    """Build a table from row dicts, using known column types where given."""
+    names: List[str] = []
+    for row in rows:
+        names.extend(name for name in row if name not in names)
+    arrays = []
+    for name in names:
+        values = [row.get(name) for row in rows]
+        array = pa.array(values, type=types.get(name))
+        if pa.types.is_null(array.type):
+            array = array.cast(pa.string())
+        elif pa.types.is_list(array.type) and pa.types.is_null(array.type.value_type):
+            array = array.cast(pa.list_(pa.string()))
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+class ResultsStore:
+    """Partitioned Parquet datasets of suite runs, results and response text."""
+
+    def __init__(self, path: Path = STORE_DIR):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow is required for the results store: pip install pyarrow")
+        self.path = Path(path)
+        self.partitioning = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+
+    def _write(self, name: str, table: "pa.Table", run_id: str):
+        ds.write_dataset(
+            table,
+            self.path / name,
+            format="parquet",
+            partitioning=self.partitioning,
+            basename_template=f"{run_id}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    def write_suite(
+        self,
+        suite: Dict[str, Any],
+        round_num: Optional[int] = None,
+        script_type: Optional[str] = None
+    ) -> str:
+        """Write one suite summary (as saved to ``*_results.json``); returns its run id."""
+        run_id = run_id_for(suite)
+        results = suite.get("results", [])
+        if round_num is None:
+            round_num = round_from_test_file(suite.get("test_file", ""))
+        if script_type is None:
+            script_type = results[0].get("script_type") if results else None
+        partition = {"model": suite.get("model"), "round": round_num, "script_type": script_type}
+
+        run_row = {RUN_KEY: run_id, **partition}
+        run_row.update({k: suite.get(k) for k in RUN_TYPES})
+        run_row.update({
+            f"metrics.{k}": v for k, v in suite.get("metrics", {}).items()
+            if isinstance(v, (int, float))
+        })
+
+        result_rows = []
+        text_rows = []
+        for position, result in enumerate(results):
+            key = {RUN_KEY: run_id, POSITION: position}
+            result_rows.append({
+                **key, **partition,
+                **{k: v for k, v in result.items() if k not in TEXT_COLUMNS and k not in partition}
+            })
+            text_rows.append({**key, **partition, **{k: result.get(k) for k in TEXT_COLUMNS}})
+
+        types = {"round": pa.int32(), POSITION: pa.int32()}
+        self._write("runs", _table([run_row], {**types, **RUN_TYPES}), run_id)
+        if result_rows:
+            self._write("results", _table(result_rows, {**types, **RESULT_TYPES}), run_id)
+            self._write("text", _table(text_rows, types), run_id)
+        return run_id
+
+    def _dataset(self, name: str) -> Optional["ds.Dataset"]:
+        """Dataset over every file written so far, with schemas unified across runs."""
+        directory = self.path / name
+        files = sorted(str(p) for p in directory.rglob("*.parquet")) if directory.is_dir() else []
+        if not files:
+            return None
+        schema = pa.unify_schemas([pq.read_schema(f) for f in files] + [PARTITION_SCHEMA])
+        return ds.dataset(files, schema=schema, format="parquet",
+                          partitioning=self.partitioning, partition_base_dir=str(directory))
+
+    def runs(
+        self,
+        model: Optional[str] = None,
+        round_num: Optional[int] = None,
+        script_type: Optional[str] = None,
+        latest: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Suite runs matching the filters, in the order they were run.
+
+        With ``latest`` only the most recent run per model, round and
+        script type is returned.
+        """
+        dataset = self._dataset("runs")
+        if dataset is None:
+            return []
+        expression = None
+        for column, value in (("model", model), ("round", round_num), ("script_type", script_type)):
+            if value is not None:
+                condition = ds.field(column) == value
+                expression = condition if expression is None else expression & condition
+        rows = dataset.to_table(filter=expression).sort_by("timestamp").to_pylist()
+        if latest:
+            newest = {}
+            for row in rows:
+                newest[(row["model"], row["round"], row["script_type"])] = row
+            rows = sorted(newest.values(), key=lambda r: r["timestamp"] or "")
+        return rows
+
+    def written_at(self) -> Dict[str, float]:
+        """When each run was written to the store (file modification time), by run id."""
+        directory = self.path / "runs"
+        if not directory.is_dir():
+            return {}
+        return {p.name.rsplit("-", 1)[0]: p.stat().st_mtime for p in directory.rglob("*.parquet")}
+
+    def load_results(self, run_ids: Sequence[str], columns: Optional[Sequence[str]] = None) -> "pa.Table":
+        """Result rows for the given runs, reading only ``columns`` (default: all).
+
+        Text columns are read from the text dataset only when requested.
+        """
+        results = self._dataset("results")
+        if results is None:
+            return pa.table({})
+        run_filter = ds.field(RUN_KEY).isin(list(run_ids))
+
+        if columns is None:
+            wanted = results.schema.names
+            text = list(TEXT_COLUMNS)
+        else:
+            wanted = [c for c in columns if c not in TEXT_COLUMNS and c in results.schema.names]
+            text = [c for c in columns if c in TEXT_COLUMNS]
+        key = [RUN_KEY, POSITION]
+        order = [(RUN_KEY, "ascending"), (POSITION, "ascending")]
+        table = results.to_table(columns=key + [c for c in wanted if c not in key], filter=run_filter)
+        table = table.sort_by(order)
+
+        if text:
+            # Both datasets hold one row per (run, position), so once sorted
+            # the text columns line up row for row (a hash join can't carry
+            # the list-typed keyword columns)
+            text_table = self._dataset("text").to_table(columns=key + text, filter=run_filter).sort_by(order)
+            if not (text_table[RUN_KEY].equals(table[RUN_KEY]) and text_table[POSITION].equals(table[POSITION])):
+                raise ValueError(f"Results and text datasets are out of step in {self.path}")
+            for name in text:
+                table = table.append_column(name, text_table[name])
+        return table
+
+    def load_suites(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        model: Optional[str] = None,
+        round_num: Optional[int] = None,
+        script_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Latest suite runs as ``*_results.json``-shaped summaries."""
+        runs = self.runs(model=model, round_num=round_num, script_type=script_type)
+        if not runs:
+            return []
+        table = self.load_results([r[RUN_KEY] for r in runs], columns)
+
+        by_run: Dict[str, List[Dict[str, Any]]] = {r[RUN_KEY]: [] for r in runs}
+        # Partition and join keys are only returned when asked for
+        drop = {RUN_KEY, POSITION, "round"} if columns is None else set(table.column_names) - set(columns)
+        for row in table.to_pylist():
+            by_run[row[RUN_KEY]].append({k: v for k, v in row.items() if k not in drop})
+
+        suites = []
+        for run in runs:
+            suite = {k: run[k] for k in ("model", "round", "script_type") if k in run}
+            suite.update({k: run.get(k) for k in RUN_TYPES})
+            suite["metrics"] = {
+                k[len("metrics."):]: v for k, v in run.items()
+                if k.startswith("metrics.") and v is not None
+            }
+            suite["results"] = by_run[run[RUN_KEY]]
+            suites.append(suite)
+        return suites
+
+
+# ============================================================
+# Loaders for the analysis scripts
+# ============================================================
+
+def project_suite(suite: Dict[str, Any], columns: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Copy of a JSON suite summary keeping only ``columns`` of each result."""
+    if columns is None:
+        return suite
+    projected = dict(suite)
+    projected["results"] = [{c: r.get(c) for c in columns} for r in suite.get("results", [])]
+    return projected
+
+
+def read_json_suites(path: Path) -> List[Dict[str, Any]]:
+    """Suite summaries of a JSON results file, per-suite or combined."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get("test_suites", [data])
+
+
+def suite_script_type(suite: Dict[str, Any]) -> Optional[str]:
+    """Script type of a suite summary, from its results."""
+    results = suite.get("results") or [{}]
+    return suite.get("script_type") or results[0].get("script_type")
+
+
+def resolve_model(models: Sequence[str], model: Optional[str], round_num: int) -> Optional[str]:
+    """The one model a round's results are read for.
+
+    An explicit ``model`` wins; otherwise the only model with results, or
+    the runner's default model when it is among several. Several models and
+    none of them the default is ambiguous, and raises ValueError.
+    """
+    # Imported here: test_runner itself imports this module to write runs
+    from test_runner import MODEL_NAME
+
+    models = sorted(set(m for m in models if m))
+    if model is not None or not models:
+        return model
+    if len(models) == 1:
+        return models[0]
+    if MODEL_NAME in models:
+        return MODEL_NAME
+    raise ValueError(
+        f"Round {round_num} has results for several models ({', '.join(models)}); "
+        f"choose one with --model"
+    )
+
+
+def load_suites(
+    json_paths: Sequence[Path],
+    columns: Optional[Sequence[str]] = None,
+    round_num: Optional[int] = None,
+    script_type: Optional[str] = None,
+    model: Optional[str] = None,
+    store_dir: Path = STORE_DIR
+) -> List[Dict[str, Any]]:
+    """Suite summaries, reading only the result columns needed.
+
+    Without ``round_num`` every suite of the given JSON results files (per-suite
+    or combined) is returned. With it, suites are read for one model (see
+    ``resolve_model``) and the round's test files only, the newest run per
+    test file. Store runs are read column by column; a JSON file is only
+    parsed when it was written after the store, e.g. by a ``--no-store`` run,
+    and wins when it holds the newer run.
+    """
+    if round_num is None:
+        suites = []
+        for path in json_paths:
+            if Path(path).is_file():
+                suites.extend(project_suite(suite, columns) for suite in read_json_suites(path))
+        return suites
+
+    store = ResultsStore(store_dir) if PYARROW_AVAILABLE else None
+    runs = store.runs(round_num=round_num, script_type=script_type) if store else []
+    written = store.written_at() if runs else {}
+    stored_until = max((written.get(r[RUN_KEY], 0.0) for r in runs), default=0.0)
+
+    json_suites = []
+    for path in json_paths:
+        path = Path(path)
+        if not path.is_file() or (runs and path.stat().st_mtime <= stored_until):
+            continue
+        json_suites.extend(
+            suite for suite in read_json_suites(path)
+            if round_from_test_file(suite.get("test_file") or "") == round_num
+            and (script_type is None or suite_script_type(suite) == script_type)
+        )
+
+    model = resolve_model([r["model"] for r in runs] + [s.get("model") for s in json_suites], model, round_num)
+    # Newest run per test file, from either source
+    newest: Dict[str, Dict[str, Any]] = {}
+    for run in runs:
+        if run["model"] == model:
+            newest[run["test_file"]] = run
+    for suite in json_suites:
+        if suite.get("model") not in (model, None):
+            continue
+        current = newest.get(suite.get("test_file"))
+        if current is None or (suite.get("timestamp") or "") > (current.get("timestamp") or ""):
+            newest[suite.get("test_file")] = suite
+
+    from_store = {key for key, suite in newest.items() if RUN_KEY in suite}
+    suites = [
+        suite for suite in store.load_suites(columns, model=model, round_num=round_num, script_type=script_type)
+        if suite.get("test_file") in from_store
+    ] if from_store else []
+    suites += [project_suite(suite, columns) for suite in newest.values() if RUN_KEY not in suite]
+    return sorted(suites, key=lambda s: s.get("timestamp") or "")
+
+
+def load_combined(
+    json_path: Path,
+    columns: Optional[Sequence[str]] = None,
+    round_num: Optional[int] = None,
+    model: Optional[str] = None,
+    store_dir: Path = STORE_DIR
+) -> Dict[str, Any]:
+    """``combined_results.json``-shaped document for one model, built from ``load_suites``."""
+    # Imported here: test_runner itself imports this module to write runs
+    from test_runner import calculate_overall_metrics
+
+    suites = load_suites([json_path], columns, round_num, model=model, store_dir=store_dir)
+    return {
+        "model": suites[0].get("model") if suites else model,
+        "test_suites": suites,
+        "overall_metrics": calculate_overall_metrics(suites) if suites else {},
+    }
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+def import_results(store: ResultsStore, paths: Sequence[Path], round_num: Optional[int]) -> int:
+    """Write existing JSON results files to the store; returns suites written."""
+    written = 0
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for suite in data.get("test_suites", [data]):
+            run_id = store.write_suite(suite, round_num=round_num)
+            print(f"   {path.name}: {suite.get('test_file')} → run {run_id} ({len(suite.get('results', []))} results)")
+            written += 1
+    return written
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Manage the columnar Qalb results store.")
+    parser.add_argument("--store", type=Path, default=STORE_DIR, help=f"Store directory (default: {STORE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Import *_results.json / combined_results.json files")
+    importer.add_argument("results", nargs="+", type=Path)
+    importer.add_argument("--round", type=int, dest="round_num",
+                          help="Round number (default: from each suite's test file name)")
+
+    lister = commands.add_parser("runs", help="List stored suite runs")
+    lister.add_argument("--round", type=int, dest="round_num")
+    lister.add_argument("--all", action="store_true", help="Include superseded runs")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if not PYARROW_AVAILABLE:
+        print("❌ pyarrow not installed! Run: pip install pyarrow")
+        sys.exit(1)
+    store = ResultsStore(args.store)
+
+    if args.command == "import":
+        written = import_results(store, args.results, args.round_num)
+        print(f"✅ Imported {written} suite runs into {store.path}")
+    else:
+        runs = store.runs(round_num=args.round_num, latest=not args.all)
+        print(f"\n{'Round':<7} {'Script':<8} {'Tests':>6} {'Score':>7}  {'Timestamp':<27} Model")
+        print("-" * 90)
+        for run in runs:
+            print(f"{run['round'] or '-':<7} {run['script_type'] or '-':<8} {run['total_tests'] or 0:>6} "
+                  f"{run.get('metrics.average_score') or 0:>7.1f}  {run['timestamp'] or '':<27} {run['model']}")
+
+
+if __name__ == "__main__":
+    main()
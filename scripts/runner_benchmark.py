@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Qalb Runner Benchmark
+=====================
+Load generator for the test runner itself, driven by the mock backend.
+
+Runs a baseline suite through ``QalbTestRunner`` against ``MockBackend``
+once per worker count. Each run reports:
+
+- wall time and throughput in tests/s
+- efficiency: the simulated serving time divided over the workers (and the
+  mock's ``--parallel`` slots), as a share of wall time
+- runner overhead per test: the wall time not explained by serving
+- retries, failures and p50/p95 response times
+
+The mock is reseeded for every run, so each worker count sees the same
+responses and the same injected failures. ``--time-scale 0`` answers
+instantly, so the wall time is pure runner overhead (checkpointing,
+scoring, aggregation). With ``--max-overhead-ms`` the script exits
+non-zero when any run's overhead per test exceeds the limit, which makes
+it usable as a CI regression check on any machine.
+
+Usage:
+    python scripts/runner_benchmark.py --time-scale 0 --tests 2000 --max-overhead-ms 5
+    python scripts/runner_benchmark.py --workers 1 4 8 16 --parallel 8 --time-scale 0.1
+    python scripts/runner_benchmark.py --connection-error-rate 0.1 --server-error-rate 0.02 --retry-delay 0.1
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+import test_runner
+from test_runner import QalbTestRunner, TESTS_DIR, percentile
+from mock_backend import MockBackend, MockProfile, LATENCY_DISTRIBUTIONS, load_canned_responses
+
+
+DEFAULT_TEST_FILE = TESTS_DIR / "baseline" / "urdu_script_tests_round4.json"
+DEFAULT_WORKER_COUNTS = [1, 4, 8]
+
+
+def build_test_file(source: Path, count: Optional[int], destination: Path) -> int:
+    """Write ``source`` to ``destination`` with its tests cycled up to ``count``.
+
+    Copies get a numbered id and prompt suffix, so each one is a separate
+    request to the mock (with its own failure draws).
+    """
+    with open(source, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    tests = data.get("test_cases", [])
+    if count:
+        cycled = []
+        for i in range(count):
+            tc = dict(tests[i % len(tests)])
+            copy = i // len(tests)
+            if copy:
+                tc["id"] = f"{tc['id']}_copy{copy}"
+                tc["prompt"] = f"{tc['prompt']} ({copy})"
+            cycled.append(tc)
+        data["test_cases"] = cycled
+    with open(destination, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return len(data["test_cases"])
+
+
+def run_level(
+    test_file: Path,
+    workers: int,
+    profile: MockProfile,
+    responses: Dict[str, str],
+    seed: int,
+    stream: bool,
+    work_dir: Path,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """Run the suite once with ``workers`` workers; returns the benchmark row."""
+    backend = MockBackend(profile=profile, responses=responses, seed=seed)
+    runner = QalbTestRunner(model_name=backend.model, workers=workers, stream=stream,
+                            warm_up=False, backend=backend, checkpoint_dir=work_dir / "checkpoints")
+    runner.backend_info = backend.metadata()
+    output_dir = work_dir / f"workers_{workers}"
+
+    log = None if verbose else io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log) if log else contextlib.nullcontext():
+        summary = runner.run_test_suite(test_file, output_dir)
+    wall = time.perf_counter() - start
+
+    results = summary["results"]
+    stats = backend.stats()
+    lanes = min(workers, profile.parallel) if profile.parallel > 0 else workers
+    serving = stats["simulated_seconds"] * profile.time_scale / lanes
+    times = [r["response_time_ms"] for r in results if not r["error"]]
+    return {
+        "workers": workers,
+        "tests": len(results),
+        "wall_s": wall,
+        "tests_per_s": len(results) / wall if wall else 0.0,
+        "efficiency": serving / wall if wall else 0.0,
+        "overhead_ms_per_test": max(0.0, wall - serving) * 1000 / max(1, len(results)),
+        "failed": summary["failed_tests"],
+        "retries": sum(r["retry_count"] for r in results),
+        "injected": {k: stats[k] for k in ("connection", "timeout", "server_error")},
+        "p50_ms": percentile(times, 50),
+        "p95_ms": percentile(times, 95),
+        "average_score": summary["metrics"]["average_score"],
+    }
+
+
+def print_table(rows: List[Dict[str, Any]]):
+    print(f"\n{'Workers':>7} {'Tests':>6} {'Wall s':>8} {'Tests/s':>8} {'Eff.':>6} "
+          f"{'Ovh ms':>7} {'Failed':>6} {'Retries':>7} {'p50 ms':>8} {'p95 ms':>8} {'Score':>6}")
+    print("─" * 91)
+    for r in rows:
+        print(f"{r['workers']:>7} {r['tests']:>6} {r['wall_s']:>8.2f} {r['tests_per_s']:>8.1f} "
+              f"{r['efficiency']:>6.0%} {r['overhead_ms_per_test']:>7.2f} {r['failed']:>6} "
+              f"{r['retries']:>7} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['average_score']:>6.1f}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the test runner against the mock backend.")
+    parser.add_argument("--test-file", type=Path, default=DEFAULT_TEST_FILE, help="Suite to run")
+    parser.add_argument("--tests", type=int, default=None,
+                        help="Run this many tests, cycling through the suite (default: the suite once)")
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKER_COUNTS,
+                        help="Worker counts to benchmark")
+    parser.add_argument("--stream", action="store_true", help="Stream responses (TTFT/ITL path)")
+    parser.add_argument("--seed", type=int, default=0, help="Mock backend seed")
+    parser.add_argument("--responses", type=Path, nargs="+", metavar="RESULTS_JSON",
+                        help="Replay responses from earlier *_results.json files instead of synthesising")
+
+    mock = parser.add_argument_group("mock server")
+    defaults = MockProfile()
+    mock.add_argument("--latency-ms", type=float, default=defaults.latency_ms,
+                      help="Median per-request overhead")
+    mock.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default=defaults.latency_distribution)
+    mock.add_argument("--spread", type=float, default=defaults.latency_spread,
+                      help="Lognormal sigma, or the normal/uniform spread as a fraction of --latency-ms")
+    mock.add_argument("--prefill-tps", type=float, default=defaults.prefill_tokens_per_second)
+    mock.add_argument("--decode-tps", type=float, default=defaults.decode_tokens_per_second)
+    mock.add_argument("--response-tokens", type=int, default=defaults.response_tokens,
+                      help="Mean synthesised response length")
+    mock.add_argument("--load-ms", type=float, default=defaults.load_ms, help="Model load on the first request")
+    mock.add_argument("--parallel", type=int, default=defaults.parallel,
+                      help="Requests the mock serves at once (0 = unlimited)")
+    mock.add_argument("--connection-error-rate", type=float, default=0.0)
+    mock.add_argument("--timeout-rate", type=float, default=0.0)
+    mock.add_argument("--server-error-rate", type=float, default=0.0)
+    mock.add_argument("--timeout-seconds", type=float, default=defaults.timeout_seconds)
+    mock.add_argument("--time-scale", type=float, default=defaults.time_scale,
+                      help="Multiply every simulated delay; 0 measures runner overhead alone")
+
+    parser.add_argument("--retry-delay", type=float, default=None,
+                        help=f"Seconds between retries (default: the runner's {test_runner.RETRY_DELAY_SECONDS}s)")
+    parser.add_argument("--max-overhead-ms", type=float, default=None,
+                        help="Exit with status 1 if any run's overhead per test exceeds this")
+    parser.add_argument("--output", type=Path, help="Write the rows as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the runner's own output")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    profile = MockProfile(
+        latency_ms=args.latency_ms,
+        latency_distribution=args.distribution,
+        latency_spread=args.spread,
+        prefill_tokens_per_second=args.prefill_tps,
+        decode_tokens_per_second=args.decode_tps,
+        response_tokens=args.response_tokens,
+        load_ms=args.load_ms,
+        parallel=args.parallel,
+        connection_error_rate=args.connection_error_rate,
+        timeout_rate=args.timeout_rate,
+        server_error_rate=args.server_error_rate,
+        timeout_seconds=args.timeout_seconds,
+        time_scale=args.time_scale,
+    )
+    responses = load_canned_responses(args.responses) if args.responses else {}
+    if args.retry_delay is not None:
+        test_runner.RETRY_DELAY_SECONDS = args.retry_delay
+
+    print("\n" + "="*60)
+    print("QALB RUNNER BENCHMARK")
+    print("fawadhs.dev")
+    print("="*60)
+    print(f"   🧪 {MockBackend(profile=profile, responses=responses).describe()}")
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="qalb-bench-") as tmp:
+        # Checkpoints and results stay out of data/
+        work_dir = Path(tmp)
+        test_file = work_dir / args.test_file.name
+        count = build_test_file(args.test_file, args.tests, test_file)
+        print(f"   📋 {count} tests from {args.test_file.name}, workers {args.workers}")
+        for workers in args.workers:
+            row = run_level(test_file, workers, profile, responses, args.seed, args.stream,
+                            work_dir, args.verbose)
+            rows.append(row)
+            print(f"   ✅ {workers} workers: {row['wall_s']:.2f}s")
+
+    print_table(rows)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"profile": asdict(profile), "seed": args.seed, "runs": rows}, f, indent=2)
+        print(f"\n💾 Saved: {args.output}")
+
+    if args.max_overhead_ms is not None:
+        worst = max(r["overhead_ms_per_test"] for r in rows)
+        if worst > args.max_overhead_ms:
+            print(f"\n❌ Runner overhead {worst:.2f}ms/test exceeds {args.max_overhead_ms:g}ms")
+            sys.exit(1)
+        print(f"\n✅ Runner overhead within {args.max_overhead_ms:g}ms/test (worst {worst:.2f}ms)")
+
+
+if __name__ == "__main__":
+    main()
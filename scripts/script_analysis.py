@@ -0,0 +1,204 @@
+"""
+Qalb Script Analysis
+====================
+Counts Urdu/Arabic-script characters in model responses.
+
+Two metrics are built on the same counts:
+
+- Urdu character ratio (test runner): alphabetic characters in the Arabic,
+  Arabic Supplement and Arabic Presentation Forms A/B blocks, divided by
+  all alphabetic characters.
+- Urdu purity (data collector): characters in the Arabic and Arabic
+  Supplement blocks, divided by all non-whitespace characters, as a
+  percentage.
+
+A single ``str.translate`` pass maps every character to a one-letter class
+(whitespace is dropped), and the classes are then counted in C. The class of
+each code point is computed once and cached. ``script_counts_batch``
+classifies many responses at once with a NumPy lookup table when NumPy is
+installed.
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import sys
+from typing import List, NamedTuple, Iterable
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Arabic (0600-06FF) and Arabic Supplement (0750-077F)
+ARABIC_BLOCKS = ((0x0600, 0x06FF), (0x0750, 0x077F))
+# Arabic Presentation Forms-A (FB50-FDFF) and -B (FE70-FEFF)
+PRESENTATION_BLOCKS = ((0xFB50, 0xFDFF), (0xFE70, 0xFEFF))
+
+# Character classes produced by the translate pass
+ARABIC_ALPHA = "U"        # Arabic block, alphabetic
+ARABIC_OTHER = "u"        # Arabic block, digits/punctuation/marks
+PRESENTATION_ALPHA = "P"  # Presentation forms, alphabetic
+ALPHA = "a"               # Any other alphabetic character
+OTHER = "o"               # Any other non-whitespace character
+
+# Below this many characters the NumPy batch path (and building its lookup
+# table) isn't worth the overhead
+NUMPY_MIN_CHARS = 1_000_000
+
+
+class ScriptCounts(NamedTuple):
+    """Character counts behind the ratio and purity metrics."""
+    urdu_alpha: int    # alphabetic, in Arabic or presentation-form blocks
+    alpha: int         # all alphabetic characters
+    arabic_block: int  # any character in the Arabic or Arabic Supplement blocks
+    non_space: int     # all non-whitespace characters
+
+    @property
+    def urdu_ratio(self) -> float:
+        return self.urdu_alpha / self.alpha if self.alpha > 0 else 0.0
+
+    @property
+    def purity(self) -> float:
+        if self.non_space == 0:
+            return 0.0
+        return (self.arabic_block / self.non_space) * 100
+
+
+def _in_blocks(code: int, blocks) -> bool:
+    return any(start <= code <= end for start, end in blocks)
+
+
+def _classify(code: int):
+    """Class letter for a code point, or None to drop whitespace."""
+    char = chr(code)
+    if char.isspace():
+        return None
+    if _in_blocks(code, ARABIC_BLOCKS):
+        return ARABIC_ALPHA if char.isalpha() else ARABIC_OTHER
+    if char.isalpha():
+        return PRESENTATION_ALPHA if _in_blocks(code, PRESENTATION_BLOCKS) else ALPHA
+    return OTHER
+
+
+class _ClassTable(dict):
+    """Translate table that classifies code points on first sight and caches them."""
+
+    def __missing__(self, code: int):
+        cls = _classify(code)
+        self[code] = cls
+        return cls
+
+
+_CLASS_TABLE = _ClassTable()
+
+
+def script_counts(text: str) -> ScriptCounts:
+    """Count script classes in one pass over ``text``."""
+    if not text:
+        return ScriptCounts(0, 0, 0, 0)
+    classes = text.translate(_CLASS_TABLE)
+    arabic_alpha = classes.count(ARABIC_ALPHA)
+    presentation_alpha = classes.count(PRESENTATION_ALPHA)
+    return ScriptCounts(
+        urdu_alpha=arabic_alpha + presentation_alpha,
+        alpha=arabic_alpha + presentation_alpha + classes.count(ALPHA),
+        arabic_block=arabic_alpha + classes.count(ARABIC_OTHER),
+        non_space=len(classes),
+    )
+
+
+def urdu_char_ratio(text: str) -> float:
+    """Share of alphabetic characters that are Urdu/Arabic script (0-1)."""
+    return script_counts(text).urdu_ratio
+
+
+def urdu_purity(text: str) -> float:
+    """Percentage of non-whitespace characters in the Arabic blocks (0-100)."""
+    return script_counts(text).purity
+
+
+# ============================================================
+# Batch API
+# ============================================================
+
+_CODE_CLASSES = None  # uint8 class per code point, built on first NumPy batch
+
+_CLASS_IDS = {None: 0, ARABIC_ALPHA: 1, ARABIC_OTHER: 2, PRESENTATION_ALPHA: 3, ALPHA: 4, OTHER: 5}
+
+
+def _code_class_table():
+    """Class id for every Unicode code point, as a NumPy lookup table."""
+    global _CODE_CLASSES
+    if _CODE_CLASSES is None:
+        size = sys.maxunicode + 1
+        codes = np.arange(size)
+        is_alpha = np.fromiter(map(str.isalpha, map(chr, range(size))), dtype=bool, count=size)
+        is_space = np.fromiter(map(str.isspace, map(chr, range(size))), dtype=bool, count=size)
+
+        def in_blocks(blocks):
+            mask = np.zeros(size, dtype=bool)
+            for start, end in blocks:
+                mask |= (codes >= start) & (codes <= end)
+            return mask
+
+        arabic = in_blocks(ARABIC_BLOCKS)
+        presentation = in_blocks(PRESENTATION_BLOCKS)
+
+        # Same precedence as _classify: whitespace, Arabic blocks, then alphabetic
+        table = np.full(size, _CLASS_IDS[OTHER], dtype=np.uint8)
+        table[is_alpha] = _CLASS_IDS[ALPHA]
+        table[is_alpha & presentation] = _CLASS_IDS[PRESENTATION_ALPHA]
+        table[arabic] = _CLASS_IDS[ARABIC_OTHER]
+        table[arabic & is_alpha] = _CLASS_IDS[ARABIC_ALPHA]
+        table[is_space] = _CLASS_IDS[None]
+        _CODE_CLASSES = table
+    return _CODE_CLASSES
+
+
+def _script_counts_numpy(texts: List[str]) -> List[ScriptCounts]:
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    classes = _code_class_table()[codes]
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+
+    # One histogram over (text index, class) gives every count for every text
+    n_classes = len(_CLASS_IDS)
+    text_index = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+    counts = np.bincount(
+        text_index * n_classes + classes, minlength=len(texts) * n_classes
+    ).reshape(len(texts), n_classes)
+
+    arabic_alpha = counts[:, _CLASS_IDS[ARABIC_ALPHA]]
+    urdu_alpha = arabic_alpha + counts[:, _CLASS_IDS[PRESENTATION_ALPHA]]
+    alpha = urdu_alpha + counts[:, _CLASS_IDS[ALPHA]]
+    arabic_block = arabic_alpha + counts[:, _CLASS_IDS[ARABIC_OTHER]]
+    non_space = lengths - counts[:, _CLASS_IDS[None]]
+
+    return [
+        ScriptCounts(int(u), int(a), int(b), int(n))
+        for u, a, b, n in zip(urdu_alpha, alpha, arabic_block, non_space)
+    ]
+
+
+def script_counts_batch(texts: Iterable[str]) -> List[ScriptCounts]:
+    """Script counts for many texts; vectorised with NumPy for large batches."""
+    texts = [t or "" for t in texts]
+    if NUMPY_AVAILABLE and sum(map(len, texts)) >= NUMPY_MIN_CHARS:
+        try:
+            return _script_counts_numpy(texts)
+        except UnicodeEncodeError:
+            # Lone surrogates can't be encoded; count those texts one by one
+            pass
+    return [script_counts(t) for t in texts]
+
+
+def urdu_char_ratios(texts: Iterable[str]) -> List[float]:
+    """``urdu_char_ratio`` for each text."""
+    return [c.urdu_ratio for c in script_counts_batch(texts)]
+
+
+def urdu_purities(texts: Iterable[str]) -> List[float]:
+    """``urdu_purity`` for each text."""
+    return [c.purity for c in script_counts_batch(texts)]
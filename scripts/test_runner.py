@@ -14,17 +14,27 @@ Author: Fawad Hussain
 Website: fawadhs.dev
 """
 
+import argparse
+import asyncio
 import json
+import math
 import os
+import queue
+import random
+import re
 import sys
+import threading
 import time
 import platform
 import subprocess
 import socket
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from dataclasses import dataclass, asdict, field
-from typing import Optional, List, Dict, Any
+from dataclasses import dataclass, asdict, field, replace
+from typing import Optional, List, Dict, Any, Iterator, Tuple, Callable
 from tqdm import tqdm
 
 # Try importing ollama with error handling
@@ -41,6 +51,15 @@ try:
 except ImportError:
     PSUTIL_AVAILABLE = False
 
+from response_cache import ResponseCache, DEFAULT_MAX_SIZE_MB, response_to_dict
+from script_analysis import urdu_char_ratio
+from keyword_matcher import match_keywords
+from results_store import ResultsStore, PYARROW_AVAILABLE
+from backends import (
+    InferenceBackend, OllamaBackend, create_backend, BACKENDS,
+    DEFAULT_OPENAI_BASE_URL, HF_MODEL_NAME, DEFAULT_BATCH_SIZE, DTYPES
+)
+
 
 # ============================================================
 # Configuration
@@ -50,12 +69,68 @@ MODEL_NAME = "enstazao/qalb:8b-instruct-fp16"
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 TESTS_DIR = PROJECT_ROOT / "tests"
+BASELINE_DIR = DATA_DIR / "baseline"
+# Runs on other serving stacks: data/backends/<backend>/<model>/
+BACKENDS_DIR = DATA_DIR / "backends"
 CHECKPOINT_DIR = DATA_DIR / "checkpoints"
+CACHE_FILE = DATA_DIR / "cache" / "responses.sqlite"
+
+# Checkpoint log configuration (append-only JSONL, fsync batched)
+CHECKPOINT_FORMAT_VERSION = 2
+CHECKPOINT_FSYNC_EVERY = 10
+CHECKPOINT_FSYNC_SECONDS = 5.0
 
 # Retry configuration
 MAX_RETRIES = 3
 RETRY_DELAY_SECONDS = 5
+RETRY_BACKOFF_MAX_SECONDS = 60
 CONNECTION_TIMEOUT = 30
+TEST_TIMEOUT_SECONDS = 300  # Per-test deadline for the async runner
+
+# Endpoint pool configuration
+ENDPOINT_RETRY_AFTER_SECONDS = 30  # How long a failed node stays drained
+LATENCY_EWMA_ALPHA = 0.3
+
+# Concurrency configuration - match the server's OLLAMA_NUM_PARALLEL so every
+# slot stays busy. 1 keeps the original sequential behaviour.
+DEFAULT_WORKERS = max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL") or 1))
+
+# Response-time bonus thresholds when scoring on time to first token (streaming)
+TTFT_SCORE_THRESHOLDS_MS = (500, 1000, 2000)
+
+# Early stopping (streaming): text needed before a keyword-graded test may be
+# cut short, so the Urdu ratio is measured on a representative sample
+EARLY_STOP_MIN_CHARS = 120
+
+# Generation options sent with every test prompt (the "default" profile)
+GENERATION_OPTIONS = {
+    "num_predict": 256,
+    "temperature": 0.7,
+}
+
+# Generation profiles come from the test file: "generation_profiles" maps a
+# profile name to options laid over GENERATION_OPTIONS (num_predict,
+# temperature, stop, num_ctx, keep_alive, ...), "category_profiles" maps a
+# category to its profile, and a test may set its own "generation_profile"
+# and "generation_options". A "default" profile applies to every test.
+DEFAULT_PROFILE = "default"
+# Profile settings sent as request parameters rather than model options
+REQUEST_PARAMETERS = ("keep_alive",)
+
+# Keep the model resident between requests (Ollama duration, or seconds;
+# -1 keeps it loaded indefinitely). Sent with every request unless a
+# generation profile sets its own.
+DEFAULT_KEEP_ALIVE = "30m"
+# A server-reported load_duration above this means the request paid for
+# loading the model; a resident model reports a few milliseconds
+COLD_LOAD_THRESHOLD_MS = 500
+
+# Repeat sampling: each repeat gets its own reproducible sampling seed
+REPEAT_SEED_BASE = 1
+DEFAULT_MIN_REPEATS = 3
+# Half-width (score points) of the 95% interval on a suite's average score
+# that repeats should reach, so a 1-point swing between rounds is resolvable
+SUITE_CI_TARGET = 1.0
 
 
 # ============================================================
@@ -172,19 +247,168 @@ def check_internet_connection(host: str = "8.8.8.8", port: int = 53, timeout: in
         return False
 
 
-def check_ollama_connection() -> bool:
-    """Check if Ollama service is running and accessible."""
+CONNECTION_ERROR_MARKERS = ("connect", "refused", "reset", "readerror", "remoteprotocolerror")
+
+
+def describe_error(error: Exception) -> str:
+    """Return a readable message for an exception (some transport errors have none)."""
+    return str(error) or type(error).__name__
+
+
+def is_connection_error(error: str) -> bool:
+    """Return True if an error message looks like a lost Ollama connection."""
+    error = error.lower()
+    return any(marker in error for marker in CONNECTION_ERROR_MARKERS)
+
+
+def check_ollama_connection(host: Optional[str] = None) -> bool:
+    """Check if Ollama service is running and accessible.
+    
+    Args:
+        host: Ollama base URL to check; the default local client when omitted
+    """
     if not OLLAMA_AVAILABLE:
         return False
     
     try:
         # Try to list models - this will fail if Ollama isn't running
-        ollama.list()
+        if host:
+            ollama.Client(host=host, timeout=CONNECTION_TIMEOUT).list()
+        else:
+            ollama.list()
         return True
     except Exception:
         return False
 
 
+# ============================================================
+# Endpoint Pool (Multi-Node Load Balancing)
+# ============================================================
+
+@dataclass
+class OllamaEndpoint:
+    """One Ollama server in an endpoint pool."""
+    url: str
+    client: Any = None
+    async_client: Any = None
+    outstanding: int = 0
+    latency_ewma_ms: float = 0.0
+    completed: int = 0
+    failures: int = 0
+    healthy: bool = True
+    drained_at: float = 0.0
+
+
+class EndpointPool:
+    """Dispatches requests across several Ollama servers.
+    
+    Each request goes to the healthy node with the lowest expected wait,
+    ``(outstanding + 1) × latency EWMA``; nodes without latency samples yet are
+    picked by least outstanding requests. A node that fails with a connection
+    error is drained and only re-probed after ``retry_after`` seconds.
+    """
+    
+    def __init__(self, urls: List[str], retry_after: float = ENDPOINT_RETRY_AFTER_SECONDS):
+        if not urls:
+            raise ValueError("EndpointPool needs at least one Ollama URL")
+        self.endpoints = [
+            OllamaEndpoint(url=url, client=ollama.Client(host=url)) for url in urls
+        ]
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.endpoints)
+    
+    def _expected_wait(self, endpoint: OllamaEndpoint) -> tuple:
+        if endpoint.latency_ewma_ms:
+            return ((endpoint.outstanding + 1) * endpoint.latency_ewma_ms, endpoint.outstanding)
+        return (0.0, endpoint.outstanding)
+    
+    def acquire(self, prefer: Optional[str] = None) -> Optional[OllamaEndpoint]:
+        """Reserve the best healthy endpoint, or None if every node is drained.
+        
+        ``prefer`` names an endpoint URL to use while it is healthy, e.g. one
+        that already holds a prompt in its cache.
+        """
+        self._revive_due()
+        with self._lock:
+            healthy = [ep for ep in self.endpoints if ep.healthy]
+            if not healthy:
+                return None
+            preferred = [ep for ep in healthy if ep.url == prefer]
+            endpoint = preferred[0] if preferred else min(healthy, key=self._expected_wait)
+            endpoint.outstanding += 1
+            return endpoint
+    
+    def release(self, endpoint: OllamaEndpoint, elapsed_ms: float, ok: bool = True):
+        """Return an endpoint after a request, recording its latency."""
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if ok:
+                endpoint.completed += 1
+                if endpoint.latency_ewma_ms:
+                    endpoint.latency_ewma_ms += LATENCY_EWMA_ALPHA * (elapsed_ms - endpoint.latency_ewma_ms)
+                else:
+                    endpoint.latency_ewma_ms = elapsed_ms
+    
+    def drain(self, endpoint: OllamaEndpoint):
+        """Take a failing endpoint out of rotation."""
+        with self._lock:
+            endpoint.failures += 1
+            if endpoint.healthy:
+                endpoint.healthy = False
+                endpoint.drained_at = time.time()
+                print(f"\n   🚫 Draining endpoint {endpoint.url}")
+    
+    def _revive_due(self):
+        """Re-probe drained endpoints whose back-off period has passed."""
+        now = time.time()
+        with self._lock:
+            due = [ep for ep in self.endpoints
+                   if not ep.healthy and now - ep.drained_at >= self.retry_after]
+            for ep in due:
+                # Push the next probe out so concurrent callers don't all probe
+                ep.drained_at = now
+        for ep in due:
+            if check_ollama_connection(ep.url):
+                with self._lock:
+                    ep.healthy = True
+                print(f"\n   ✅ Endpoint back in rotation: {ep.url}")
+    
+    def health_check(self) -> Dict[str, bool]:
+        """Probe every endpoint, updating and returning their health."""
+        status = {}
+        for ep in self.endpoints:
+            ok = check_ollama_connection(ep.url)
+            with self._lock:
+                if ok:
+                    ep.healthy = True
+                elif ep.healthy:
+                    ep.healthy = False
+                    ep.drained_at = time.time()
+            status[ep.url] = ok
+        return status
+    
+    def has_healthy(self) -> bool:
+        with self._lock:
+            return any(ep.healthy for ep in self.endpoints)
+    
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-endpoint counters for the run summary."""
+        with self._lock:
+            return [
+                {
+                    "url": ep.url,
+                    "completed": ep.completed,
+                    "failures": ep.failures,
+                    "latency_ewma_ms": ep.latency_ewma_ms,
+                    "healthy": ep.healthy,
+                }
+                for ep in self.endpoints
+            ]
+
+
 # ============================================================
 # Checkpoint Management (Resume Functionality)
 # ============================================================
@@ -197,26 +421,159 @@ class Checkpoint:
     results: List[Dict] = field(default_factory=list)
     last_updated: str = ""
     system_specs: Dict = field(default_factory=dict)
+    # Backend and model that produced the results; a run only resumes its own
+    backend: str = ""
+    model: str = ""
+
+
+def _checkpoint_line(record: Dict) -> bytes:
+    """Encode one checkpoint record as a compact JSONL line."""
+    return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _checkpoint_header(checkpoint: Checkpoint) -> Dict:
+    return {
+        "type": "header",
+        "version": CHECKPOINT_FORMAT_VERSION,
+        "test_file": checkpoint.test_file,
+        "backend": checkpoint.backend,
+        "model": checkpoint.model,
+        "created": datetime.now().isoformat(),
+        "system_specs": checkpoint.system_specs,
+    }
 
 
 def save_checkpoint(checkpoint: Checkpoint, checkpoint_file: Path):
-    """Save checkpoint to disk."""
+    """Write a complete checkpoint log (header plus all results) to disk.
+    
+    Used to start a fresh log; during a run results are appended with
+    CheckpointWriter instead. Writes to a temporary file and swaps it in, so an
+    interrupted write never leaves a half-written checkpoint behind.
+    """
     checkpoint.last_updated = datetime.now().isoformat()
     checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(checkpoint_file, 'w', encoding='utf-8') as f:
-        json.dump(asdict(checkpoint), f, ensure_ascii=False, indent=2)
+    tmp_file = checkpoint_file.with_suffix(checkpoint_file.suffix + ".tmp")
+    with open(tmp_file, 'wb') as f:
+        f.write(_checkpoint_line(_checkpoint_header(checkpoint)))
+        for result in checkpoint.results:
+            f.write(_checkpoint_line({"type": "result", "result": result}))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, checkpoint_file)
+
+
+class CheckpointWriter:
+    """Append-only writer for a JSONL checkpoint log.
+    
+    Each completed test is one line, so saving a result costs O(1) instead of
+    re-serialising every earlier result. Lines are flushed to the OS on every
+    append; fsync is batched every ``fsync_every`` records or
+    ``fsync_seconds``, and always on close.
+    """
+    
+    def __init__(
+        self,
+        checkpoint_file: Path,
+        fsync_every: int = CHECKPOINT_FSYNC_EVERY,
+        fsync_seconds: float = CHECKPOINT_FSYNC_SECONDS
+    ):
+        self.checkpoint_file = checkpoint_file
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self._file = open(checkpoint_file, 'ab')
+        self._pending = 0
+        self._last_sync = time.time()
+    
+    def append(self, result: Dict):
+        """Append one test result to the log."""
+        self._file.write(_checkpoint_line({"type": "result", "result": result}))
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.time() - self._last_sync >= self.fsync_seconds:
+            self.sync()
+    
+    def sync(self):
+        """Force buffered records to stable storage."""
+        if self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+        self._last_sync = time.time()
+    
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+    
+    def __enter__(self) -> "CheckpointWriter":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 def load_checkpoint(checkpoint_file: Path) -> Optional[Checkpoint]:
-    """Load checkpoint from disk if exists."""
+    """Load checkpoint from disk if exists.
+    
+    Replays the JSONL log in one streaming pass. A torn last line (from a crash
+    mid-write) is dropped and truncated away so later appends stay aligned;
+    other unreadable lines are skipped with a warning.
+    """
     if not checkpoint_file.exists():
         return None
     
+    checkpoint = None
+    results: Dict[str, Dict] = {}
+    skipped = 0
+    good_bytes = 0
+    torn_tail = False
+    
     try:
-        with open(checkpoint_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return Checkpoint(**data)
+        with open(checkpoint_file, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    record = json.loads(line)
+                except ValueError:
+                    if f.peek(1):
+                        # Damaged record mid-log: later records are still valid
+                        skipped += 1
+                        good_bytes += len(line)
+                        continue
+                    torn_tail = True
+                    break
+                
+                good_bytes += len(line)
+                if record.get("type") == "header":
+                    checkpoint = Checkpoint(
+                        test_file=record.get("test_file", ""),
+                        system_specs=record.get("system_specs", {}),
+                        backend=record.get("backend", ""),
+                        model=record.get("model", ""),
+                        last_updated=record.get("created", "")
+                    )
+                elif record.get("type") == "result":
+                    result = record["result"]
+                    # A test re-run after resume supersedes its earlier record
+                    results.pop(result["test_id"], None)
+                    results[result["test_id"]] = result
+        
+        if torn_tail:
+            with open(checkpoint_file, 'r+b') as f:
+                f.truncate(good_bytes)
+            print("⚠️  Dropped a partially written record from the checkpoint")
+        if skipped:
+            print(f"⚠️  Skipped {skipped} unreadable checkpoint records")
+        if checkpoint is None:
+            print("⚠️  Could not load checkpoint: missing header record")
+            return None
+        
+        checkpoint.results = list(results.values())
+        checkpoint.completed_test_ids = list(results.keys())
+        if checkpoint.results:
+            checkpoint.last_updated = checkpoint.results[-1].get("timestamp", checkpoint.last_updated)
+        return checkpoint
     except Exception as e:
         print(f"⚠️  Could not load checkpoint: {e}")
         return None
@@ -243,6 +600,10 @@ class TestCase:
     expected_keywords: List[str]
     difficulty: str  # "easy", "medium", "hard"
     tags: List[str]
+    # Profile name and per-test overrides from the test file; once loaded,
+    # generation_options holds the resolved options the prompt is sent with
+    generation_profile: Optional[str] = None
+    generation_options: Dict[str, Any] = field(default_factory=dict)
 
 
 @dataclass
@@ -263,6 +624,405 @@ class TestResult:
     model: str
     error: Optional[str] = None
     retry_count: int = 0
+    endpoint: Optional[str] = None
+    cached: bool = False
+    # Server-reported token counts and timings (zero when the backend reports none)
+    eval_count: int = 0
+    prompt_eval_count: int = 0
+    eval_duration_ms: float = 0.0
+    prompt_eval_duration_ms: float = 0.0
+    load_duration_ms: float = 0.0
+    # Model load time this request paid (cold load), taken out of response_time_ms and ttft_ms
+    cold_start_ms: float = 0.0
+    total_duration_ms: float = 0.0
+    prefill_tokens_per_second: float = 0.0
+    ttft_ms: float = 0.0
+    # Client-side streaming latencies (streaming mode only)
+    streamed: bool = False
+    itl_p50_ms: float = 0.0
+    itl_p95_ms: float = 0.0
+    itl_p99_ms: float = 0.0
+    # Generation stopped once the keyword outcome was decided (early-stop mode)
+    early_stopped: bool = False
+    # Generation profile used, and whether the answer hit its num_predict budget
+    generation_profile: str = DEFAULT_PROFILE
+    truncated: bool = False
+    # Prompts generated together in one batch (batching backends); the
+    # response time is then shared with the batch and not scored
+    batch_size: int = 1
+    # Repeat sampling (repeats > 1): score, response time and speed are means
+    # over the repeats, token counts are totals, the response is a typical one
+    repeats: int = 1
+    repeat_scores: List[float] = field(default_factory=list)
+    score_stddev: float = 0.0
+    score_ci_95: float = 0.0
+    consistency: float = 0.0
+
+
+def resolve_profile(
+    test_case: TestCase,
+    profiles: Dict[str, Dict[str, Any]],
+    category_profiles: Dict[str, str]
+) -> Tuple[str, Dict[str, Any]]:
+    """Generation profile name and options for a test.
+    
+    The test's own profile takes precedence over its category's. Options are
+    layered: GENERATION_OPTIONS, the file's "default" profile, the named
+    profile, then the test's own generation_options.
+    """
+    name = test_case.generation_profile or category_profiles.get(test_case.category, DEFAULT_PROFILE)
+    if name != DEFAULT_PROFILE and name not in profiles:
+        raise ValueError(f"Test {test_case.id}: unknown generation profile '{name}'")
+    options = {
+        **GENERATION_OPTIONS,
+        **profiles.get(DEFAULT_PROFILE, {}),
+        **profiles.get(name, {}),
+        **test_case.generation_options,
+    }
+    return name, options
+
+
+def parse_keep_alive(value: str) -> Any:
+    """A keep_alive setting as Ollama expects it: seconds as a number, else a duration string."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def generate_request(
+    model: str,
+    prompt: str,
+    options: Dict[str, Any],
+    keep_alive: Any = None
+) -> Dict[str, Any]:
+    """Keyword arguments for an Ollama generate call with the given profile options.
+    
+    ``keep_alive`` applies unless the profile options set their own.
+    """
+    request = dict(model=model, prompt=prompt)
+    if keep_alive is not None:
+        request["keep_alive"] = keep_alive
+    request.update((k, options[k]) for k in REQUEST_PARAMETERS if k in options)
+    request["options"] = {k: v for k, v in options.items() if k not in REQUEST_PARAMETERS}
+    return request
+
+
+def ollama_timings(response: Any) -> Dict[str, float]:
+    """Token counts and timings from an Ollama generate response.
+    
+    Durations are reported in nanoseconds and converted to milliseconds.
+    Time to first token is load time plus prompt evaluation (prefill), which
+    is when decoding starts on the server.
+    """
+    def ms(name: str) -> float:
+        return (response.get(name) or 0) / 1e6
+    
+    eval_count = response.get("eval_count") or 0
+    prompt_eval_count = response.get("prompt_eval_count") or 0
+    eval_ms = ms("eval_duration")
+    prompt_eval_ms = ms("prompt_eval_duration")
+    load_ms = ms("load_duration")
+    
+    return {
+        "eval_count": eval_count,
+        "prompt_eval_count": prompt_eval_count,
+        "eval_duration_ms": eval_ms,
+        "prompt_eval_duration_ms": prompt_eval_ms,
+        "load_duration_ms": load_ms,
+        "total_duration_ms": ms("total_duration"),
+        "tokens_per_second": eval_count / (eval_ms / 1000) if eval_ms > 0 else 0.0,
+        "prefill_tokens_per_second": prompt_eval_count / (prompt_eval_ms / 1000) if prompt_eval_ms > 0 else 0.0,
+        "ttft_ms": load_ms + prompt_eval_ms if prompt_eval_count else 0.0,
+    }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile (0-100) of a list; 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def streaming_stats(start: float, chunk_times: List[float]) -> Dict[str, Any]:
+    """Latency statistics from the arrival times of streamed chunks.
+    
+    Args:
+        start: perf_counter() when the request was sent
+        chunk_times: perf_counter() at each chunk carrying text
+    """
+    gaps = [(b - a) * 1000 for a, b in zip(chunk_times, chunk_times[1:])]
+    decode_seconds = chunk_times[-1] - chunk_times[0] if len(chunk_times) > 1 else 0
+    return {
+        "ttft_ms": (chunk_times[0] - start) * 1000 if chunk_times else 0.0,
+        "itl_p50_ms": percentile(gaps, 50),
+        "itl_p95_ms": percentile(gaps, 95),
+        "itl_p99_ms": percentile(gaps, 99),
+        "tokens_per_second": len(gaps) / decode_seconds if decode_seconds > 0 else 0.0,
+        "inter_token_ms": gaps,
+    }
+
+
+# Two-sided 95% Student t critical values, by degrees of freedom
+T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+    9: 2.262, 10: 2.228, 15: 2.131, 20: 2.086, 30: 2.042, 60: 2.000, 120: 1.980,
+}
+Z_95 = 1.96
+
+
+def t_critical_95(df: int) -> float:
+    """95% t critical value, rounded up to the nearest tabulated degrees of freedom."""
+    if df < 1:
+        return math.inf
+    if df > max(T_CRITICAL_95):
+        return Z_95
+    return T_CRITICAL_95[max(k for k in T_CRITICAL_95 if k <= df)]
+
+
+def ci_halfwidth(values: List[float]) -> float:
+    """Half-width of the 95% confidence interval for the mean of ``values``."""
+    if len(values) < 2:
+        return math.inf
+    return t_critical_95(len(values) - 1) * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def repeats_needed(variances: List[float], target: float) -> int:
+    """Repeats per test for the mean over tests to reach a 95% half-width of ``target``.
+    
+    With per-test score variances s², the average of N per-test means over k
+    repeats has variance Σs² / (N² k), so k = (1.96 / target)² Σs² / N².
+    """
+    if not variances:
+        return 1
+    return max(1, math.ceil((Z_95 / target) ** 2 * sum(variances) / len(variances) ** 2))
+
+
+def outcome(result: TestResult) -> frozenset:
+    """What a run answered, as graded: the set of keywords it matched."""
+    return frozenset(result.passed_keywords)
+
+
+def combine_repeats(samples: List[TestResult]) -> TestResult:
+    """Fold repeated runs of one test into a single result.
+    
+    Consistency is the ROADMAP metric ``matching_runs / total_runs × 100``,
+    where runs match when they matched the same keywords as the most common
+    outcome. Failed runs are left out; if every run failed the last failure
+    is returned.
+    """
+    ok = [s for s in samples if not s.error]
+    if not ok:
+        return replace(samples[-1], repeats=len(samples))
+    
+    scores = [s.score for s in ok]
+    mean_score = statistics.fmean(scores)
+    modal, matching = Counter(outcome(s) for s in ok).most_common(1)[0]
+    typical = min((s for s in ok if outcome(s) == modal), key=lambda s: abs(s.score - mean_score))
+    return replace(
+        typical,
+        score=mean_score,
+        response_time_ms=statistics.fmean(s.response_time_ms for s in ok),
+        tokens_per_second=statistics.fmean(s.tokens_per_second for s in ok),
+        eval_count=sum(s.eval_count for s in ok),
+        prompt_eval_count=sum(s.prompt_eval_count for s in ok),
+        retry_count=sum(s.retry_count for s in samples),
+        cached=all(s.cached for s in ok),
+        repeats=len(samples),
+        repeat_scores=scores,
+        score_stddev=statistics.stdev(scores) if len(scores) > 1 else 0.0,
+        score_ci_95=ci_halfwidth(scores) if len(scores) > 1 else 0.0,
+        consistency=matching / len(ok) * 100,
+    )
+
+
+class StreamCollector:
+    """Accumulates a streamed generation: text, chunk arrival times and final metadata.
+    
+    ``decided`` is called with the text so far after every chunk; once it
+    returns True the caller should stop reading the stream.
+    """
+    
+    def __init__(self, decided: Optional[Callable[[str], bool]] = None):
+        self.start = time.perf_counter()
+        self.decided = decided
+        self.chunk_times: List[float] = []
+        self.parts: List[str] = []
+        self.final: Dict[str, Any] = {}
+        self.early_stopped = False
+    
+    def add(self, chunk: Any) -> bool:
+        """Record one chunk; returns True when the rest of the stream isn't needed."""
+        text = chunk.get("response", "")
+        if text:
+            self.chunk_times.append(time.perf_counter())
+            self.parts.append(text)
+        if chunk.get("done"):
+            self.final = response_to_dict(chunk)
+        elif text and self.decided is not None and self.decided("".join(self.parts)):
+            self.early_stopped = True
+        return self.early_stopped
+    
+    def result(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """The response dict (as a non-streamed generate returns it) and streaming stats."""
+        final = dict(self.final)
+        final["response"] = "".join(self.parts)
+        stats = streaming_stats(self.start, self.chunk_times)
+        if self.early_stopped:
+            # No final chunk arrives; Ollama streams one token per chunk
+            final["eval_count"] = len(self.chunk_times)
+            stats["early_stopped"] = True
+        return final, stats
+
+
+def calculate_category_latency(
+    results: List[TestResult],
+    itl_samples: Dict[str, List[float]]
+) -> Dict[str, Dict[str, float]]:
+    """Per-category streaming latency: TTFT spread and pooled inter-token percentiles."""
+    by_category: Dict[str, List[TestResult]] = {}
+    for r in results:
+        if r.streamed and not r.error:
+            by_category.setdefault(r.category, []).append(r)
+    
+    summary = {}
+    for category, cat_results in sorted(by_category.items()):
+        ttfts = [r.ttft_ms for r in cat_results if r.ttft_ms > 0]
+        gaps = [g for r in cat_results for g in itl_samples.get(r.test_id, [])]
+        summary[category] = {
+            "tests": len(cat_results),
+            "ttft_p50_ms": percentile(ttfts, 50),
+            "ttft_p95_ms": percentile(ttfts, 95),
+            "itl_p50_ms": percentile(gaps, 50),
+            "itl_p95_ms": percentile(gaps, 95),
+            "itl_p99_ms": percentile(gaps, 99),
+            "average_tokens_per_second": sum(r.tokens_per_second for r in cat_results) / len(cat_results),
+        }
+    return summary
+
+
+def calculate_profile_usage(results: List[TestResult]) -> Dict[str, Dict[str, float]]:
+    """Per-profile decode budget use: tokens generated and answers cut off at num_predict."""
+    by_profile: Dict[str, List[TestResult]] = {}
+    for r in results:
+        if not r.error:
+            by_profile.setdefault(r.generation_profile, []).append(r)
+    
+    return {
+        profile: {
+            "tests": len(profile_results),
+            "categories": sorted({r.category for r in profile_results}),
+            "average_eval_tokens": sum(r.eval_count for r in profile_results) / len(profile_results),
+            "max_eval_tokens": max(r.eval_count for r in profile_results),
+            "truncated": sum(1 for r in profile_results if r.truncated),
+            "total_time_s": sum(r.response_time_ms for r in profile_results) / 1000,
+        }
+        for profile, profile_results in sorted(by_profile.items())
+    }
+
+
+def calculate_suite_metrics(results: List[TestResult]) -> Dict[str, Any]:
+    """Aggregate metrics for one test suite; averages cover successful tests only."""
+    successful_results = [r for r in results if not r.error]
+    count = len(successful_results)
+    # Token timings only exist where the server reported them; a full prompt
+    # cache hit reports no prefill, so those results carry no TTFT either
+    timed_results = [r for r in successful_results if r.eval_count]
+    ttft_results = [r for r in timed_results if r.ttft_ms > 0]
+    prefill_results = [r for r in timed_results if r.prefill_tokens_per_second > 0]
+    
+    def average(values, n: int = count) -> float:
+        return sum(values) / n if n else 0
+    
+    metrics = {
+        "average_score": average(r.score for r in successful_results),
+        "average_response_time_ms": average(r.response_time_ms for r in successful_results),
+        "average_tokens_per_second": average(r.tokens_per_second for r in successful_results),
+        "average_prefill_tokens_per_second": average(
+            (r.prefill_tokens_per_second for r in prefill_results), len(prefill_results)
+        ),
+        "average_ttft_ms": average((r.ttft_ms for r in ttft_results), len(ttft_results)),
+        "average_load_duration_ms": average((r.load_duration_ms for r in timed_results), len(timed_results)),
+        "cold_loads": sum(1 for r in successful_results if r.cold_start_ms),
+        "cold_start_ms": sum(r.cold_start_ms for r in successful_results),
+        "total_prompt_tokens": sum(r.prompt_eval_count for r in successful_results),
+        "total_eval_tokens": sum(r.eval_count for r in successful_results),
+        "average_urdu_ratio": average(r.urdu_char_ratio for r in successful_results),
+        "total_retries": sum(r.retry_count for r in results),
+        "cached_responses": sum(1 for r in results if r.cached),
+        "early_stopped_tests": sum(1 for r in successful_results if r.early_stopped),
+        "truncated_tests": sum(1 for r in successful_results if r.truncated),
+    }
+    
+    repeated = [r for r in successful_results if r.repeats > 1]
+    if repeated:
+        variances = [r.score_stddev ** 2 for r in repeated]
+        metrics.update({
+            "total_repeats": sum(len(r.repeat_scores) for r in repeated),
+            "consistency": average((r.consistency for r in repeated), len(repeated)),
+            "average_score_stddev": average((r.score_stddev for r in repeated), len(repeated)),
+            # Sampling noise of the average score: tests fixed, outputs resampled
+            "average_score_ci_95": Z_95 * math.sqrt(
+                sum(v / len(r.repeat_scores) for v, r in zip(variances, repeated))
+            ) / len(repeated),
+            "repeats_needed": repeats_needed(variances, SUITE_CI_TARGET),
+        })
+    return metrics
+
+
+def batch_throughput(before: Dict[str, Any], after: Dict[str, Any]) -> float:
+    """Generated tokens per second of batched generation between two backend stats snapshots."""
+    seconds = after.get("seconds", 0.0) - before.get("seconds", 0.0)
+    tokens = after.get("generated_tokens", 0) - before.get("generated_tokens", 0)
+    return tokens / seconds if seconds > 0 else 0.0
+
+
+def calculate_overall_metrics(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-suite summaries into the overall metrics of combined_results.json."""
+    # Suites without a measured TTFT (no timings, or all cache hits) are left out
+    ttfts = [s["metrics"]["average_ttft_ms"] for s in summaries if s["metrics"].get("average_ttft_ms", 0) > 0]
+    return {
+        "total_tests": sum(s["total_tests"] for s in summaries),
+        "successful_tests": sum(s["successful_tests"] for s in summaries),
+        "failed_tests": sum(s["failed_tests"] for s in summaries),
+        "average_score": sum(s["metrics"]["average_score"] for s in summaries) / len(summaries),
+        "average_tokens_per_second": sum(
+            s["metrics"].get("average_tokens_per_second", 0) for s in summaries
+        ) / len(summaries),
+        "average_ttft_ms": sum(ttfts) / len(ttfts) if ttfts else 0,
+        "total_eval_tokens": sum(s["metrics"].get("total_eval_tokens", 0) for s in summaries),
+        "total_retries": sum(s["metrics"]["total_retries"] for s in summaries),
+    }
+
+
+def baseline_test_files(round_num: int = 4) -> Tuple[Path, Path]:
+    """Urdu script and Roman Urdu test files of a baseline round."""
+    suffix = f"_round{round_num}" if round_num in (2, 3, 4) else ""
+    return (
+        TESTS_DIR / "baseline" / f"urdu_script_tests{suffix}.json",
+        TESTS_DIR / "baseline" / f"roman_urdu_tests{suffix}.json",
+    )
+
+
+def model_slug(model: str) -> str:
+    """A model tag, served name or local path as one directory name."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model).strip("_") or "model"
+
+
+def backend_output_dir(backend: str, model: str) -> Path:
+    """Where a run's results files and checkpoints go.
+
+    Ollama runs keep data/baseline, which the analysis scripts read; every
+    other backend and model gets its own directory so runs on different
+    serving stacks never overwrite each other.
+    """
+    if backend == "ollama":
+        return BASELINE_DIR
+    return BACKENDS_DIR / backend / model_slug(model)
 
 
 # ============================================================
@@ -272,9 +1032,64 @@ class TestResult:
 class QalbTestRunner:
     """Main test runner for Qalb model evaluation with error handling and resume."""
     
-    def __init__(self, model_name: str = MODEL_NAME):
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        workers: int = DEFAULT_WORKERS,
+        hosts: Optional[List[str]] = None,
+        cache: Optional[ResponseCache] = None,
+        rescore_only: bool = False,
+        stream: bool = False,
+        score_on_ttft: bool = False,
+        results_store: Optional[ResultsStore] = None,
+        repeats: int = 1,
+        min_repeats: int = DEFAULT_MIN_REPEATS,
+        target_ci: Optional[float] = None,
+        early_stop: bool = False,
+        keep_alive: Any = DEFAULT_KEEP_ALIVE,
+        warm_up: bool = True,
+        backend: Optional[InferenceBackend] = None,
+        output_dir: Path = BASELINE_DIR,
+        checkpoint_dir: Path = CHECKPOINT_DIR
+    ):
         self.model_name = model_name
+        # Results files (per script under output_dir) and resume checkpoints
+        self.output_dir = output_dir
+        self.checkpoint_dir = checkpoint_dir
+        self.workers = max(1, workers)
+        # Several Ollama servers are load balanced; otherwise the default local client is used
+        self.pool: Optional[EndpointPool] = EndpointPool(hosts) if hosts else None
+        # Re-scoring replays cached responses and never calls the model
+        self.cache = cache
+        self.rescore_only = rescore_only
+        self.model_digest: Optional[str] = None
+        # Streaming records per-chunk timings; the time bonus can then use TTFT.
+        # Early stopping ends keyword-graded generations once every keyword has
+        # matched, so it streams; the scoring mode stays as chosen, and the
+        # suite's scoring block marks its truncated response times
+        self.early_stop = early_stop
+        self.stream = stream or early_stop
+        self.score_on_ttft = score_on_ttft
+        self.itl_samples: Dict[str, List[float]] = {}
+        # Columnar copy of every suite run, alongside the JSON results files
+        self.results_store = results_store
+        # Repeat sampling: up to ``repeats`` runs per test; with ``target_ci``
+        # a test stops once its 95% interval is that narrow (after min_repeats)
+        self.repeats = max(1, repeats)
+        self.min_repeats = max(2, min(min_repeats, self.repeats))
+        self.target_ci = target_ci
+        # Model residency: keep_alive goes with every request, and the model is
+        # loaded on every endpoint before the first test so no test pays for it
+        self.keep_alive = keep_alive
+        self.warm_up_enabled = warm_up
+        self.warm_up_stats: List[Dict[str, Any]] = []
+        # Another serving stack (backends.py) used instead of the built-in
+        # Ollama client; backends that batch run their tests in batches
+        self.backend = backend
+        self.backend_info: Dict[str, Any] = {}
         self.results: List[TestResult] = []
+        # Version and generation profiles of each loaded test file, by name
+        self.profile_sets: Dict[str, Dict[str, Any]] = {}
         self.system_specs: Optional[SystemSpecs] = None
         self.current_checkpoint: Optional[Checkpoint] = None
         
@@ -297,6 +1112,23 @@ class QalbTestRunner:
         print(f"   Internet: {'✅ Connected' if self.system_specs.internet_available else '❌ Offline'}")
         print(f"   {'─'*50}\n")
         
+        if self.backend:
+            # No Ollama service to check or warm up; the backend loads its own model
+            print(f"   🧠 Backend: {self.backend.describe()}")
+            if not self.backend.health():
+                print(f"❌ {self.backend.name} backend is not reachable!")
+                return False
+            try:
+                self.backend_info = self.backend.metadata()
+            except Exception as e:
+                print(f"   ⚠️  Could not read backend metadata: {describe_error(e)}")
+                self.backend_info = {"backend": self.backend.name}
+            self.model_digest = self.backend_info.get("digest") or None
+            if self.cache and self.model_digest:
+                self.cache.remember_model(self.model_name, self.model_digest)
+            print("\n✅ Prerequisites check complete!\n")
+            return True
+        
         # Check Ollama
         if not OLLAMA_AVAILABLE:
             print("❌ Ollama Python package not installed!")
@@ -305,7 +1137,14 @@ class QalbTestRunner:
         
         # Check Ollama service
         print("   🔌 Checking Ollama service...")
-        if not check_ollama_connection():
+        if self.pool:
+            status = self.pool.health_check()
+            for url, ok in status.items():
+                print(f"   {'✅' if ok else '❌'} {url}")
+            if not any(status.values()):
+                print("❌ No Ollama endpoint is reachable!")
+                return False
+        elif not check_ollama_connection():
             print("❌ Ollama service not running!")
             print("   Start Ollama or run: ollama serve")
             
@@ -341,75 +1180,183 @@ class QalbTestRunner:
         # Check if model is available
         print(f"   🤖 Checking model: {self.model_name}...")
         try:
-            models = ollama.list()
+            models = self._healthy_client().list()
             # Handle different ollama library versions
             model_list = models.get('models', []) if isinstance(models, dict) else getattr(models, 'models', [])
             model_names = []
+            model_digests = {}
             for m in model_list:
                 # Handle both dict and Model object formats
                 if isinstance(m, dict):
-                    model_names.append(m.get('name', '') or m.get('model', ''))
+                    name = m.get('name', '') or m.get('model', '')
+                    model_digests[name] = m.get('digest', '')
                 else:
-                    model_names.append(getattr(m, 'model', '') or getattr(m, 'name', ''))
+                    name = getattr(m, 'model', '') or getattr(m, 'name', '')
+                    model_digests[name] = getattr(m, 'digest', '')
+                model_names.append(name)
             
-            model_found = any(self.model_name in name or name in self.model_name for name in model_names)
-            if model_found:
+            matches = [name for name in model_names if self.model_name in name or name in self.model_name]
+            if matches:
                 print(f"   ✅ Model found: {self.model_name}")
+                self.model_digest = model_digests.get(matches[0]) or None
+                if self.cache and self.model_digest:
+                    self.cache.remember_model(self.model_name, self.model_digest)
             else:
                 print(f"   ⚠️  Model not found locally. Available: {model_names}")
                 print(f"   Run: ollama pull {self.model_name}")
         except Exception as e:
             print(f"   ⚠️  Could not check models: {e}")
         
+        host = next((e.url for e in self.pool.endpoints if e.healthy), None) if self.pool else None
+        self.backend_info = {**OllamaBackend(self.model_name, host).metadata(), "digest": self.model_digest}
+        
+        if self.warm_up_enabled:
+            self.warm_up()
+        
         print("\n✅ Prerequisites check complete!\n")
         return True
+    
+    def warm_up(self) -> List[Dict[str, Any]]:
+        """Load the model on every healthy endpoint before testing starts.
         
-    def calculate_urdu_ratio(self, text: str) -> float:
-        """Calculate ratio of Urdu characters in response."""
-        if not text:
-            return 0.0
+        An empty prompt makes Ollama load the model without generating. The
+        load time is recorded in ``warm_up_stats`` (and each suite summary)
+        instead of landing in the first test's latency.
+        """
+        print(f"   🔥 Warming up {self.model_name} (keep_alive={self.keep_alive})...")
+        if self.pool:
+            targets = [(e.url, e.client) for e in self.pool.endpoints if e.healthy]
+        else:
+            targets = [("local", ollama)]
         
-        urdu_ranges = [
-            (0x0600, 0x06FF),  # Arabic
-            (0x0750, 0x077F),  # Arabic Supplement
-            (0xFB50, 0xFDFF),  # Arabic Presentation Forms-A
-            (0xFE70, 0xFEFF),  # Arabic Presentation Forms-B
-        ]
+        self.warm_up_stats = []
+        for url, client in targets:
+            start = time.time()
+            try:
+                response = client.generate(**generate_request(
+                    self.model_name, "", GENERATION_OPTIONS, self.keep_alive
+                ))
+            except Exception as e:
+                print(f"   ⚠️  Warm-up failed on {url}: {describe_error(e)}")
+                continue
+            wall_ms = (time.time() - start) * 1000
+            load_ms = ollama_timings(response)["load_duration_ms"]
+            self.warm_up_stats.append({"endpoint": url, "load_duration_ms": load_ms, "wall_time_ms": wall_ms})
+            state = "loaded" if load_ms >= COLD_LOAD_THRESHOLD_MS else "already resident"
+            print(f"   ✅ {url}: {state} ({load_ms/1000:.1f}s load, {wall_ms/1000:.1f}s total)")
+        return self.warm_up_stats
         
-        urdu_count = 0
-        total_chars = 0
+    def _healthy_client(self):
+        """Return a client for model queries: a healthy pool node or the default client."""
+        if self.pool:
+            for endpoint in self.pool.endpoints:
+                if endpoint.healthy:
+                    return endpoint.client
+        return ollama
+    
+    def is_connected(self) -> bool:
+        """Whether the backend, Ollama or any pool endpoint answers right now."""
+        if self.pool:
+            return any(self.pool.health_check().values())
+        if self.backend:
+            return self.backend.health()
+        return check_ollama_connection()
+    
+    def wait_for_connection(self) -> bool:
+        """Block until the backend (Ollama or any pool endpoint) answers again, up to ~30 seconds."""
+        for _ in range(6):
+            time.sleep(5)
+            if self.is_connected():
+                return True
+        return False
+    
+    def cache_digest(self) -> str:
+        """Model identity used in cache keys: the Ollama digest when known."""
+        if self.model_digest is None and self.cache:
+            # Re-scoring runs without the model; use the digest recorded when the cache was filled
+            self.model_digest = self.cache.model_digest(self.model_name)
+        return self.model_digest or self.model_name
+    
+    def cached_result(
+        self,
+        test_case: TestCase,
+        options: Dict[str, Any] = GENERATION_OPTIONS
+    ) -> Optional[TestResult]:
+        """Return a result rebuilt from the response cache, if the request was seen before.
+        
+        In rescore-only mode a cache miss yields an error result instead of a model call.
+        """
+        if not self.cache:
+            return None
+        hit = self.cache.get(self.cache_digest(), test_case.prompt, self.cache_options(options))
+        if hit is None:
+            if self.rescore_only:
+                return self.build_error_result(test_case, "Not in response cache (rescore-only)", 0)
+            return None
+        response, response_time_ms = hit
+        result = self.build_result(test_case, response, response_time_ms)
+        result.cached = True
+        return result
+    
+    def store_response(
+        self,
+        test_case: TestCase,
+        response: Any,
+        response_time_ms: float,
+        options: Dict[str, Any] = GENERATION_OPTIONS
+    ):
+        """Add a fresh model response to the cache."""
+        if self.cache:
+            self.cache.put(
+                self.model_name, self.cache_digest(), test_case.prompt,
+                self.cache_options(options), response, response_time_ms
+            )
+    
+    def cache_options(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Options a response is cached under; early-stopped responses are kept apart.
         
-        for char in text:
-            if char.isalpha():
-                total_chars += 1
-                code = ord(char)
-                for start, end in urdu_ranges:
-                    if start <= code <= end:
-                        urdu_count += 1
-                        break
+        Request parameters such as keep_alive don't change the output and are left out.
+        """
+        options = {k: v for k, v in options.items() if k not in REQUEST_PARAMETERS}
+        return {**options, "early_stop": True} if self.early_stop else options
+
+    def scoring_mode(self) -> Dict[str, Any]:
+        """How this run's scores were produced, recorded so re-scoring can reproduce it."""
+        return {
+            "score_on_ttft": self.score_on_ttft,
+            "early_stop": self.early_stop,
+            "repeats": self.repeats,
+            "target_ci": self.target_ci,
+            # Batched results are scored without the time bonus (see calculate_score)
+            "batched": self.batched(),
+        }
+
+    def batched(self) -> bool:
+        """Whether tests go through the backend's batched generation."""
+        # Streaming and repeats go request by request
+        return bool(self.backend and self.backend.supports_batch and self.repeats == 1 and not self.stream)
+
+    def calculate_urdu_ratio(self, text: str) -> float:
+        """Calculate ratio of Urdu characters in response.
         
-        return urdu_count / total_chars if total_chars > 0 else 0.0
+        Alphabetic characters in the Arabic, Arabic Supplement and Arabic
+        Presentation Forms blocks, over all alphabetic characters.
+        """
+        return urdu_char_ratio(text)
     
     def check_keywords(self, response: str, keywords: List[str]) -> tuple:
         """Check which expected keywords are present in response.
         
         Keywords are treated as OR conditions - finding ANY keyword is a pass.
-        Also handles number variations (e.g., "1,000" matches "1000").
+        Also handles number variations (e.g., "1,000" matches "1000") and
+        Urdu spelling variants (Arabic yeh/kaf/heh, diacritics, Urdu digits,
+        zero-width non-joiners), see urdu_normalization.
+        Each keyword list gets a cached matcher (keyword_matcher): long lists
+        are matched in one pass by an Aho–Corasick automaton when pyahocorasick
+        is installed; others, and every list without it, by one substring scan
+        per keyword over the normalised response.
         """
-        # Normalize response: remove commas from numbers, lowercase
-        response_normalized = response.lower().replace(",", "").replace("،", "")
-        
-        passed = []
-        failed = []
-        
-        for kw in keywords:
-            kw_normalized = kw.lower().replace(",", "").replace("،", "")
-            if kw_normalized in response_normalized:
-                passed.append(kw)
-            else:
-                failed.append(kw)
-        
-        return passed, failed
+        return match_keywords(response, keywords)
     
     def calculate_score(self, result: TestResult, test_case: TestCase) -> float:
         """Calculate overall score for a test result.
@@ -418,7 +1365,11 @@ class QalbTestRunner:
         - Response exists and is meaningful (20%)
         - Language appropriateness (30%) - adjusted for math/code content
         - Keywords matched - ANY keyword match = full points (30%)
-        - Response time bonus (20%)
+        - Response time bonus (20%) - on time to first token when score_on_ttft is set
+        
+        A batched result's time depends on the prompts it shared the batch
+        with, so it gets no time bonus; its other components are scaled up to
+        100 instead.
         """
         # If there was an error, score is 0
         if result.error:
@@ -462,8 +1413,21 @@ class QalbTestRunner:
         else:
             score += 30.0  # No keywords required
         
+        if result.batch_size > 1:
+            return min(100.0, score * 100.0 / 80.0)
+        
         # Response time bonus (20%) - faster = better
-        if result.response_time_ms < 5000:
+        if self.score_on_ttft and result.ttft_ms > 0:
+            fast, medium, slow = TTFT_SCORE_THRESHOLDS_MS
+            if result.ttft_ms < fast:
+                score += 20.0
+            elif result.ttft_ms < medium:
+                score += 15.0
+            elif result.ttft_ms < slow:
+                score += 10.0
+            else:
+                score += 5.0
+        elif result.response_time_ms < 5000:
             score += 20.0
         elif result.response_time_ms < 10000:
             score += 15.0
@@ -474,116 +1438,374 @@ class QalbTestRunner:
         
         return min(100.0, score)
     
-    def run_single_test(self, test_case: TestCase) -> TestResult:
-        """Execute a single test case with retry logic."""
+    def build_result(
+        self,
+        test_case: TestCase,
+        response: Dict[str, Any],
+        response_time_ms: float,
+        retry_count: int = 0,
+        stream_stats: Optional[Dict[str, Any]] = None
+    ) -> TestResult:
+        """Build a scored TestResult from a successful generate response.
+        
+        ``stream_stats`` (from streaming_stats) replaces the server-derived TTFT
+        with the client-observed one and adds inter-token percentiles.
+        """
+        response_text = response.get("response", "")
+        timings = ollama_timings(response)
+        
+        if timings["tokens_per_second"]:
+            # True decode speed from the server's eval_count / eval_duration
+            tokens_per_sec = timings["tokens_per_second"]
+        else:
+            # Estimate tokens (rough: 1 token ≈ 4 chars for Urdu)
+            approx_tokens = len(response_text) / 4
+            tokens_per_sec = approx_tokens / (response_time_ms / 1000) if response_time_ms > 0 else 0
+        
+        urdu_ratio = self.calculate_urdu_ratio(response_text)
+        passed_kw, failed_kw = self.check_keywords(response_text, test_case.expected_keywords)
+        
+        result = TestResult(
+            test_id=test_case.id,
+            category=test_case.category,
+            script_type=test_case.script_type,
+            prompt=test_case.prompt,
+            response=response_text,
+            response_time_ms=response_time_ms,
+            tokens_per_second=tokens_per_sec,
+            urdu_char_ratio=urdu_ratio,
+            passed_keywords=passed_kw,
+            failed_keywords=failed_kw,
+            score=0.0,
+            timestamp=datetime.now().isoformat(),
+            model=self.model_name,
+            error=None,
+            retry_count=retry_count,
+            eval_count=timings["eval_count"],
+            prompt_eval_count=timings["prompt_eval_count"],
+            eval_duration_ms=timings["eval_duration_ms"],
+            prompt_eval_duration_ms=timings["prompt_eval_duration_ms"],
+            load_duration_ms=timings["load_duration_ms"],
+            total_duration_ms=timings["total_duration_ms"],
+            prefill_tokens_per_second=timings["prefill_tokens_per_second"],
+            ttft_ms=timings["ttft_ms"],
+            generation_profile=test_case.generation_profile or DEFAULT_PROFILE,
+            # Ollama reports "length" when generation ran into num_predict
+            truncated=response.get("done_reason") == "length",
+            batch_size=response.get("batch_size") or 1
+        )
+        
+        if stream_stats:
+            result.streamed = True
+            result.ttft_ms = stream_stats["ttft_ms"]
+            result.itl_p50_ms = stream_stats["itl_p50_ms"]
+            result.itl_p95_ms = stream_stats["itl_p95_ms"]
+            result.itl_p99_ms = stream_stats["itl_p99_ms"]
+            if not timings["tokens_per_second"]:
+                result.tokens_per_second = stream_stats["tokens_per_second"]
+            result.early_stopped = stream_stats.get("early_stopped", False)
+            self.itl_samples[test_case.id] = stream_stats["inter_token_ms"]
+        
+        if timings["load_duration_ms"] >= COLD_LOAD_THRESHOLD_MS:
+            # The model was (re)loaded for this request; report the load on its
+            # own so it doesn't count against the test's latency or score
+            result.cold_start_ms = timings["load_duration_ms"]
+            result.response_time_ms = max(0.0, response_time_ms - result.cold_start_ms)
+            result.ttft_ms = max(0.0, result.ttft_ms - result.cold_start_ms)
+        
+        result.score = self.calculate_score(result, test_case)
+        return result
+    
+    def build_error_result(
+        self,
+        test_case: TestCase,
+        error: str,
+        response_time_ms: float,
+        retry_count: int = 0
+    ) -> TestResult:
+        """Build a zero-score TestResult for a test that could not be completed."""
+        return TestResult(
+            test_id=test_case.id,
+            category=test_case.category,
+            script_type=test_case.script_type,
+            prompt=test_case.prompt,
+            response="",
+            response_time_ms=response_time_ms,
+            tokens_per_second=0,
+            urdu_char_ratio=0,
+            passed_keywords=[],
+            failed_keywords=test_case.expected_keywords,
+            score=0.0,
+            timestamp=datetime.now().isoformat(),
+            model=self.model_name,
+            error=error,
+            retry_count=retry_count,
+            generation_profile=test_case.generation_profile or DEFAULT_PROFILE
+        )
+    
+    def generate(
+        self,
+        client,
+        test_case: TestCase,
+        options: Dict[str, Any] = GENERATION_OPTIONS
+    ) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Send a test prompt; returns the response and streaming stats (None unless streaming)."""
+        request = generate_request(self.model_name, test_case.prompt, options, self.keep_alive)
+        if not self.stream:
+            return client.generate(**request), None
+        
+        collector = StreamCollector(self.outcome_decided(test_case))
+        stream = client.generate(stream=True, **request)
+        for chunk in stream:
+            if collector.add(chunk):
+                # Closing the stream drops the request, so the server stops decoding
+                stream.close()
+                break
+        return collector.result()
+    
+    def outcome_decided(self, test_case: TestCase) -> Optional[Callable[[str], bool]]:
+        """Early-stop check for a test's partial response, or None to read it all.
+        
+        Only keyword-graded tests stop early, and only once every expected
+        keyword has matched: a match in a prefix is a match in the whole
+        response, so the keyword component (including the bonus for matching
+        more keywords) can't change. After EARLY_STOP_MIN_CHARS there is
+        enough text for the language ratio, the one component still estimated.
+        """
+        if not self.early_stop or not test_case.expected_keywords:
+            return None
+        
+        def decided(text: str) -> bool:
+            return len(text) >= EARLY_STOP_MIN_CHARS and not (
+                self.check_keywords(text, test_case.expected_keywords)[1]
+            )
+        return decided
+    
+    def run_single_test(
+        self,
+        test_case: TestCase,
+        options: Optional[Dict[str, Any]] = None,
+        prefer_endpoint: Optional[str] = None
+    ) -> TestResult:
+        """Execute a single test case with retry logic.
+        
+        ``options`` defaults to the test's generation profile.
+        ``prefer_endpoint`` keeps the request on that pool endpoint while it is healthy.
+        """
+        options = options or self.test_options(test_case)
+        cached = self.cached_result(test_case, options)
+        if cached:
+            return cached
+        
         last_error = None
         retry_count = 0
+        # An error result covers every attempt and wait; a response's latency only its own attempt
+        test_start = time.time()
         
         for attempt in range(MAX_RETRIES):
+            endpoint = self.pool.acquire(prefer_endpoint) if self.pool else None
+            if self.pool and endpoint is None:
+                print(f"\n   🔄 No healthy endpoint for {test_case.id}. Waiting for reconnection...")
+                if not self.wait_for_connection():
+                    last_error = "No healthy Ollama endpoint"
+                    retry_count = attempt + 1
+                    continue
+                endpoint = self.pool.acquire()
+                if endpoint is None:
+                    # Reconnected, but every endpoint is busy or drained again
+                    last_error = "No Ollama endpoint available after reconnecting"
+                    retry_count = attempt + 1
+                    continue
+            client = endpoint.client if endpoint else (self.backend or ollama)
             start_time = time.time()
             
             try:
-                response = ollama.generate(
-                    model=self.model_name,
-                    prompt=test_case.prompt,
-                    options={
-                        "num_predict": 256,
-                        "temperature": 0.7,
-                    }
-                )
+                response, stream_stats = self.generate(client, test_case, options)
                 
                 end_time = time.time()
-                response_text = response.get("response", "")
-                
-                # Calculate metrics
                 response_time_ms = (end_time - start_time) * 1000
-                
-                # Estimate tokens (rough: 1 token ≈ 4 chars for Urdu)
-                approx_tokens = len(response_text) / 4
-                tokens_per_sec = approx_tokens / (response_time_ms / 1000) if response_time_ms > 0 else 0
-                
-                urdu_ratio = self.calculate_urdu_ratio(response_text)
-                passed_kw, failed_kw = self.check_keywords(response_text, test_case.expected_keywords)
-                
-                result = TestResult(
-                    test_id=test_case.id,
-                    category=test_case.category,
-                    script_type=test_case.script_type,
-                    prompt=test_case.prompt,
-                    response=response_text,
-                    response_time_ms=response_time_ms,
-                    tokens_per_second=tokens_per_sec,
-                    urdu_char_ratio=urdu_ratio,
-                    passed_keywords=passed_kw,
-                    failed_keywords=failed_kw,
-                    score=0.0,
-                    timestamp=datetime.now().isoformat(),
-                    model=self.model_name,
-                    error=None,
-                    retry_count=retry_count
-                )
-                
-                result.score = self.calculate_score(result, test_case)
+                if endpoint:
+                    self.pool.release(endpoint, response_time_ms)
+                self.store_response(test_case, response, response_time_ms, options)
+                result = self.build_result(test_case, response, response_time_ms, retry_count, stream_stats)
+                result.endpoint = endpoint.url if endpoint else None
                 return result
                 
             except Exception as e:
-                last_error = str(e)
+                last_error = describe_error(e)
                 retry_count = attempt + 1
+                connection_error = is_connection_error(last_error)
+                if endpoint:
+                    self.pool.release(endpoint, 0, ok=False)
+                    if connection_error:
+                        self.pool.drain(endpoint)
                 
                 # Check if it's a connection error
-                if "connection" in last_error.lower() or "refused" in last_error.lower():
+                if connection_error:
                     print(f"\n   ⚠️  Connection error on {test_case.id}, retry {retry_count}/{MAX_RETRIES}...")
                     
+                    # Another pool node can take the retry straight away
+                    if self.pool and self.pool.has_healthy():
+                        continue
+                    
                     # Wait before retry
                     if attempt < MAX_RETRIES - 1:
                         time.sleep(RETRY_DELAY_SECONDS)
                         
-                        # Check if Ollama is still running
-                        if not check_ollama_connection():
-                            print("   🔄 Ollama connection lost. Waiting for reconnection...")
-                            for _ in range(6):  # Wait up to 30 seconds
-                                time.sleep(5)
-                                if check_ollama_connection():
-                                    print("   ✅ Reconnected!")
-                                    break
+                        # Check if the backend is still running
+                        if self.pool or not self.is_connected():
+                            print("   🔄 Connection lost. Waiting for reconnection...")
+                            if self.wait_for_connection():
+                                print("   ✅ Reconnected!")
                 else:
                     # Non-connection error, don't retry
                     break
         
         # All retries failed
         end_time = time.time()
-        return TestResult(
-            test_id=test_case.id,
-            category=test_case.category,
-            script_type=test_case.script_type,
-            prompt=test_case.prompt,
-            response="",
-            response_time_ms=(end_time - start_time) * 1000,
-            tokens_per_second=0,
-            urdu_char_ratio=0,
-            passed_keywords=[],
-            failed_keywords=test_case.expected_keywords,
-            score=0.0,
-            timestamp=datetime.now().isoformat(),
-            model=self.model_name,
-            error=f"FAILED after {retry_count} retries: {last_error}",
-            retry_count=retry_count
+        return self.build_error_result(
+            test_case,
+            f"FAILED after {retry_count} retries: {last_error}",
+            (end_time - test_start) * 1000,
+            retry_count
+        )
+    
+    def test_options(self, test_case: TestCase) -> Dict[str, Any]:
+        """Generation options for a test: its resolved profile, or the defaults."""
+        return test_case.generation_options or GENERATION_OPTIONS
+    
+    def repeat_options(self, test_case: TestCase, repeat: int) -> Dict[str, Any]:
+        """Generation options for one repeat: the test's options plus its own seed.
+        
+        Seeds make every repeat reproducible and give each its own cache entry.
+        """
+        return {**self.test_options(test_case), "seed": REPEAT_SEED_BASE + repeat}
+    
+    def repeats_done(self, samples: List[TestResult]) -> bool:
+        """Whether a test has been sampled enough: all repeats, or a narrow enough interval."""
+        if len(samples) >= self.repeats:
+            return True
+        scores = [s.score for s in samples if not s.error]
+        return (
+            self.target_ci is not None
+            and len(scores) >= self.min_repeats
+            and ci_halfwidth(scores) <= self.target_ci
         )
     
+    def run_test(self, test_case: TestCase) -> TestResult:
+        """Run a test once, or repeatedly in repeat-sampling mode.
+        
+        Repeats of a test run back to back on the same endpoint, so after the
+        first one the server finds the prompt already in its KV cache and
+        skips most of the prefill; concurrency comes from running several
+        tests at once.
+        """
+        if self.repeats == 1:
+            return self.run_single_test(test_case)
+        samples: List[TestResult] = []
+        endpoint = None
+        while not samples or not self.repeats_done(samples):
+            sample = self.run_single_test(test_case, self.repeat_options(test_case, len(samples)), endpoint)
+            endpoint = sample.endpoint or endpoint
+            samples.append(sample)
+        return combine_repeats(samples)
+    
     def load_test_cases(self, file_path: Path) -> List[TestCase]:
-        """Load test cases from JSON file."""
+        """Load test cases from JSON file, resolving each test's generation profile."""
         with open(file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
-        return [TestCase(**tc) for tc in data.get("test_cases", [])]
+        profiles = data.get("generation_profiles", {})
+        category_profiles = data.get("category_profiles", {})
+        # Results are only comparable under the same profiles; the summary records them
+        self.profile_sets[file_path.name] = {
+            "version": data.get("version"),
+            "generation_profiles": profiles,
+            "category_profiles": category_profiles,
+        }
+        test_cases = [TestCase(**tc) for tc in data.get("test_cases", [])]
+        for tc in test_cases:
+            tc.generation_profile, tc.generation_options = resolve_profile(tc, profiles, category_profiles)
+        return test_cases
+    
+    def execute_tests(self, test_cases: List[TestCase]) -> Iterator[TestResult]:
+        """Run test cases and yield results as they complete.
+        
+        With a single worker tests run sequentially in file order. With more
+        workers up to ``self.workers`` requests are kept in flight at once and
+        results are yielded in completion order; callers re-order them.
+        """
+        if self.batched():
+            yield from self.execute_batched(test_cases)
+            return
+        
+        if self.workers == 1:
+            for tc in test_cases:
+                yield self.run_test(tc)
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qalb-test")
+        try:
+            futures = [executor.submit(self.run_test, tc) for tc in test_cases]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # On interrupt, drop queued tests; in-flight requests finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def execute_batched(self, test_cases: List[TestCase]) -> Iterator[TestResult]:
+        """Run test cases through the backend's batched generation.
+        
+        Cached tests are answered first. The rest are grouped by generation
+        options (one generate call can only use one set) and each group is
+        length-bucketed by the backend. Results are yielded batch by batch.
+        Each result is timed up to its own last token, and scored without the
+        time bonus; the backend's throughput over the suite is reported as
+        the ``batch_tokens_per_second`` metric.
+        """
+        groups: Dict[str, List[TestCase]] = {}
+        for tc in test_cases:
+            options = self.test_options(tc)
+            cached = self.cached_result(tc, options)
+            if cached:
+                yield cached
+            else:
+                groups.setdefault(json.dumps(options, sort_keys=True), []).append(tc)
+        
+        for key, group in groups.items():
+            options = json.loads(key)
+            pending = set(range(len(group)))
+            try:
+                for indices, responses in self.backend.iter_batches([tc.prompt for tc in group], options):
+                    for i, response in zip(indices, responses):
+                        pending.discard(i)
+                        response_time_ms = response["total_duration"] / 1e6
+                        self.store_response(group[i], response, response_time_ms, options)
+                        yield self.build_result(group[i], response, response_time_ms)
+            except Exception as e:
+                # e.g. out of memory: the rest of the group fails, later groups still run
+                error = describe_error(e)
+                for i in sorted(pending):
+                    yield self.build_error_result(group[i], f"Batch failed: {error}", 0)
     
     def run_test_suite(self, test_file: Path, output_dir: Path) -> Dict[str, Any]:
         """Run all tests from a test file with checkpoint support."""
         test_cases = self.load_test_cases(test_file)
+        backend_before = self.backend.stats() if self.backend else {}
         
         # Setup checkpoint
-        checkpoint_file = CHECKPOINT_DIR / f"{test_file.stem}_checkpoint.json"
+        # A re-scoring pass must not pick up (or clobber) a real run's checkpoint
+        checkpoint_kind = "rescore_checkpoint" if self.rescore_only else "checkpoint"
+        # Keyed by model too, so runs of different models never resume each other
+        backend_name = self.backend.name if self.backend else "ollama"
+        checkpoint_file = (
+            self.checkpoint_dir / f"{test_file.stem}_{model_slug(self.model_name)}_{checkpoint_kind}.jsonl"
+        )
         checkpoint = load_checkpoint(checkpoint_file)
+        if checkpoint and (checkpoint.backend, checkpoint.model) != (backend_name, self.model_name):
+            print(f"⚠️  Ignoring checkpoint of {checkpoint.backend or 'an unknown backend'} "
+                  f"{checkpoint.model or 'model'}; starting fresh")
+            checkpoint = None
         
         # Determine which tests to run
         completed_ids = set()
@@ -597,8 +1819,12 @@ class QalbTestRunner:
             # Start fresh
             checkpoint = Checkpoint(
                 test_file=test_file.name,
-                system_specs=asdict(self.system_specs) if self.system_specs else {}
+                system_specs=asdict(self.system_specs) if self.system_specs else {},
+                backend=backend_name,
+                model=self.model_name
             )
+            save_checkpoint(checkpoint, checkpoint_file)
+        checkpoint_writer = CheckpointWriter(checkpoint_file)
         
         # Filter remaining tests
         remaining_tests = [tc for tc in test_cases if tc.id not in completed_ids]
@@ -607,50 +1833,69 @@ class QalbTestRunner:
         print(f"Running: {test_file.name}")
         print(f"Total Tests: {len(test_cases)}")
         print(f"Remaining: {len(remaining_tests)}")
+        print(f"Workers: {self.workers}")
         print(f"{'='*60}\n")
         
-        # Run tests with progress bar
+        # Run tests with progress bar. Results are consumed on this thread only,
+        # so the checkpoint has a single writer even when tests run concurrently.
         try:
-            for tc in tqdm(remaining_tests, desc="Testing", initial=len(completed_ids), total=len(test_cases)):
-                result = self.run_single_test(tc)
+            for result in tqdm(
+                self.execute_tests(remaining_tests),
+                desc="Testing",
+                initial=len(completed_ids),
+                total=len(test_cases)
+            ):
                 results.append(result)
                 self.results.append(result)
                 
-                # Update checkpoint after each test
-                checkpoint.completed_test_ids.append(tc.id)
-                checkpoint.results.append(asdict(result))
-                save_checkpoint(checkpoint, checkpoint_file)
+                # Append to the checkpoint log after each test
+                checkpoint.completed_test_ids.append(result.test_id)
+                checkpoint_writer.append(asdict(result))
                 
                 # If there was an error, pause briefly
                 if result.error:
-                    print(f"\n   ⚠️  Error on {tc.id}: {result.error[:50]}...")
+                    print(f"\n   ⚠️  Error on {result.test_id}: {result.error[:50]}...")
                     
         except KeyboardInterrupt:
             print(f"\n\n⚠️  Test interrupted! Progress saved to checkpoint.")
             print(f"   Completed: {len(checkpoint.completed_test_ids)}/{len(test_cases)}")
             print(f"   Resume by running the script again.")
             raise
+        finally:
+            checkpoint_writer.close()
+        
+        # Keep results in test file order regardless of completion order
+        test_order = {tc.id: i for i, tc in enumerate(test_cases)}
+        results.sort(key=lambda r: test_order.get(r.test_id, len(test_order)))
         
         # Calculate summary
         successful_results = [r for r in results if not r.error]
         error_results = [r for r in results if r.error]
         
+        metrics = calculate_suite_metrics(results)
+        if self.batched():
+            metrics["batch_tokens_per_second"] = batch_throughput(
+                backend_before, self.backend.stats() if self.backend else {}
+            )
+        
         summary = {
             "test_file": test_file.name,
+            "test_file_version": self.profile_sets[test_file.name]["version"],
             "total_tests": len(results),
             "successful_tests": len(successful_results),
             "failed_tests": len(error_results),
             "timestamp": datetime.now().isoformat(),
             "model": self.model_name,
             "system_specs": asdict(self.system_specs) if self.system_specs else {},
-            "metrics": {
-                "average_score": sum(r.score for r in successful_results) / len(successful_results) if successful_results else 0,
-                "average_response_time_ms": sum(r.response_time_ms for r in successful_results) / len(successful_results) if successful_results else 0,
-                "average_tokens_per_second": sum(r.tokens_per_second for r in successful_results) / len(successful_results) if successful_results else 0,
-                "average_urdu_ratio": sum(r.urdu_char_ratio for r in successful_results) / len(successful_results) if successful_results else 0,
-                "total_retries": sum(r.retry_count for r in results),
-            },
+            "metrics": metrics,
+            "category_latency": calculate_category_latency(results, self.itl_samples),
+            "generation_profiles": calculate_profile_usage(results),
+            "profile_set": self.profile_sets[test_file.name],
+            "scoring": self.scoring_mode(),
+            "warm_up": self.warm_up_stats,
             "errors": [{"test_id": r.test_id, "error": r.error} for r in error_results],
+            "endpoints": self.pool.stats() if self.pool else [],
+            "backend": {**self.backend_info, "stats": self.backend.stats() if self.backend else {}},
             "results": [asdict(r) if hasattr(r, '__dataclass_fields__') else r for r in results]
         }
         
@@ -661,6 +1906,14 @@ class QalbTestRunner:
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(summary, f, ensure_ascii=False, indent=2)
         
+        if self.results_store:
+            try:
+                run_id = self.results_store.write_suite(summary)
+                print(f"\n🗄️  Stored run {run_id} in {self.results_store.path}")
+            except Exception as e:
+                # The JSON file above is the primary record; don't fail the run
+                print(f"\n⚠️  Could not write to results store: {describe_error(e)}")
+        
         # Clear checkpoint on successful completion
         clear_checkpoint(checkpoint_file)
         
@@ -668,6 +1921,28 @@ class QalbTestRunner:
         print(f"   Successful: {len(successful_results)}/{len(results)}")
         print(f"   Average Score: {summary['metrics']['average_score']:.1f}/100")
         print(f"   Avg Response Time: {summary['metrics']['average_response_time_ms']:.0f}ms")
+        print(f"   Decode: {summary['metrics']['average_tokens_per_second']:.1f} tok/s | "
+              f"Prefill: {summary['metrics']['average_prefill_tokens_per_second']:.1f} tok/s | "
+              f"TTFT: {summary['metrics']['average_ttft_ms']:.0f}ms")
+        if "batch_tokens_per_second" in summary["metrics"]:
+            print(f"   Batch throughput: {summary['metrics']['batch_tokens_per_second']:.1f} tok/s "
+                  f"(per-test times are shared with the batch and not scored)")
+        if summary["metrics"]["cold_loads"]:
+            print(f"   🧊 Cold loads: {summary['metrics']['cold_loads']} "
+                  f"({summary['metrics']['cold_start_ms']/1000:.1f}s excluded from test timings)")
+        if summary["metrics"]["early_stopped_tests"]:
+            print(f"   Early stopped: {summary['metrics']['early_stopped_tests']} tests "
+                  f"({summary['metrics']['total_eval_tokens']} tokens decoded; "
+                  f"truncated response times, not comparable with full runs)")
+        if len(summary["generation_profiles"]) > 1:
+            for profile, usage in summary["generation_profiles"].items():
+                print(f"   Profile {profile}: {usage['tests']} tests, "
+                      f"{usage['average_eval_tokens']:.0f} tokens avg, {usage['truncated']} truncated")
+        if "consistency" in summary["metrics"]:
+            metrics = summary["metrics"]
+            print(f"   Consistency: {metrics['consistency']:.1f}% | "
+                  f"Score ±{metrics['average_score_ci_95']:.2f} (95% CI) over {metrics['total_repeats']} runs | "
+                  f"Repeats for ±{SUITE_CI_TARGET:g}: {metrics['repeats_needed']}")
         if error_results:
             print(f"   ⚠️  {len(error_results)} tests had errors")
         
@@ -679,18 +1954,7 @@ class QalbTestRunner:
         Args:
             round_num: Test round number (1 = original, 2 = improved keywords, 3 = math fixes, 4 = expanded synonyms)
         """
-        if round_num == 4:
-            urdu_tests = TESTS_DIR / "baseline" / "urdu_script_tests_round4.json"
-            roman_tests = TESTS_DIR / "baseline" / "roman_urdu_tests_round4.json"
-        elif round_num == 3:
-            urdu_tests = TESTS_DIR / "baseline" / "urdu_script_tests_round3.json"
-            roman_tests = TESTS_DIR / "baseline" / "roman_urdu_tests_round3.json"
-        elif round_num == 2:
-            urdu_tests = TESTS_DIR / "baseline" / "urdu_script_tests_round2.json"
-            roman_tests = TESTS_DIR / "baseline" / "roman_urdu_tests_round2.json"
-        else:
-            urdu_tests = TESTS_DIR / "baseline" / "urdu_script_tests.json"
-            roman_tests = TESTS_DIR / "baseline" / "roman_urdu_tests.json"
+        urdu_tests, roman_tests = baseline_test_files(round_num)
         
         all_summaries = []
         
@@ -698,7 +1962,7 @@ class QalbTestRunner:
             try:
                 summary = self.run_test_suite(
                     urdu_tests, 
-                    DATA_DIR / "baseline" / "urdu_script"
+                    self.output_dir / "urdu_script"
                 )
                 all_summaries.append(summary)
             except KeyboardInterrupt:
@@ -711,7 +1975,7 @@ class QalbTestRunner:
             try:
                 summary = self.run_test_suite(
                     roman_tests,
-                    DATA_DIR / "baseline" / "roman_urdu"
+                    self.output_dir / "roman_urdu"
                 )
                 all_summaries.append(summary)
             except KeyboardInterrupt:
@@ -728,16 +1992,10 @@ class QalbTestRunner:
                 "model": self.model_name,
                 "system_specs": asdict(self.system_specs) if self.system_specs else {},
                 "test_suites": all_summaries,
-                "overall_metrics": {
-                    "total_tests": sum(s["total_tests"] for s in all_summaries),
-                    "successful_tests": sum(s["successful_tests"] for s in all_summaries),
-                    "failed_tests": sum(s["failed_tests"] for s in all_summaries),
-                    "average_score": sum(s["metrics"]["average_score"] for s in all_summaries) / len(all_summaries),
-                    "total_retries": sum(s["metrics"]["total_retries"] for s in all_summaries),
-                }
+                "overall_metrics": calculate_overall_metrics(all_summaries)
             }
             
-            combined_file = DATA_DIR / "baseline" / "combined_results.json"
+            combined_file = self.output_dir / "combined_results.json"
             combined_file.parent.mkdir(parents=True, exist_ok=True)
             
             with open(combined_file, 'w', encoding='utf-8') as f:
@@ -753,23 +2011,411 @@ class QalbTestRunner:
             print(f"Results: {combined_file}")
 
 
+# ============================================================
+# Async Test Runner
+# ============================================================
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    ceiling = min(RETRY_BACKOFF_MAX_SECONDS, RETRY_DELAY_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+class AsyncQalbTestRunner(QalbTestRunner):
+    """Test runner that drives many prompts concurrently on one asyncio event loop.
+    
+    Each test gets its own deadline; a generation that exceeds it is cancelled
+    (closing the HTTP request so Ollama stops decoding) and retried. Retry
+    backoff and reconnection polling use ``asyncio.sleep`` so a struggling test
+    never blocks the others in flight.
+    
+    The event loop runs on a background thread and feeds ``execute_tests``, so
+    checkpointing, ordering and summaries are shared with ``QalbTestRunner``.
+    """
+    
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        test_timeout: float = TEST_TIMEOUT_SECONDS,
+        **kwargs
+    ):
+        """Accepts the QalbTestRunner options (workers, hosts, cache, ...) as keywords."""
+        super().__init__(model_name=model_name, **kwargs)
+        self.test_timeout = test_timeout
+        self._client = None
+    
+    async def check_connection_async(self) -> bool:
+        """Check if Ollama (or any pool endpoint) answers without blocking the event loop."""
+        clients = [ep.async_client for ep in self.pool.endpoints] if self.pool else [self._client]
+        healthy = False
+        for client in clients:
+            try:
+                await client.list()
+                healthy = True
+            except Exception:
+                continue
+        if self.pool and healthy:
+            # Let the pool re-probe and revive drained nodes
+            await asyncio.to_thread(self.pool.health_check)
+        return healthy
+    
+    async def wait_for_connection_async(self, attempts: int = 6) -> bool:
+        """Poll the Ollama service until it answers or attempts run out."""
+        for attempt in range(attempts):
+            if await self.check_connection_async():
+                return True
+            await asyncio.sleep(backoff_delay(attempt))
+        return False
+    
+    async def generate_async(
+        self,
+        client,
+        test_case: TestCase,
+        options: Dict[str, Any] = GENERATION_OPTIONS
+    ) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Async counterpart of ``generate``."""
+        request = generate_request(self.model_name, test_case.prompt, options, self.keep_alive)
+        if not self.stream:
+            return await client.generate(**request), None
+        
+        collector = StreamCollector(self.outcome_decided(test_case))
+        stream = await client.generate(stream=True, **request)
+        async for chunk in stream:
+            if collector.add(chunk):
+                await stream.aclose()
+                break
+        return collector.result()
+    
+    async def run_single_test_async(
+        self,
+        test_case: TestCase,
+        options: Optional[Dict[str, Any]] = None,
+        prefer_endpoint: Optional[str] = None
+    ) -> TestResult:
+        """Execute a single test case with a deadline and jittered retries."""
+        options = options or self.test_options(test_case)
+        cached = self.cached_result(test_case, options)
+        if cached:
+            return cached
+        
+        last_error = None
+        retry_count = 0
+        # An error result covers every attempt and wait; a response's latency only its own attempt
+        test_start = time.time()
+        
+        for attempt in range(MAX_RETRIES):
+            # acquire() may probe a drained endpoint (a blocking call of up to
+            # CONNECTION_TIMEOUT), so it runs off the event loop
+            endpoint = await asyncio.to_thread(self.pool.acquire, prefer_endpoint) if self.pool else None
+            if self.pool and endpoint is None:
+                print(f"\n   🔄 No healthy endpoint for {test_case.id}. Waiting for reconnection...")
+                retry_count = attempt + 1
+                last_error = "No healthy Ollama endpoint"
+                await self.wait_for_connection_async()
+                continue
+            client = endpoint.async_client if endpoint else self._client
+            start_time = time.time()
+            
+            try:
+                response, stream_stats = await asyncio.wait_for(
+                    self.generate_async(client, test_case, options),
+                    timeout=self.test_timeout
+                )
+                
+                end_time = time.time()
+                response_time_ms = (end_time - start_time) * 1000
+                if endpoint:
+                    self.pool.release(endpoint, response_time_ms)
+                self.store_response(test_case, response, response_time_ms, options)
+                result = self.build_result(test_case, response, response_time_ms, retry_count, stream_stats)
+                result.endpoint = endpoint.url if endpoint else None
+                return result
+                
+            except asyncio.TimeoutError:
+                # wait_for has already cancelled the stuck generation
+                if endpoint:
+                    self.pool.release(endpoint, 0, ok=False)
+                last_error = f"Timed out after {self.test_timeout:g}s"
+                retry_count = attempt + 1
+                print(f"\n   ⏱️  Timeout on {test_case.id}, retry {retry_count}/{MAX_RETRIES}...")
+                
+            except asyncio.CancelledError:
+                if endpoint:
+                    self.pool.release(endpoint, 0, ok=False)
+                raise
+                
+            except Exception as e:
+                last_error = describe_error(e)
+                retry_count = attempt + 1
+                connection_error = is_connection_error(last_error)
+                if endpoint:
+                    self.pool.release(endpoint, 0, ok=False)
+                    if connection_error:
+                        self.pool.drain(endpoint)
+                
+                if not connection_error:
+                    # Non-connection error, don't retry
+                    break
+                
+                print(f"\n   ⚠️  Connection error on {test_case.id}, retry {retry_count}/{MAX_RETRIES}...")
+                if self.pool and self.pool.has_healthy():
+                    # Another pool node can take the retry straight away
+                    continue
+                if attempt < MAX_RETRIES - 1:
+                    await asyncio.sleep(backoff_delay(attempt))
+                    if not await self.check_connection_async():
+                        print("   🔄 Ollama connection lost. Waiting for reconnection...")
+                        if await self.wait_for_connection_async():
+                            print("   ✅ Reconnected!")
+        
+        # All retries failed
+        end_time = time.time()
+        return self.build_error_result(
+            test_case,
+            f"FAILED after {retry_count} retries: {last_error}",
+            (end_time - test_start) * 1000,
+            retry_count
+        )
+    
+    async def run_test_async(self, test_case: TestCase) -> TestResult:
+        """Async counterpart of ``run_test``."""
+        if self.repeats == 1:
+            return await self.run_single_test_async(test_case)
+        samples: List[TestResult] = []
+        endpoint = None
+        while not samples or not self.repeats_done(samples):
+            sample = await self.run_single_test_async(test_case, self.repeat_options(test_case, len(samples)), endpoint)
+            endpoint = sample.endpoint or endpoint
+            samples.append(sample)
+        return combine_repeats(samples)
+    
+    async def _run_tests_async(self, test_cases: List[TestCase], emit) -> None:
+        """Run test cases with at most ``self.workers`` in flight, emitting each result."""
+        # Async clients are bound to the loop that uses them, so create them here
+        if self.pool:
+            for endpoint in self.pool.endpoints:
+                endpoint.async_client = ollama.AsyncClient(host=endpoint.url)
+        else:
+            self._client = ollama.AsyncClient()
+        semaphore = asyncio.Semaphore(self.workers)
+        
+        async def run_one(tc: TestCase):
+            async with semaphore:
+                emit(await self.run_test_async(tc))
+        
+        await asyncio.gather(*(run_one(tc) for tc in test_cases))
+    
+    def execute_tests(self, test_cases: List[TestCase]) -> Iterator[TestResult]:
+        """Run test cases on a background event loop and yield results as they complete."""
+        results: "queue.Queue" = queue.Queue()
+        loop = asyncio.new_event_loop()
+        
+        def run_loop():
+            try:
+                loop.run_until_complete(self._run_tests_async(test_cases, results.put))
+            except BaseException as e:
+                results.put(e)
+            finally:
+                loop.close()
+        
+        thread = threading.Thread(target=run_loop, name="qalb-async", daemon=True)
+        thread.start()
+        try:
+            for _ in range(len(test_cases)):
+                item = results.get()
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # On interrupt, cancel every in-flight generation
+            if thread.is_alive() and not loop.is_closed():
+                try:
+                    for task in asyncio.all_tasks(loop):
+                        loop.call_soon_threadsafe(task.cancel)
+                except RuntimeError:
+                    pass
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Run the Qalb baseline test suites.")
+    parser.add_argument("--model", default=MODEL_NAME, help="Ollama model tag to test")
+    parser.add_argument("--round", type=int, default=4, dest="round_num", help="Test round number (1-4)")
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Concurrent requests to keep in flight (default: $OLLAMA_NUM_PARALLEL or 1, per host)"
+    )
+    parser.add_argument(
+        "--hosts", nargs="+", metavar="URL",
+        help="Ollama base URLs to load balance across (default: local Ollama)"
+    )
+    parser.add_argument(
+        "--async", action="store_true", dest="use_async",
+        help="Use the asyncio runner with per-test deadlines and cancellation"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=TEST_TIMEOUT_SECONDS,
+        help="Per-test deadline in seconds for the asyncio runner"
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Stream generations to record time to first token and inter-token latency"
+    )
+    parser.add_argument(
+        "--score-ttft", action="store_true",
+        help="Base the response-time bonus on time to first token (implies --stream)"
+    )
+    parser.add_argument(
+        "--keep-alive", type=parse_keep_alive, default=DEFAULT_KEEP_ALIVE,
+        help=f"How long Ollama keeps the model loaded after each request, e.g. 30m or -1 "
+             f"for indefinitely (default: {DEFAULT_KEEP_ALIVE})"
+    )
+    parser.add_argument(
+        "--no-warm-up", action="store_true",
+        help="Skip loading the model on each endpoint before the first test"
+    )
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default="ollama",
+        help="Serving stack: Ollama (default), an OpenAI-compatible server such as llama.cpp "
+             "or vLLM, transformers in-process with batches, or a simulated mock server"
+    )
+    parser.add_argument(
+        "--base-url", default=DEFAULT_OPENAI_BASE_URL,
+        help=f"API base URL for --backend openai (default: {DEFAULT_OPENAI_BASE_URL})"
+    )
+    parser.add_argument(
+        "--served-model", default=None,
+        help="Model name for --backend openai (default: the first model the server lists)"
+    )
+    parser.add_argument(
+        "--api-key", default=os.environ.get("OPENAI_API_KEY"),
+        help="Bearer token for --backend openai (default: $OPENAI_API_KEY)"
+    )
+    parser.add_argument(
+        "--hf-model", default=HF_MODEL_NAME,
+        help=f"Hugging Face model for --backend transformers (default: {HF_MODEL_NAME})"
+    )
+    parser.add_argument(
+        "--device", choices=["cpu", "cuda"], default=None,
+        help="Device for --backend transformers (default: cuda when available)"
+    )
+    parser.add_argument(
+        "--dtype", choices=DTYPES, default="bfloat16",
+        help="Weights for --backend transformers; int8 on CPU uses dynamic quantisation"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+        help=f"Prompts per generate call for --backend transformers (default: {DEFAULT_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--early-stop", action="store_true",
+        help="Stop keyword-graded generations once every keyword matches (implies --stream; "
+             "response times are truncated, so scores aren't comparable with full runs)"
+    )
+    parser.add_argument(
+        "--cache", nargs="?", const=str(CACHE_FILE), metavar="PATH",
+        help=f"Reuse responses from a persistent cache (default path: {CACHE_FILE})"
+    )
+    parser.add_argument(
+        "--cache-size-mb", type=float, default=DEFAULT_MAX_SIZE_MB,
+        help="Evict least recently used cache entries beyond this size"
+    )
+    parser.add_argument(
+        "--rescore-only", action="store_true",
+        help="Re-score cached responses only; never call the model (implies --cache)"
+    )
+    parser.add_argument(
+        "--no-store", action="store_true",
+        help="Don't write runs to the columnar results store (data/results_store)"
+    )
+    parser.add_argument(
+        "--repeats", type=int, default=1,
+        help="Sample every prompt this many times and report score variance and consistency"
+    )
+    parser.add_argument(
+        "--target-ci", type=float, default=None, metavar="POINTS",
+        help="Stop repeating a test once its 95%% score interval is within ±POINTS (at most --repeats runs)"
+    )
+    parser.add_argument(
+        "--min-repeats", type=int, default=DEFAULT_MIN_REPEATS,
+        help="Runs per test before --target-ci can stop repeating"
+    )
+    return parser.parse_args(argv)
+
+
 def main():
     """Main entry point."""
+    args = parse_args()
+    
     print("\n" + "="*60)
-    print("QALB MODEL TEST RUNNER - ROUND 4")
+    print(f"QALB MODEL TEST RUNNER - ROUND {args.round_num}")
     print("fawadhs.dev")
     print("="*60)
     
-    runner = QalbTestRunner()
+    workers = args.workers or DEFAULT_WORKERS * len(args.hosts or [None])
+    cache_path = args.cache or (str(CACHE_FILE) if args.rescore_only else None)
+    cache = ResponseCache(Path(cache_path), max_size_mb=args.cache_size_mb) if cache_path else None
+    results_store = None
+    if not args.no_store:
+        if PYARROW_AVAILABLE:
+            results_store = ResultsStore()
+        else:
+            print("ℹ️  pyarrow not installed; runs are saved as JSON only (pip install pyarrow)")
+    # Each backend records its own model; a mock run must not be recorded
+    # under the real model's name. The OpenAI server names its model below.
+    model_name = {"ollama": args.model, "transformers": args.hf_model, "openai": args.served_model,
+                  "mock": "qalb-mock"}[args.backend]
+    backend = None
+    if args.backend != "ollama" and not args.rescore_only:
+        if args.use_async or args.hosts:
+            print(f"❌ --async and --hosts drive Ollama servers; drop them for --backend {args.backend}")
+            sys.exit(1)
+        if args.backend == "transformers":
+            print(f"\n⏳ Loading {args.hf_model} with transformers ({args.dtype})...")
+        try:
+            backend = create_backend(
+                args.backend, model_name, base_url=args.base_url, served_model=args.served_model,
+                api_key=args.api_key, device=args.device, dtype=args.dtype, batch_size=args.batch_size
+            )
+            model_name = backend.metadata().get("model") or model_name
+        except (RuntimeError, ValueError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        except Exception as e:
+            print(f"❌ {args.backend} backend is not reachable: {describe_error(e)}")
+            sys.exit(1)
+    if not model_name:
+        print(f"❌ --rescore-only with --backend {args.backend} needs --served-model")
+        sys.exit(1)
+    output_dir = backend_output_dir(args.backend, model_name)
+    checkpoint_dir = CHECKPOINT_DIR if args.backend == "ollama" else output_dir / "checkpoints"
+    if args.backend != "ollama":
+        print(f"📁 {args.backend} results go to {output_dir}")
+    runner_options = dict(model_name=model_name, workers=workers, hosts=args.hosts,
+                          cache=cache, rescore_only=args.rescore_only,
+                          stream=args.stream or args.score_ttft, score_on_ttft=args.score_ttft,
+                          results_store=results_store, repeats=args.repeats,
+                          min_repeats=args.min_repeats, target_ci=args.target_ci,
+                          early_stop=args.early_stop, keep_alive=args.keep_alive,
+                          warm_up=not args.no_warm_up, backend=backend,
+                          output_dir=output_dir, checkpoint_dir=checkpoint_dir)
+    if args.use_async:
+        runner = AsyncQalbTestRunner(test_timeout=args.timeout, **runner_options)
+    else:
+        runner = QalbTestRunner(**runner_options)
     
-    # Initialize and check prerequisites
-    if not runner.initialize():
+    if args.rescore_only:
+        # Scoring only needs the cache, so skip the Ollama checks
+        print(f"\n♻️  Re-scoring cached responses: {cache.stats()}")
+        runner.system_specs = get_system_specs(runner.model_name)
+    elif not runner.initialize():
+        # Initialize and check prerequisites
         print("\n❌ Prerequisites check failed. Please fix the issues above.")
         sys.exit(1)
     
-    # Run tests - Round 4 with expanded synonym keywords
+    # Run tests - Round 4 (expanded synonym keywords) by default
     try:
-        runner.run_all_baseline_tests(round_num=4)
+        runner.run_all_baseline_tests(round_num=args.round_num)
     except KeyboardInterrupt:
         print("\n\n👋 Test run interrupted. Progress has been saved.")
         print("   Run the script again to resume from where you left off.")
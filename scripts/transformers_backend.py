@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Qalb Transformers Backend
+=========================
+Batched Hugging Face transformers generation for the test runner.
+
+``TransformersBackend.generate_batch`` takes prompts that share generation
+options and sorts them into length buckets of ``batch_size`` prompts, so
+each batch pads as little as possible. Every batch is left-padded (a
+decoder-only model continues from the right edge) and run through one
+``model.generate`` call. Responses come back in input order as Ollama-style
+response dicts: response text, prompt_eval_count and eval_count per item,
+durations in nanoseconds up to each item's own last token, done_reason and
+batch_size. Stop strings are cut from the text, as Ollama does. Items that
+share a batch share its decoding steps, so QalbTestRunner scores them
+without the time bonus and reports the batch throughput instead. ``generate`` wraps a single
+prompt the same way, and with ``stream=True`` yields Ollama-style chunks as
+text is decoded (see backends.py for the interface every backend shares).
+
+On CPU the model runs in bfloat16, or with ``dtype="int8"`` in float32 with
+its linear layers dynamically quantised to int8 (loading briefly needs
+float32 memory). On CUDA ``int8`` and ``int4`` use bitsandbytes.
+
+Usage:
+    python scripts/test_runner.py --backend transformers --batch-size 32
+    python scripts/test_runner.py --backend transformers --device cpu --dtype int8 --batch-size 64
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import threading
+import time
+from typing import Optional, List, Dict, Any, Iterator, Tuple, Sequence
+
+from backends import HF_MODEL_NAME, DEFAULT_BATCH_SIZE, DTYPES
+
+try:
+    import torch
+    from transformers import (
+        AutoModelForCausalLM, AutoTokenizer, StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+    )
+    from transformers.generation.streamers import BaseStreamer
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    TRANSFORMERS_AVAILABLE = False
+    BaseStreamer = StoppingCriteria = object
+
+
+# Ollama option -> generate() keyword argument
+OPTION_ARGUMENTS = {
+    "num_predict": "max_new_tokens",
+    "temperature": "temperature",
+    "top_p": "top_p",
+    "top_k": "top_k",
+    "repeat_penalty": "repetition_penalty",
+}
+DEFAULT_MAX_NEW_TOKENS = 256
+
+
+def length_buckets(lengths: Sequence[int], batch_size: int) -> List[List[int]]:
+    """Group item indices into batches of similar length, longest batch first.
+
+    Sorting by length before chunking keeps each batch's padding down to the
+    spread within it. Running the longest prompts first means an
+    out-of-memory batch fails straight away rather than at the end of a run.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def generation_kwargs(options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """generate() keyword arguments for a set of Ollama-style generation options."""
+    options = options or {}
+    kwargs = {OPTION_ARGUMENTS[k]: v for k, v in options.items() if k in OPTION_ARGUMENTS}
+    kwargs.setdefault("max_new_tokens", DEFAULT_MAX_NEW_TOKENS)
+    # Temperature 0 means greedy decoding in Ollama
+    kwargs["do_sample"] = kwargs.get("temperature", 0.8) > 0
+    if not kwargs["do_sample"]:
+        kwargs.pop("temperature", None)
+        kwargs.pop("top_p", None)
+        kwargs.pop("top_k", None)
+    if options.get("stop"):
+        kwargs["stop_strings"] = list(options["stop"])
+    return kwargs
+
+
+def find_stop(text: str, stop_strings: Sequence[str]) -> Optional[int]:
+    """Offset of the earliest stop string in ``text``, or None."""
+    offsets = [text.find(stop) for stop in stop_strings if stop]
+    offsets = [offset for offset in offsets if offset >= 0]
+    return min(offsets) if offsets else None
+
+
+def partial_stop(text: str, stop_strings: Sequence[str]) -> int:
+    """Length of the longest end of ``text`` that may be the start of a stop string."""
+    longest = 0
+    for stop in stop_strings:
+        for length in range(min(len(stop) - 1, len(text)), longest, -1):
+            if stop.startswith(text[-length:]):
+                longest = length
+                break
+    return longest
+
+
+class StepTimer(BaseStreamer):
+    """Streamer that only records when generate() hands over each decoding step.
+
+    The first put() carries the prompt and the second the first new tokens,
+    so the gap between them is the batch's prefill time.
+    """
+
+    def __init__(self):
+        self.times: List[float] = []
+
+    def put(self, value):
+        self.times.append(time.perf_counter())
+
+    def end(self):
+        pass
+
+
+class StopOnEvent(StoppingCriteria):
+    """Ends generation once an event is set, e.g. when a stream's reader goes away."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+class TransformersBackend:
+    """Qalb on Hugging Face transformers, generating test prompts in batches."""
+
+    name = "transformers"
+    supports_batch = True
+
+    def __init__(
+        self,
+        model_name: str = HF_MODEL_NAME,
+        device: Optional[str] = None,
+        dtype: str = "bfloat16",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        chat_template: bool = True
+    ):
+        if not TRANSFORMERS_AVAILABLE:
+            raise RuntimeError("transformers backend needs: pip install torch transformers accelerate")
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown dtype '{dtype}', expected one of {', '.join(DTYPES)}")
+        self.model_name = model_name
+        self.model_id = model_name
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.dtype = dtype
+        self.batch_size = max(1, batch_size)
+        self.chat_template = chat_template
+
+        start = time.perf_counter()
+        self.tokenizer, self.model = self.load(model_name, self.device, dtype)
+        self.load_seconds = time.perf_counter() - start
+        self.terminators = {
+            t for t in (
+                self.tokenizer.eos_token_id,
+                self.tokenizer.convert_tokens_to_ids("<|eot_id|>"),
+                self.tokenizer.pad_token_id,
+            ) if isinstance(t, int) and t >= 0
+        }
+        self.totals = {"batches": 0, "prompts": 0, "prompt_tokens": 0,
+                       "padding_tokens": 0, "generated_tokens": 0, "seconds": 0.0}
+
+    @staticmethod
+    def load(model_name: str, device: str, dtype: str):
+        """Load tokenizer and model for batched generation on ``device``."""
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # Pad on the left so every prompt ends where generation starts
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token = tokenizer.eos_token
+
+        if device == "cuda" and dtype in ("int8", "int4"):
+            from transformers import BitsAndBytesConfig
+            quantization = (
+                BitsAndBytesConfig(load_in_8bit=True) if dtype == "int8" else
+                BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_quant_type="nf4",
+                                   bnb_4bit_compute_dtype=torch.bfloat16)
+            )
+            model = AutoModelForCausalLM.from_pretrained(
+                model_name, quantization_config=quantization, device_map="auto"
+            )
+        elif dtype in ("int8", "int4"):
+            if dtype == "int4":
+                raise ValueError("int4 needs CUDA (bitsandbytes); use int8 or bfloat16 on CPU")
+            # Dynamic quantisation works on float32 Linear layers
+            model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.float32)
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            model = AutoModelForCausalLM.from_pretrained(
+                model_name, torch_dtype=getattr(torch, dtype),
+                device_map="auto" if device == "cuda" else None
+            )
+        model.eval()
+        return tokenizer, model
+
+    def describe(self) -> str:
+        return (f"transformers {self.model_name} on {self.device} ({self.dtype}, "
+                f"batch size {self.batch_size}, loaded in {self.load_seconds:.1f}s)")
+
+    def health(self) -> bool:
+        # The model lives in this process
+        return True
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "model": self.model_name,
+            "device": self.device,
+            "quantization": self.dtype,
+            "batch_size": self.batch_size,
+            "load_seconds": self.load_seconds,
+            "digest": f"{self.name}:{self.model_name}:{self.dtype}",
+        }
+
+    def format_prompt(self, prompt: str) -> str:
+        """Wrap a test prompt in the model's chat template, as Ollama does."""
+        if self.chat_template and self.tokenizer.chat_template:
+            return self.tokenizer.apply_chat_template(
+                [{"role": "user", "content": prompt}], tokenize=False, add_generation_prompt=True
+            )
+        return prompt
+
+    def encode(self, prompts: Sequence[str]) -> List[List[int]]:
+        """Token ids of test prompts wrapped in the chat template."""
+        texts = [self.format_prompt(p) for p in prompts]
+        # The chat template already carries <|begin_of_text|>
+        return self.tokenizer(texts, add_special_tokens=not self.chat_template)["input_ids"]
+
+    def generate_kwargs(self, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        kwargs = generation_kwargs(options)
+        if "stop_strings" in kwargs:
+            kwargs["tokenizer"] = self.tokenizer
+        return kwargs
+
+    def iter_batches(
+        self,
+        prompts: Sequence[str],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Tuple[List[int], List[Dict[str, Any]]]]:
+        """Generate length-bucketed batches; yields (input indices, responses) per batch."""
+        encoded = self.encode(prompts)
+        kwargs = self.generate_kwargs(options)
+        seed = (options or {}).get("seed")
+
+        for indices in length_buckets([len(ids) for ids in encoded], self.batch_size):
+            yield indices, self.generate_padded([encoded[i] for i in indices], kwargs, seed)
+
+    def generate_padded(
+        self,
+        batch: List[List[int]],
+        kwargs: Dict[str, Any],
+        seed: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """One left-padded model.generate call over tokenised prompts."""
+        inputs = self.tokenizer.pad({"input_ids": batch}, padding=True, return_tensors="pt")
+        inputs = {k: v.to(self.model.device) for k, v in inputs.items()}
+        if seed is not None:
+            torch.manual_seed(seed)
+
+        timer = StepTimer()
+        start = time.perf_counter()
+        with torch.inference_mode():
+            outputs = self.model.generate(
+                **inputs,
+                **kwargs,
+                eos_token_id=sorted(self.terminators),
+                pad_token_id=self.tokenizer.pad_token_id,
+                streamer=timer,
+            )
+        end = time.perf_counter()
+        # timer.times[k] marks the k-th decoded token of every row; times[0] is the prompt
+        return self.responses(batch, inputs, outputs, start, timer.times[1:], end,
+                              kwargs.get("stop_strings", []))
+
+    def responses(
+        self,
+        batch: List[List[int]],
+        inputs: Dict[str, Any],
+        outputs: Any,
+        start: float,
+        steps: List[float],
+        end: float,
+        stop_strings: Sequence[str] = ()
+    ) -> List[Dict[str, Any]]:
+        """Ollama-style responses for one generate call, and the throughput totals.
+
+        ``steps`` holds when each decoding step finished, so every row is
+        timed up to its own last token rather than the batch's.
+        """
+        width = inputs["input_ids"].shape[1]
+        prompt_lengths = inputs["attention_mask"].sum(dim=1).tolist()
+        # Without a first step nothing was generated
+        first_token = steps[0] if steps else end
+        responses = []
+        for row, prompt_tokens in zip(outputs[:, width:].tolist(), prompt_lengths):
+            # Finished rows are padded out to the longest one in the batch
+            stop = next((pos for pos, token in enumerate(row) if token in self.terminators), None)
+            generated = row if stop is None else row[:stop]
+            eval_count = len(generated) + (stop is not None)
+            finished = steps[eval_count - 1] if 0 < eval_count <= len(steps) else end
+            text = self.tokenizer.decode(generated, skip_special_tokens=True)
+            # generate() keeps the stop string, and the row that ended the
+            # batch on one has no terminator after it; Ollama drops it
+            cut = find_stop(text, stop_strings)
+            if cut is not None:
+                text = text[:cut]
+            responses.append({
+                "model": self.model_name,
+                "response": text,
+                "done": True,
+                "done_reason": "length" if stop is None and cut is None else "stop",
+                "prompt_eval_count": int(prompt_tokens),
+                "eval_count": eval_count,
+                "load_duration": 0,
+                "prompt_eval_duration": int((first_token - start) * 1e9),
+                "eval_duration": int(max(0.0, finished - first_token) * 1e9),
+                "total_duration": int((finished - start) * 1e9),
+                "batch_size": len(batch),
+            })
+
+        self.totals["batches"] += 1
+        self.totals["prompts"] += len(batch)
+        self.totals["prompt_tokens"] += sum(len(ids) for ids in batch)
+        self.totals["padding_tokens"] += width * len(batch) - sum(len(ids) for ids in batch)
+        self.totals["generated_tokens"] += sum(r["eval_count"] for r in responses)
+        self.totals["seconds"] += end - start
+        return responses
+
+    def generate_batch(
+        self,
+        prompts: Sequence[str],
+        options: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Responses for ``prompts`` in input order, generated in length-bucketed batches."""
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+        for indices, batch_responses in self.iter_batches(prompts, options):
+            for i, response in zip(indices, batch_responses):
+                responses[i] = response
+        return responses
+
+    def generate(
+        self,
+        model: Optional[str] = None,
+        prompt: str = "",
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        **kwargs
+    ) -> Any:
+        """Single-prompt generate with the ollama client's signature (keep_alive etc. ignored)."""
+        if stream:
+            return self.stream(prompt, options)
+        return self.generate_batch([prompt], options)[0]
+
+    def stream(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Ollama-style chunks for one prompt as the model decodes it.
+
+        generate() runs on a worker thread and feeds a TextIteratorStreamer.
+        Closing the iterator early stops generation at the next step.
+        """
+        batch = self.encode([prompt])
+        inputs = self.tokenizer.pad({"input_ids": batch}, padding=True, return_tensors="pt")
+        inputs = {k: v.to(self.model.device) for k, v in inputs.items()}
+        if (options or {}).get("seed") is not None:
+            torch.manual_seed(options["seed"])
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        cancelled = threading.Event()
+        outcome: Dict[str, Any] = {}
+
+        def run():
+            try:
+                with torch.inference_mode():
+                    outcome["outputs"] = self.model.generate(
+                        **inputs,
+                        **self.generate_kwargs(options),
+                        eos_token_id=sorted(self.terminators),
+                        pad_token_id=self.tokenizer.pad_token_id,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([StopOnEvent(cancelled)]),
+                    )
+            except Exception as e:
+                outcome["error"] = e
+                # Unblock the reader, which would otherwise wait for text forever
+                streamer.end()
+
+        stop_strings = generation_kwargs(options).get("stop_strings", [])
+        start = time.perf_counter()
+        first_token = None
+        # Text that may be the start of a stop string is held back until it isn't
+        pending = ""
+        worker = threading.Thread(target=run, name="qalb-transformers-stream", daemon=True)
+        worker.start()
+        try:
+            for text in streamer:
+                if not text:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter()
+                pending += text
+                cut = find_stop(pending, stop_strings)
+                ready = pending[:cut] if cut is not None else pending[:len(pending) - partial_stop(pending, stop_strings)]
+                pending = pending[len(ready):]
+                if ready:
+                    yield {"model": self.model_name, "response": ready, "done": False}
+                if cut is not None:
+                    # Like Ollama, stop at the stop string rather than stream past it
+                    cancelled.set()
+                    break
+            else:
+                if pending:
+                    yield {"model": self.model_name, "response": pending, "done": False}
+            worker.join()
+            if "error" in outcome:
+                raise outcome["error"]
+            end = time.perf_counter()
+            steps = [first_token] if first_token else []
+            final = self.responses(batch, inputs, outcome["outputs"], start, steps, end, stop_strings)[0]
+            # The text has already been streamed
+            yield {**final, "response": ""}
+        finally:
+            cancelled.set()
+            worker.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Throughput and padding totals over every batch generated so far."""
+        totals = dict(self.totals)
+        padded = totals["prompt_tokens"] + totals["padding_tokens"]
+        totals["padding_ratio"] = totals["padding_tokens"] / padded if padded else 0.0
+        totals["tokens_per_second"] = (
+            totals["generated_tokens"] / totals["seconds"] if totals["seconds"] else 0.0
+        )
+        totals["load_seconds"] = self.load_seconds
+        return totals
@@ -0,0 +1,117 @@
+"""
+Qalb Urdu Text Normalisation
+============================
+Folds spelling variants of Urdu text to one canonical form so keyword
+matching doesn't miss on encoding differences the reader can't see.
+
+Pipeline, applied identically to responses and keywords:
+
+1. Unicode NFC (composes e.g. alef + madda into آ).
+2. Lowercase (Latin-script keywords).
+3. Folding table:
+   - Arabic yeh/alef maksura (ي ى) to Urdu yeh (ی), Arabic kaf (ك) to
+     Urdu kaf (ک), Arabic heh (ه) and heh-with-hamza (ۂ ۀ) to gol heh (ہ)
+   - Urdu and Arabic-Indic digits (۰-۹, ٠-٩) to 0-9
+   - Diacritics/aerab (064B-065F, superscript alef 0670), tatweel,
+     zero-width joiner and bidi marks removed
+   - Zero-width non-joiner, zero-width space, newlines, tabs and other
+     Unicode spaces to a space, so "اسلام آباد" and "اسلام‌آباد" compare
+     equal
+   - Latin and Arabic commas removed, so "1,000" matches "1000"
+4. Whitespace runs collapsed to a single space.
+
+Each step only touches text that needs it (NFC is checked before it is
+applied, and only the fold characters actually present are replaced), so
+the pipeline stays cheap enough for re-scoring millions of stored
+responses.
+
+Author: Fawad Hussain
+Website: fawadhs.dev
+"""
+
+import re
+import unicodedata
+from typing import List, Dict, Tuple
+
+
+URDU_YEH = "\u06cc"  # ی
+URDU_KAF = "\u06a9"  # ک
+URDU_HEH = "\u06c1"  # ہ
+
+CHAR_FOLDS: Dict[str, str] = {
+    "\u064a": URDU_YEH,  # ي Arabic yeh
+    "\u0649": URDU_YEH,  # ى alef maksura
+    "\u0643": URDU_KAF,  # ك Arabic kaf
+    "\u0647": URDU_HEH,  # ه Arabic heh
+    "\u06c2": URDU_HEH,  # ۂ heh goal with hamza
+    "\u06c0": URDU_HEH,  # ۀ heh with yeh above
+    "\u0640": "",        # tatweel
+    "\u200c": " ",       # zero-width non-joiner
+    "\u200b": " ",       # zero-width space
+    "\u200d": "",        # zero-width joiner
+    "\u200e": "",        # left-to-right mark
+    "\u200f": "",        # right-to-left mark
+    "\u061c": "",        # Arabic letter mark
+    ",": "",
+    "\u060c": "",        # ، Arabic comma
+}
+# Diacritics (fathatan .. wavy hamza below) and superscript alef
+CHAR_FOLDS.update({chr(code): "" for code in range(0x064B, 0x0660)})
+CHAR_FOLDS["\u0670"] = ""
+# Urdu (Extended Arabic-Indic) and Arabic-Indic digits
+CHAR_FOLDS.update({chr(0x06F0 + d): str(d) for d in range(10)})
+CHAR_FOLDS.update({chr(0x0660 + d): str(d) for d in range(10)})
+# Newlines, tabs, no-break and other Unicode spaces
+CHAR_FOLDS.update({chr(code): " " for code in range(0x3001) if chr(code).isspace() and code != 0x20})
+
+_NEEDS_FOLDING = re.compile("[" + "".join(re.escape(c) for c in CHAR_FOLDS) + "]")
+
+
+def _fold(text: str) -> str:
+    """NFC, lowercase and character folds; no whitespace collapsing."""
+    if not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)
+    text = text.lower()
+    # Only a few distinct characters ever need folding, and replacing each is
+    # far faster than str.translate, which is slow on non-ASCII text
+    for char in set(_NEEDS_FOLDING.findall(text)):
+        text = text.replace(char, CHAR_FOLDS[char])
+    return text
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of ``text`` for keyword comparison."""
+    text = _fold(text)
+    while "  " in text:
+        text = text.replace("  ", " ")
+    return text
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int], List[int]]:
+    """Normalise text and map each normalised character back to the source.
+
+    Returns ``(normalized, starts, ends)``: normalised character ``i`` came
+    from ``text[starts[i]:ends[i]]``. Characters are normalised one base
+    character plus its combining marks at a time, so it matches
+    ``normalize_text`` for everything but exotic cross-character
+    compositions.
+    """
+    chars: List[str] = []
+    starts: List[int] = []
+    ends: List[int] = []
+
+    cluster_start = 0
+    for index in range(1, len(text) + 1):
+        if index < len(text) and unicodedata.combining(text[index]):
+            continue
+        for char in _fold(text[cluster_start:index]):
+            if char.isspace():
+                if chars and chars[-1] == " ":
+                    ends[-1] = index
+                    continue
+                char = " "
+            chars.append(char)
+            starts.append(cluster_start)
+            ends.append(index)
+        cluster_start = index
+    return "".join(chars), starts, ends
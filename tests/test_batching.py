@@ -0,0 +1,56 @@
+"""Batched generation: per-row stop strings, unscored shared latency and batch throughput."""
+
+import pytest
+
+import test_runner as tr
+from transformers_backend import find_stop, partial_stop
+
+STOPS = ["\nUser:", "\nصارف:"]
+
+
+def test_find_stop_takes_the_earliest_stop_string():
+    assert find_stop("جواب\nصارف: اگلا\nUser: next", STOPS) == 4
+    assert find_stop("جواب", STOPS) is None
+    assert find_stop("جواب\nUser:", []) is None
+
+
+@pytest.mark.parametrize("text, held", [
+    ("جواب\n", 1),
+    ("جواب\nUs", 3),
+    ("جواب\nصا", 3),
+    ("جواب", 0),
+    ("جواب\nUx", 0),
+])
+def test_partial_stop_holds_back_a_possible_stop_string(text, held):
+    assert partial_stop(text, STOPS) == held
+
+
+def make_case():
+    return tr.TestCase(id="qa_1", category="qa", script_type="urdu", prompt="p", expected_language="urdu",
+                       expected_keywords=["اسلام آباد"], difficulty="easy", tags=[])
+
+
+def response(total_ms, **extra):
+    return {"response": "پاکستان کا دارالحکومت اسلام آباد ہے", "done": True, "done_reason": "stop",
+            "prompt_eval_count": 10, "eval_count": 8, "load_duration": 0,
+            "prompt_eval_duration": int(50e6), "eval_duration": int((total_ms - 50) * 1e6),
+            "total_duration": int(total_ms * 1e6), **extra}
+
+
+def test_batched_results_are_scored_without_their_shared_time():
+    runner = tr.QalbTestRunner()
+    single = runner.build_result(make_case(), response(30000), 30000)
+    fast = runner.build_result(make_case(), response(1000, batch_size=32), 1000)
+    slow = runner.build_result(make_case(), response(60000, batch_size=32), 60000)
+
+    assert fast.batch_size == 32
+    assert fast.score == slow.score
+    # Everything but the time bonus (5 points at 30 s), scaled from 80 to 100
+    assert fast.score == pytest.approx(min(100.0, (single.score - 5.0) * 100 / 80))
+
+
+def test_batch_throughput_is_measured_between_snapshots():
+    before = {"generated_tokens": 1000, "seconds": 10.0}
+    after = {"generated_tokens": 5000, "seconds": 30.0}
+    assert tr.batch_throughput(before, after) == pytest.approx(200.0)
+    assert tr.batch_throughput({}, {}) == 0.0
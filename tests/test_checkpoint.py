@@ -0,0 +1,85 @@
+"""Checkpoint log: append, resume and recovery from torn or damaged records."""
+
+import json
+
+import test_runner as tr
+
+
+def result(test_id, score=50.0):
+    return {"test_id": test_id, "score": score, "timestamp": f"2026-01-01T00:00:0{len(test_id) % 10}"}
+
+
+def write_log(path, results):
+    tr.save_checkpoint(tr.Checkpoint(test_file="suite.json"), path)
+    with tr.CheckpointWriter(path) as writer:
+        for r in results:
+            writer.append(r)
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "suite_checkpoint.jsonl"
+    write_log(path, [result("a"), result("b")])
+
+    checkpoint = tr.load_checkpoint(path)
+    assert checkpoint.test_file == "suite.json"
+    assert checkpoint.completed_test_ids == ["a", "b"]
+
+
+def test_torn_tail_is_dropped_and_truncated(tmp_path):
+    path = tmp_path / "suite_checkpoint.jsonl"
+    write_log(path, [result("a"), result("b")])
+    intact = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(b'{"type":"result","result":{"test_id":"c","sc')
+
+    checkpoint = tr.load_checkpoint(path)
+    assert checkpoint.completed_test_ids == ["a", "b"]
+    assert path.stat().st_size == intact
+
+    # Appends after recovery start on a fresh line and are read back
+    with tr.CheckpointWriter(path) as writer:
+        writer.append(result("c"))
+    assert tr.load_checkpoint(path).completed_test_ids == ["a", "b", "c"]
+
+
+def test_damaged_record_mid_log_is_skipped(tmp_path):
+    path = tmp_path / "suite_checkpoint.jsonl"
+    write_log(path, [result("a")])
+    with open(path, "ab") as f:
+        f.write(b"not json\n")
+        f.write((json.dumps({"type": "result", "result": result("b")}) + "\n").encode())
+
+    assert tr.load_checkpoint(path).completed_test_ids == ["a", "b"]
+
+
+def test_rerun_supersedes_earlier_record(tmp_path):
+    path = tmp_path / "suite_checkpoint.jsonl"
+    write_log(path, [result("a", 10.0), result("b"), result("a", 90.0)])
+
+    checkpoint = tr.load_checkpoint(path)
+    assert checkpoint.completed_test_ids == ["b", "a"]
+    assert checkpoint.results[-1]["score"] == 90.0
+
+
+def test_missing_header_is_rejected(tmp_path):
+    path = tmp_path / "suite_checkpoint.jsonl"
+    path.write_bytes((json.dumps({"type": "result", "result": result("a")}) + "\n").encode())
+
+    assert tr.load_checkpoint(path) is None
+
+
+def test_appends_never_rewrite_earlier_records(tmp_path):
+    path = tmp_path / "suite_checkpoint.jsonl"
+    write_log(path, [result("a")])
+    before = path.read_bytes()
+
+    with tr.CheckpointWriter(path, fsync_every=1) as writer:
+        writer.append(result("b"))
+        after_one = path.read_bytes()
+        writer.append(result("c"))
+
+    # Each record costs one line, whatever came before it
+    assert after_one.startswith(before) and after_one.count(b"\n") == before.count(b"\n") + 1
+    assert path.read_bytes().startswith(after_one)
+    # The header is compact: one line, no indentation
+    assert b"\n " not in before
@@ -0,0 +1,65 @@
+"""DataCollector aggregates: Welford/Chan running stats and the live summary they feed."""
+
+import math
+import random
+import statistics
+
+from data_collector import DataCollector, RunningStats
+
+
+def stats_of(values):
+    stats = RunningStats()
+    for v in values:
+        stats.add(v)
+    return stats
+
+
+def test_welford_matches_two_pass():
+    values = [random.Random(1).gauss(50, 10) for _ in range(200)]
+    stats = stats_of(values)
+    assert stats.count == 200
+    assert math.isclose(stats.mean, statistics.fmean(values))
+    assert math.isclose(stats.variance, statistics.variance(values))
+
+
+def test_chan_merge_matches_single_pass():
+    rng = random.Random(2)
+    parts = [[rng.uniform(0, 100) for _ in range(n)] for n in (1, 7, 0, 40)]
+    merged = RunningStats()
+    for part in parts:
+        merged.merge(stats_of(part))
+    everything = stats_of([v for part in parts for v in part])
+    assert merged.count == everything.count
+    assert math.isclose(merged.mean, everything.mean)
+    assert math.isclose(merged.m2, everything.m2)
+
+
+def test_merge_into_empty_and_from_empty():
+    stats = RunningStats()
+    stats.merge(stats_of([3.0, 5.0]))
+    stats.merge(RunningStats())
+    assert (stats.count, stats.mean, stats.variance) == (2, 4.0, 2.0)
+
+
+def test_live_summary_tracks_logged_results(tmp_path):
+    with DataCollector(base_path=str(tmp_path), session_id="s1") as collector:
+        collector.log_test_result("u1", "qa", "urdu_script", "p", "اسلام آباد", is_correct=True, response_time=1.0)
+        collector.log_test_result("u2", "qa", "urdu_script", "p", "لاہور", is_correct=False, response_time=3.0)
+        collector.log_test_result("r1", "qa", "roman_urdu", "p", "Islamabad", is_correct=True, response_time=2.0)
+
+        # Mid-run, before anything is flushed
+        summary = collector.live_summary()
+        assert summary["total_tests"] == 3
+        assert math.isclose(summary["summary"]["urdu_script_accuracy"], 50.0)
+        assert math.isclose(summary["summary"]["roman_urdu_accuracy"], 100.0)
+        assert math.isclose(summary["summary"]["avg_response_time"], 2.0)
+        assert math.isclose(summary["summary"]["response_time_stddev"], 1.0)
+        assert summary["categories"]["qa"]["total_tests"] == 3
+
+    # A later session reads the stored aggregates back
+    with DataCollector(base_path=str(tmp_path), session_id="s2") as collector:
+        collector.log_test_result("u3", "qa", "urdu_script", "p", "کراچی", is_correct=True, response_time=2.0)
+        assert collector.live_summary()["total_tests"] == 1
+        assert collector.live_summary(all_sessions=True)["total_tests"] == 4
+        report = collector.generate_final_report_data()
+    assert math.isclose(report["summary"]["overall_accuracy"], 75.0)
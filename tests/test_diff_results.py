@@ -0,0 +1,69 @@
+"""Results diff: the hash join on test_id and vectorised bootstrap intervals."""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from diff_results import bootstrap_means, join_results, summarize
+
+
+def frame(rows):
+    return pd.DataFrame([
+        {"category": "qa", "script_type": "urdu", "difficulty": "easy", "urdu_char_ratio": 0.9,
+         "response_time_ms": 1000.0, "failed": False, "passed_keywords": [], "failed_keywords": [], **row}
+        for row in rows
+    ]).assign(passed=lambda f: f["passed_keywords"].str.len() > 0)
+
+
+def test_join_reports_deltas_flips_and_status():
+    base = frame([
+        {"test_id": "a", "score": 80.0, "passed_keywords": ["x"], "failed_keywords": ["y"]},
+        {"test_id": "b", "score": 60.0, "failed_keywords": ["z"]},
+        {"test_id": "c", "score": 70.0, "passed_keywords": ["w"]},
+        {"test_id": "gone", "score": 50.0},
+    ])
+    head = frame([
+        {"test_id": "a", "score": 50.0, "failed_keywords": ["x", "y"], "response_time_ms": 3000.0},
+        {"test_id": "b", "score": 90.0, "passed_keywords": ["z"], "urdu_char_ratio": 0.5},
+        {"test_id": "c", "score": 0.0, "failed": True},
+        {"test_id": "new", "score": 40.0},
+    ])
+    diff = join_results(base, head).set_index("test_id")
+
+    assert diff["status"].to_dict() == {"a": "compared", "b": "compared", "c": "new_error",
+                                        "gone": "removed", "new": "added"}
+    assert diff.loc["a", "score_delta"] == -30.0 and diff.loc["b", "score_delta"] == 30.0
+    assert math.isnan(diff.loc["c", "score_delta"])
+    assert diff.loc["a", "keywords_lost"] == ["x"] and diff.loc["b", "keywords_gained"] == ["z"]
+    assert diff.loc["a", "latency_regression"] and not diff.loc["b", "latency_regression"]
+    assert diff.loc["b", "urdu_shifted"]
+
+    overall, _ = summarize(diff.reset_index(), resamples=200)
+    assert overall["tests"] == 2
+    assert overall["score_delta_low"] <= overall["score_delta"] <= overall["score_delta_high"]
+
+
+def test_bootstrap_means_shape_and_groups():
+    values = np.array([[1.0, 10.0], [2.0, 20.0], [3.0, 30.0], [4.0, 40.0]])
+    membership = np.array([[1, 1, 0], [1, 1, 0], [1, 0, 1], [1, 0, 1]], dtype=float)
+    means = bootstrap_means(values, membership, resamples=500, seed=0)
+    assert means.shape == (500, 3, 2)
+    # Rows are resampled together, so paired columns keep their ratio
+    overall = means[:, 0, :]
+    assert np.allclose(overall[:, 1], overall[:, 0] * 10)
+    assert math.isclose(np.nanmean(overall[:, 0]), 2.5, abs_tol=0.1)
+    # Group means stay within their members' range
+    assert np.nanmin(means[:, 1, 0]) >= 1 and np.nanmax(means[:, 1, 0]) <= 2
+
+
+def test_bootstrap_means_is_reproducible_and_handles_empty():
+    values = np.arange(10.0)
+    assert np.array_equal(bootstrap_means(values, resamples=50, seed=3),
+                          bootstrap_means(values, resamples=50, seed=3))
+    assert np.isnan(bootstrap_means(np.empty(0), resamples=5)).all()
+
+
+def test_bootstrap_means_constant_values():
+    means = bootstrap_means(np.full(20, 7.0), resamples=100)
+    assert np.allclose(means, 7.0)
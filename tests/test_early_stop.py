@@ -0,0 +1,27 @@
+"""Early stopping waits until the keyword outcome can no longer change."""
+
+import test_runner as tr
+
+
+def make_case(keywords):
+    return tr.TestCase(id="qa_1", category="qa", script_type="urdu", prompt="p", expected_language="urdu",
+                       expected_keywords=keywords, difficulty="easy", tags=[])
+
+
+def test_stops_only_once_every_keyword_matched():
+    runner = tr.QalbTestRunner(early_stop=True)
+    decided = runner.outcome_decided(make_case(["اسلام آباد", "دارالحکومت"]))
+    padding = " پاکستان" * 20
+
+    assert not decided("اسلام آباد")
+    assert not decided("اسلام آباد" + padding)
+    assert decided("اسلام آباد دارالحکومت" + padding)
+
+
+def test_early_stop_keeps_the_scoring_mode():
+    runner = tr.QalbTestRunner(early_stop=True)
+    assert runner.stream
+    assert not runner.score_on_ttft
+    assert runner.scoring_mode()["early_stop"]
+    assert runner.outcome_decided(make_case([])) is None
+    assert tr.QalbTestRunner().outcome_decided(make_case(["x"])) is None
@@ -0,0 +1,65 @@
+"""Endpoint pool: a drained server's revival probe never stalls the async runner."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import test_runner as tr
+
+pytest.importorskip("ollama")
+
+GOOD, DEAD = "http://good:11434", "http://dead:11434"
+PROBE_SECONDS = 2.0
+
+
+class FakeAsyncClient:
+    async def generate(self, **request):
+        await asyncio.sleep(0.01)
+        return {"response": "پاکستان کا دارالحکومت اسلام آباد ہے", "eval_count": 8,
+                "eval_duration": 10_000_000, "done_reason": "stop"}
+
+
+def test_hanging_revival_probe_does_not_block_other_tests(monkeypatch):
+    probing = threading.Event()
+
+    def check_connection(host=None):
+        if host == DEAD:
+            probing.set()
+            time.sleep(PROBE_SECONDS)
+            return False
+        return True
+
+    monkeypatch.setattr(tr, "check_ollama_connection", check_connection)
+    runner = tr.AsyncQalbTestRunner(hosts=[GOOD, DEAD], workers=8, test_timeout=1.0, warm_up=False)
+    for endpoint in runner.pool.endpoints:
+        endpoint.async_client = FakeAsyncClient()
+    dead = runner.pool.endpoints[1]
+    # Drained long enough ago that the next acquire() re-probes it
+    dead.healthy, dead.drained_at = False, 0.0
+
+    test_cases = [
+        tr.TestCase(id=f"qa_{i}", category="qa", script_type="urdu", prompt=f"سوال {i}",
+                    expected_language="urdu", expected_keywords=["اسلام آباد"], difficulty="easy", tags=[])
+        for i in range(8)
+    ]
+
+    start = time.perf_counter()
+    finished = []
+
+    async def run_one(tc):
+        result = await runner.run_single_test_async(tc)
+        finished.append(time.perf_counter() - start)
+        return result
+
+    async def run_all():
+        return await asyncio.gather(*(run_one(tc) for tc in test_cases))
+
+    results = asyncio.run(run_all())
+
+    assert probing.is_set()
+    assert all(r.error is None and r.endpoint == GOOD for r in results)
+    # One test's acquire() waits on the probe in a worker thread; the rest finish meanwhile
+    assert sum(t < 0.5 for t in finished) == len(test_cases) - 1
+    assert max(finished) < PROBE_SECONDS + 1
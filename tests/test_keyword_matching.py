@@ -0,0 +1,70 @@
+"""Keyword matching: automaton vs substring scans, and match positions."""
+
+import json
+
+import pytest
+
+import keyword_matcher as km
+from test_runner import TESTS_DIR
+from urdu_normalization import normalize_text
+
+
+RESPONSES = [
+    "پاکستان کا دارالحکومت اسلام آباد ہے۔",
+    "پاكستان كا دارالحكومت اسلام آباد ہے",     # Arabic kaf
+    "Islamabad has 1,000,000 people; ISLAMABAD is green.",
+    "جواب ۴۲ ہے اور 1٬000",
+    "",
+]
+KEYWORDS = (
+    ["پاکستان", "اسلام آباد", "islamabad", "1000000", "42", "ہے", "لاہور", "کراچی"]
+    + [f"لفظ{i}" for i in range(20)]
+    + ["", "green"]
+)
+
+
+@pytest.mark.skipif(not km.AHOCORASICK_AVAILABLE, reason="pyahocorasick not installed")
+def test_automaton_matches_substring_fallback(monkeypatch):
+    automaton = km.KeywordMatcher(KEYWORDS)
+    assert automaton._automaton is not None
+
+    monkeypatch.setattr(km, "AHOCORASICK_AVAILABLE", False)
+    fallback = km.KeywordMatcher(KEYWORDS)
+    assert fallback._automaton is None
+
+    for response in RESPONSES:
+        assert automaton.match(response) == fallback.match(response)
+        assert automaton.locate(response) == fallback.locate(response)
+
+
+def test_longest_shipped_lists_use_the_automaton(monkeypatch):
+    pytest.importorskip("ahocorasick")
+    with open(TESTS_DIR / "baseline" / "roman_urdu_tests_round4.json", encoding="utf-8") as f:
+        test_cases = json.load(f)["test_cases"]
+    long_lists = [tc for tc in test_cases if len(tc["expected_keywords"]) >= km.AUTOMATON_MIN_KEYWORDS]
+    assert long_lists
+
+    automata = [km.KeywordMatcher(tc["expected_keywords"]) for tc in long_lists]
+    assert all(m._automaton is not None for m in automata)
+    monkeypatch.setattr(km, "AHOCORASICK_AVAILABLE", False)
+    for tc, automaton in zip(long_lists, automata):
+        fallback = km.KeywordMatcher(tc["expected_keywords"])
+        keywords = tc["expected_keywords"]
+        for response in RESPONSES + [f"{tc['prompt']} {keywords[-1]}, {keywords[0].upper()}"]:
+            assert automaton.match(response) == fallback.match(response)
+            assert automaton.locate(response) == fallback.locate(response)
+
+
+def test_fallback_agrees_with_plain_substring_test():
+    keywords = KEYWORDS[:8]
+    for response in RESPONSES:
+        passed, failed = km.match_keywords(response, keywords)
+        normalized = normalize_text(response)
+        assert passed == [k for k in keywords if normalize_text(k) in normalized]
+        assert failed == [k for k in keywords if k not in passed]
+
+
+def test_locate_maps_back_to_original_text():
+    response = "دارالحكومت:  اسلام  آباد"
+    (match,) = km.locate_keywords(response, ["اسلام آباد"])
+    assert response[match.start:match.end] == "اسلام  آباد"
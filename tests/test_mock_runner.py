@@ -0,0 +1,75 @@
+"""The runner against the mock backend: reproducible at any worker count, kept out of data/baseline."""
+
+import pytest
+
+import test_runner as tr
+from mock_backend import MockBackend, MockProfile
+from runner_benchmark import DEFAULT_TEST_FILE, build_test_file, run_level
+
+TESTS = 40
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    path = tmp_path / "urdu_script_tests_round4.json"
+    build_test_file(DEFAULT_TEST_FILE, TESTS, path)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(tr, "RETRY_DELAY_SECONDS", 0)
+
+
+def run(test_file, tmp_path, workers, **profile):
+    backend = MockBackend(profile=MockProfile(time_scale=0, **profile))
+    runner = tr.QalbTestRunner(model_name=backend.model, workers=workers, warm_up=False, backend=backend,
+                               checkpoint_dir=tmp_path / "checkpoints")
+    summary = runner.run_test_suite(test_file, tmp_path / f"workers_{workers}")
+    return backend, {r["test_id"]: (r["score"], r["retry_count"], r["error"]) for r in summary["results"]}
+
+
+def test_results_match_at_any_worker_count(test_file, tmp_path):
+    _, sequential = run(test_file, tmp_path, 1, connection_error_rate=0.2)
+    _, concurrent = run(test_file, tmp_path, 4, connection_error_rate=0.2)
+
+    assert len(sequential) == TESTS
+    assert concurrent == sequential
+    # Refused connections were retried
+    assert sum(retries for _, retries, _ in sequential.values()) > 0
+
+
+def test_server_errors_are_not_retried(test_file, tmp_path):
+    backend, results = run(test_file, tmp_path, 4, server_error_rate=0.25)
+
+    failed = [r for r in results.values() if r[2]]
+    assert len(failed) == backend.stats()["server_error"] > 0
+    # Each request was sent once
+    assert set(backend.attempts.values()) == {1}
+
+
+def test_another_models_checkpoint_is_not_resumed(test_file, tmp_path):
+    # A checkpoint left at the mock's path by some other model's run
+    checkpoint_file = tmp_path / "checkpoints" / f"{test_file.stem}_qalb-mock_checkpoint.jsonl"
+    tr.save_checkpoint(tr.Checkpoint(test_file=test_file.name, backend="ollama", model=tr.MODEL_NAME),
+                       checkpoint_file)
+    with tr.CheckpointWriter(checkpoint_file) as writer:
+        writer.append({"test_id": "urdu_qa_001", "score": 0.0})
+
+    backend, results = run(test_file, tmp_path, 1)
+    assert backend.stats()["requests"] == TESTS
+    assert len(results) == TESTS
+
+
+def test_mock_runs_stay_out_of_the_baseline():
+    assert tr.backend_output_dir("ollama", tr.MODEL_NAME) == tr.BASELINE_DIR
+    assert tr.BASELINE_DIR not in tr.backend_output_dir("mock", "qalb-mock").parents
+
+
+def test_runner_overhead(test_file, tmp_path):
+    row = run_level(test_file, 4, MockProfile(time_scale=0), {}, seed=0, stream=False, work_dir=tmp_path)
+
+    assert row["tests"] == TESTS
+    assert row["failed"] == 0
+    # Generous, so it only catches order-of-magnitude regressions on slow machines
+    assert row["overhead_ms_per_test"] < 50
@@ -0,0 +1,32 @@
+"""A round is analysed for one model, never the newest suite of whichever model ran last."""
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import test_runner as tr
+from qalb_analysis import load_round
+from results_store import ResultsStore
+from test_results_store import suite
+
+
+def test_load_round_reads_one_model(tmp_path, capsys):
+    store = ResultsStore(tmp_path / "store")
+    store.write_suite(suite(tr.MODEL_NAME, 80.0, "2026-01-01T10:00:00"))
+    store.write_suite(suite("qalb-mock", 10.0, "2026-01-03T10:00:00"))
+
+    frame = load_round(4, ["test_id", "score", "error"], store_dir=store.path, data_dir=tmp_path)
+    assert frame["score"].tolist() == [80.0]
+    assert f"Round 4: {tr.MODEL_NAME}" in capsys.readouterr().out
+
+    mock = load_round(4, ["test_id", "score", "error"], model="qalb-mock", store_dir=store.path, data_dir=tmp_path)
+    assert mock["score"].tolist() == [10.0]
+    assert set(mock["model"]) == {"qalb-mock"}
+
+
+def test_load_round_refuses_to_guess(tmp_path):
+    store = ResultsStore(tmp_path / "store")
+    store.write_suite(suite("enstazao/qalb:8b-instruct-q4_K_M", 50.0, "2026-01-02T10:00:00"))
+    store.write_suite(suite("qalb-mock", 10.0, "2026-01-03T10:00:00"))
+    with pytest.raises(ValueError, match="--model"):
+        load_round(4, ["test_id", "score", "error"], store_dir=store.path, data_dir=tmp_path)
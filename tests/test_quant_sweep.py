@@ -0,0 +1,22 @@
+"""Quantisation sweep: Pareto frontier over the measures each variant has."""
+
+from quant_sweep import mark_pareto, pareto_table
+
+
+def variant(model, **measures):
+    return {"model": model, "quantization": None, "average_score": 80.0, "decode_tokens_per_second": 20.0,
+            "ttft_ms": 300.0, "peak_rss_mb": None, "model_memory_mb": 8000.0, "memory_mb": 8000.0,
+            "load_ms": 2000.0, **measures}
+
+
+def test_unmeasured_ttft_is_not_the_best_ttft():
+    rows = [
+        variant("measured", decode_tokens_per_second=25.0),
+        # Same on every other measure but slower: a TTFT of 0 would put it on the frontier
+        variant("untimed", ttft_ms=None),
+    ]
+    mark_pareto(rows)
+    assert [r["pareto"] for r in rows] == [True, False]
+
+    table = pareto_table(rows, min_score=70.0)
+    assert "| untimed | – | 80.0 | 20.0 | n/a |" in table
@@ -0,0 +1,64 @@
+"""Repeat sampling: combining samples, consistency, and how many repeats a CI needs."""
+
+import math
+import statistics
+
+import test_runner as tr
+from mock_backend import MockBackend, MockProfile
+from test_statistics import make_result
+
+
+def test_combine_repeats_means_and_consistency():
+    samples = [
+        make_result(80.0, ["a"], response_time_ms=100.0),
+        make_result(70.0, ["a"], response_time_ms=300.0),
+        make_result(30.0, [], response_time_ms=200.0),
+        make_result(0.0, [], error="timeout"),
+    ]
+    combined = tr.combine_repeats(samples)
+    assert combined.repeats == 4
+    assert combined.repeat_scores == [80.0, 70.0, 30.0]
+    assert math.isclose(combined.score, 60.0)
+    assert math.isclose(combined.response_time_ms, 200.0)
+    assert math.isclose(combined.consistency, 200 / 3)
+    # The typical response comes from the modal outcome
+    assert combined.passed_keywords == ["a"]
+    assert math.isclose(combined.score_stddev, statistics.stdev([80.0, 70.0, 30.0]))
+
+
+def test_combine_repeats_all_failed():
+    samples = [make_result(0.0, [], error="e1"), make_result(0.0, [], error="e2")]
+    combined = tr.combine_repeats(samples)
+    assert combined.error == "e2"
+    assert combined.repeats == 2
+
+
+def test_repeats_needed():
+    assert tr.repeats_needed([], 1.0) == 1
+    assert tr.repeats_needed([0.0, 0.0], 1.0) == 1
+    # N=4 tests with variance 100: k = 1.96² · 400 / 16 ≈ 96.04
+    assert tr.repeats_needed([100.0] * 4, 1.0) == 97
+    # Halving the target quadruples the repeats
+    assert tr.repeats_needed([100.0] * 4, 0.5) == math.ceil(1.96 ** 2 * 4 * 400 / 16)
+
+
+def repeat_runner(**options):
+    backend = MockBackend(profile=MockProfile(time_scale=0))
+    return tr.QalbTestRunner(model_name=backend.model, warm_up=False, backend=backend, **options)
+
+
+TEST_CASE = tr.TestCase(id="qa_1", category="qa", script_type="urdu", prompt="پاکستان کا دارالحکومت کیا ہے؟",
+                        expected_language="urdu", expected_keywords=["اسلام آباد"], difficulty="easy", tags=[])
+
+
+def test_every_repeat_is_sampled_with_its_own_seed():
+    runner = repeat_runner(repeats=4)
+    combined = runner.run_test(TEST_CASE)
+    assert combined.repeats == 4
+    assert len(runner.backend.attempts) == 4
+
+
+def test_target_ci_stops_sampling_early():
+    # Any interval is narrow enough, so sampling stops at min_repeats
+    combined = repeat_runner(repeats=10, min_repeats=3, target_ci=100.0).run_test(TEST_CASE)
+    assert combined.repeats == 3
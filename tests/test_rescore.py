@@ -0,0 +1,48 @@
+"""Offline re-scoring reproduces the scoring mode a run recorded."""
+
+import json
+from dataclasses import asdict
+
+import pytest
+
+import test_runner as tr
+from rescore_results import Rescorer
+
+
+@pytest.fixture
+def definitions(tmp_path):
+    path = tmp_path / "tests_round4.json"
+    path.write_text(json.dumps({"test_cases": [{
+        "id": "qa_1", "category": "qa", "script_type": "urdu",
+        "prompt": "پاکستان کا دارالحکومت کیا ہے؟", "expected_language": "urdu",
+        "expected_keywords": ["اسلام آباد"], "difficulty": "easy", "tags": [],
+    }]}), encoding="utf-8")
+    return path
+
+
+def stored_result(**overrides):
+    result = tr.TestResult(
+        test_id="qa_1", category="qa", script_type="urdu", prompt="",
+        response="پاکستان کا دارالحکومت اسلام آباد ہے", response_time_ms=30000.0,
+        tokens_per_second=10.0, urdu_char_ratio=0.0, passed_keywords=[],
+        failed_keywords=[], score=0.0, timestamp="", model="m", ttft_ms=200.0,
+    )
+    return {**asdict(result), **overrides}
+
+
+def test_ttft_runs_keep_their_time_scale(definitions):
+    rescorer = Rescorer(test_files=[definitions], workers=1)
+    on_time = rescorer.rescore_suite({"results": [stored_result()]})
+    on_ttft = rescorer.rescore_suite({"results": [stored_result()], "scoring": {"score_on_ttft": True}})
+
+    # A 30 s response earns the lowest time bonus, a 200 ms TTFT the highest
+    assert on_ttft["results"][0]["score"] - on_time["results"][0]["score"] == pytest.approx(15.0)
+
+
+def test_repeat_sampled_results_keep_their_mean(definitions):
+    rescorer = Rescorer(test_files=[definitions], workers=1)
+    suite = {"results": [stored_result(score=42.0, repeats=3, repeat_scores=[40.0, 42.0, 44.0])]}
+    rescored = rescorer.rescore_suite(suite)
+
+    assert rescored["results"][0]["score"] == 42.0
+    assert rescored["skipped_repeat_ids"] == ["qa_1"]
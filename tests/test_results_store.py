@@ -0,0 +1,70 @@
+"""Results store loaders read one model per round, and the newest run per test file."""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import test_runner as tr
+from results_store import ResultsStore, load_combined, load_suites
+
+
+def suite(model, score, timestamp, test_file="urdu_script_tests_round4.json"):
+    return {
+        "test_file": test_file, "model": model, "timestamp": timestamp,
+        "total_tests": 1, "successful_tests": 1, "failed_tests": 0,
+        "metrics": {"average_score": score, "total_retries": 0},
+        "results": [{"test_id": "qa_1", "category": "qa", "script_type": "urdu", "score": score,
+                     "prompt": "p", "response": "r", "error": None}],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultsStore(tmp_path / "store")
+
+
+def test_round_is_read_for_the_default_model(store, tmp_path):
+    store.write_suite(suite(tr.MODEL_NAME, 80.0, "2026-01-01T10:00:00"))
+    store.write_suite(suite("enstazao/qalb:8b-instruct-q4_K_M", 50.0, "2026-01-02T10:00:00"))
+    store.write_suite(suite("qalb-mock", 10.0, "2026-01-03T10:00:00"))
+
+    combined = load_combined(tmp_path / "missing.json", ["score"], round_num=4, store_dir=store.path)
+    assert combined["model"] == tr.MODEL_NAME
+    assert combined["overall_metrics"]["average_score"] == 80.0
+
+    mock = load_combined(tmp_path / "missing.json", ["score"], round_num=4, model="qalb-mock",
+                         store_dir=store.path)
+    assert [r["score"] for s in mock["test_suites"] for r in s["results"]] == [10.0]
+
+
+def test_several_models_without_the_default_is_an_error(store, tmp_path):
+    store.write_suite(suite("enstazao/qalb:8b-instruct-q4_K_M", 50.0, "2026-01-02T10:00:00"))
+    store.write_suite(suite("qalb-mock", 10.0, "2026-01-03T10:00:00"))
+    with pytest.raises(ValueError, match="several models"):
+        load_suites([], ["score"], round_num=4, store_dir=store.path)
+
+
+def test_newer_json_run_wins_over_the_store(store, tmp_path):
+    store.write_suite(suite(tr.MODEL_NAME, 80.0, "2026-01-01T10:00:00"))
+    path = tmp_path / "urdu_script_tests_round4_results.json"
+
+    # Written before the store: the store's copy is read
+    path.write_text(json.dumps(suite(tr.MODEL_NAME, 70.0, "2025-12-31T10:00:00")), encoding="utf-8")
+    os.utime(path, (0, 0))
+    assert load_suites([path], ["score"], round_num=4, store_dir=store.path)[0]["results"] == [{"score": 80.0}]
+
+    # A later --no-store run
+    path.write_text(json.dumps(suite(tr.MODEL_NAME, 90.0, "2026-01-05T10:00:00")), encoding="utf-8")
+    assert load_suites([path], ["score"], round_num=4, store_dir=store.path)[0]["results"] == [{"score": 90.0}]
+
+
+def test_json_suites_of_other_rounds_are_ignored(store, tmp_path):
+    path = tmp_path / "combined_results.json"
+    path.write_text(json.dumps({"test_suites": [
+        suite(tr.MODEL_NAME, 60.0, "2026-01-05T10:00:00", test_file="urdu_script_tests_round3.json"),
+    ]}), encoding="utf-8")
+    assert load_suites([path], ["score"], round_num=4, store_dir=store.path) == []
+    assert len(load_suites([path], ["score"], round_num=3, store_dir=store.path)) == 1
@@ -0,0 +1,45 @@
+"""Retries: a failed test's time covers every attempt; a response's latency only its own."""
+
+import asyncio
+
+import test_runner as tr
+from mock_backend import MockBackend, MockProfile
+
+RETRY_DELAY = 0.05
+
+
+def make_test_case(i):
+    return tr.TestCase(id=f"qa_{i}", category="qa", script_type="urdu", prompt=f"سوال نمبر {i}",
+                       expected_language="urdu", expected_keywords=["اسلام آباد"], difficulty="easy", tags=[])
+
+
+def test_sync_retries(monkeypatch):
+    monkeypatch.setattr(tr, "RETRY_DELAY_SECONDS", RETRY_DELAY)
+    backend = MockBackend(profile=MockProfile(time_scale=0, connection_error_rate=0.5))
+    runner = tr.QalbTestRunner(model_name=backend.model, warm_up=False, backend=backend)
+    results = [runner.run_single_test(make_test_case(i)) for i in range(12)]
+
+    failed = [r for r in results if r.error]
+    retried = [r for r in results if not r.error and r.retry_count]
+    assert failed and retried
+    # MAX_RETRIES attempts with a wait between each
+    assert all(r.response_time_ms >= (tr.MAX_RETRIES - 1) * RETRY_DELAY * 1000 for r in failed)
+    assert all(r.response_time_ms < RETRY_DELAY * 1000 for r in retried)
+
+
+class RefusingClient:
+    async def generate(self, **request):
+        raise ConnectionRefusedError(111, "Connection refused")
+
+    async def list(self):
+        return {"models": []}
+
+
+def test_async_error_result_covers_every_attempt(monkeypatch):
+    monkeypatch.setattr(tr, "backoff_delay", lambda attempt: RETRY_DELAY)
+    runner = tr.AsyncQalbTestRunner(warm_up=False)
+    runner._client = RefusingClient()
+
+    result = asyncio.run(runner.run_single_test_async(make_test_case(0)))
+    assert result.error and result.retry_count == tr.MAX_RETRIES
+    assert result.response_time_ms >= (tr.MAX_RETRIES - 1) * RETRY_DELAY * 1000
@@ -0,0 +1,31 @@
+"""Suite metrics: averages over the results that measured them."""
+
+import math
+
+import test_runner as tr
+
+
+def make_result(score, keywords, error=None, **kwargs):
+    return tr.TestResult(
+        test_id="t1", category="qa", script_type="urdu", prompt="p", response="r",
+        response_time_ms=kwargs.pop("response_time_ms", 100.0), tokens_per_second=10.0,
+        urdu_char_ratio=1.0, passed_keywords=keywords, failed_keywords=[], score=score,
+        timestamp="", model="m", error=error, **kwargs,
+    )
+
+
+def test_cache_hits_leave_ttft_out_of_the_average():
+    results = [
+        make_result(80.0, ["a"], eval_count=50, ttft_ms=400.0, prefill_tokens_per_second=200.0),
+        make_result(80.0, ["a"], eval_count=50, ttft_ms=200.0, prefill_tokens_per_second=100.0),
+        # Full prompt cache hit: no prompt_eval_count, so no TTFT or prefill rate
+        make_result(80.0, ["a"], eval_count=50),
+    ]
+    metrics = tr.calculate_suite_metrics(results)
+    assert math.isclose(metrics["average_ttft_ms"], 300.0)
+    assert math.isclose(metrics["average_prefill_tokens_per_second"], 150.0)
+
+    untimed = {"metrics": tr.calculate_suite_metrics([make_result(80.0, ["a"], eval_count=50)]),
+               "total_tests": 1, "successful_tests": 1, "failed_tests": 0}
+    timed = {"metrics": metrics, "total_tests": 3, "successful_tests": 3, "failed_tests": 0}
+    assert math.isclose(tr.calculate_overall_metrics([timed, untimed])["average_ttft_ms"], 300.0)
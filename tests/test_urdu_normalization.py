@@ -0,0 +1,41 @@
+"""Urdu normalisation: spelling variants fold together, and offsets map back to the source."""
+
+import pytest
+
+import keyword_matcher as km
+from urdu_normalization import normalize_text, normalize_with_offsets
+
+
+@pytest.mark.parametrize("variant, canonical", [
+    ("اسلام‌آباد", "اسلام آباد"),     # zero-width non-joiner
+    ("اسلام   آباد", "اسلام آباد"),   # spacing
+    ("هے", "ہے"),                      # Arabic heh
+    ("مُحَمَّد", "محمد"),               # diacritics
+    ("۱۲۳", "123"),                    # Urdu digits
+    ("1,000", "1000"),
+])
+def test_variants_fold_together(variant, canonical):
+    assert normalize_text(variant) == normalize_text(canonical)
+
+
+def test_spelling_variants_match():
+    passed, _ = km.match_keywords("پاكستان كى تاريخ", ["پاکستان", "کی", "تاریخ"])
+    assert passed == ["پاکستان", "کی", "تاریخ"]
+
+
+@pytest.mark.parametrize("text", [
+    "سلام   دنیا",
+    "پاكستان،\nزندہ باد",
+    "مُحَمَّد ﷺ اور ۱۲۳",
+    "Hello,  World‌OK",
+    "",
+])
+def test_normalize_with_offsets_matches_normalize_text(text):
+    normalized, starts, ends = normalize_with_offsets(text)
+    assert normalized == normalize_text(text)
+    assert len(starts) == len(ends) == len(normalized)
+    for i, char in enumerate(normalized):
+        source = text[starts[i]:ends[i]]
+        assert source
+        # Every normalised character comes from a source span that folds to it
+        assert char in normalize_text(source) or (char == " " and not source.strip(" "))